@@ -1,5 +1,11 @@
-from django.contrib import admin
-from .models import TravelOption, Booking, UserProfile
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import F
+from .models import (
+    TravelOption, Booking, UserProfile, Location, LocationAlias, SeatHold, BookingRequest,
+    ArchivedTravelOption, ArchivedBooking, RouteSummary,
+)
+from .services import cancel_travel_option_bookings
 
 
 @admin.register(UserProfile)
@@ -9,8 +15,43 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_filter = ('created_at',)
 
 
+class LocationAliasInline(admin.TabularInline):
+    model = LocationAlias
+    fields = ('name', 'slug')
+    readonly_fields = ('slug',)
+    extra = 1
+
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'created_at')
+    search_fields = ('name', 'slug', 'aliases__name')
+    readonly_fields = ('slug', 'created_at')
+    inlines = [LocationAliasInline]
+
+    def save_model(self, request, obj, form, change):
+        obj.slug = Location.normalize(obj.name)
+        super().save_model(request, obj, form, change)
+
+
+class TravelOptionAdminForm(forms.ModelForm):
+    """Edits the seat count kept in the travel option's SeatInventory row."""
+    available_seats = forms.IntegerField(min_value=0)
+
+    class Meta:
+        model = TravelOption
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['available_seats'].initial = self.instance.available_seats
+
+
 @admin.register(TravelOption)
 class TravelOptionAdmin(admin.ModelAdmin):
+    form = TravelOptionAdminForm
+    actions = ['cancel_all_bookings']
     list_display = ('title', 'type', 'source', 'destination', 'departure_datetime', 'price', 'available_seats', 'created_at')
     list_filter = ('type', 'source', 'destination', 'departure_datetime', 'created_at')
     search_fields = ('title', 'source', 'destination')
@@ -22,7 +63,7 @@ class TravelOptionAdmin(admin.ModelAdmin):
             'fields': ('type', 'title', 'source', 'destination')
         }),
         ('Schedule & Pricing', {
-            'fields': ('departure_datetime', 'price', 'available_seats')
+            'fields': ('departure_datetime', 'arrival_datetime', 'price', 'available_seats')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -30,6 +71,30 @@ class TravelOptionAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(available_seats=F('inventory__available_seats'))
+
+    @admin.display(ordering='inventory__available_seats')
+    def available_seats(self, obj):
+        return obj.available_seats
+
+    @admin.action(description='Cancel all bookings (service disrupted)')
+    def cancel_all_bookings(self, request, queryset):
+        cancelled = cancel_travel_option_bookings(queryset.values_list('id', flat=True))
+        self.message_user(
+            request,
+            f'Cancelled {sum(cancelled.values())} booking(s) on {len(cancelled)} travel option(s).',
+            messages.SUCCESS,
+        )
+
+    def save_model(self, request, obj, form, change):
+        seats = form.cleaned_data['available_seats']
+        if not change:
+            obj.available_seats = seats
+        super().save_model(request, obj, form, change)
+        if change and 'available_seats' in form.changed_data:
+            obj.set_available_seats(seats)
+
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -51,3 +116,68 @@ class BookingAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'travel_option')
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'travel_option', 'num_seats', 'status', 'expires_at', 'created_at')
+    list_filter = ('status', 'expires_at')
+    search_fields = ('user__username', 'travel_option__title')
+    readonly_fields = ('booking', 'created_at')
+    ordering = ('-created_at',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'travel_option')
+
+
+@admin.register(BookingRequest)
+class BookingRequestAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'travel_option', 'num_seats', 'status', 'created_at', 'processed_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__username', 'travel_option__title')
+    readonly_fields = ('booking', 'error', 'created_at', 'processed_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'travel_option')
+
+
+class ReadOnlyArchiveAdmin(admin.ModelAdmin):
+    """Archive rows are written only by archive_past_departures."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedTravelOption)
+class ArchivedTravelOptionAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('title', 'type', 'source', 'destination', 'departure_datetime', 'price', 'archived_at')
+    list_filter = ('type', 'departure_datetime')
+    search_fields = ('title', 'source', 'destination')
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(ReadOnlyArchiveAdmin):
+    list_display = ('id', 'user', 'travel_option', 'num_seats', 'total_price', 'status', 'booking_date')
+    list_filter = ('status', 'booking_date')
+    search_fields = ('user__username', 'travel_option__title')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user', 'travel_option')
+
+
+@admin.register(RouteSummary)
+class RouteSummaryAdmin(admin.ModelAdmin):
+    """Maintained from the catalog; repair with rebuild_route_summaries."""
+    list_display = ('departure_date', 'type', 'source_location', 'destination_location', 'option_count', 'min_price', 'available_seats')
+    list_filter = ('type', 'departure_date')
+    search_fields = ('source_location__name', 'destination_location__name')
+    list_select_related = ('source_location', 'destination_location')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
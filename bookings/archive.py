@@ -0,0 +1,118 @@
+"""Hot/cold archival of departed travel options and their bookings.
+
+Travel options that departed before a cutoff are copied, with their
+bookings, into the ArchivedTravelOption and ArchivedBooking tables and
+deleted from the hot tables, one chunk per transaction. Booking history
+reads both sides through ``user_bookings``.
+"""
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import F, Value
+from django.utils import timezone
+
+from . import signals, summaries
+from .exports import iter_rows
+from .models import TravelOption, Booking, ArchivedTravelOption, ArchivedBooking
+from .pagination import MergedKeysetPaginator
+
+ARCHIVE_CHUNK_SIZE = 500
+BOOKING_FIELDS = ('id', 'user_id', 'num_seats', 'total_price', 'status', 'booking_date', 'updated_at')
+
+
+def archive_past_departures(cutoff, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """Move travel options departed before ``cutoff`` and their bookings to the archive.
+
+    Each chunk of travel options is archived in its own transaction, so
+    the job can be stopped and resumed at any point. The per-option delete
+    receiver is muted, so the caches are invalidated and route summaries up
+    to the cutoff date rebuilt once at the end rather than per option.
+    Returns ``(travel_options, bookings)`` counts.
+    """
+    archived_options = archived_bookings = 0
+    routes = set()
+    departed = TravelOption.objects.filter(departure_datetime__lt=cutoff).annotate(
+        available_seats=F('inventory__available_seats')
+    ).order_by('departure_datetime', 'id')
+
+    while True:
+        with transaction.atomic():
+            travel_options = list(departed[:chunk_size])
+            if not travel_options:
+                break
+            ids = [travel_option.pk for travel_option in travel_options]
+            ArchivedTravelOption.objects.bulk_create([
+                ArchivedTravelOption(
+                    id=travel_option.pk,
+                    type=travel_option.type,
+                    title=travel_option.title,
+                    source=travel_option.source,
+                    destination=travel_option.destination,
+                    departure_datetime=travel_option.departure_datetime,
+                    arrival_datetime=travel_option.arrival_datetime,
+                    price=travel_option.price,
+                    available_seats=travel_option.available_seats or 0,
+                    created_at=travel_option.created_at,
+                )
+                for travel_option in travel_options
+            ])
+
+            batch = []
+            bookings = Booking.objects.filter(travel_option_id__in=ids)
+            for row in iter_rows(bookings, ('travel_option_id',) + BOOKING_FIELDS, chunk_size):
+                batch.append(ArchivedBooking(travel_option_id=row[0], **dict(zip(BOOKING_FIELDS, row[1:]))))
+                if len(batch) >= chunk_size:
+                    archived_bookings += len(ArchivedBooking.objects.bulk_create(batch))
+                    batch = []
+            archived_bookings += len(ArchivedBooking.objects.bulk_create(batch))
+
+            bookings.delete()
+            with signals.travel_option_deletes_muted():
+                TravelOption.objects.filter(pk__in=ids).delete()
+            archived_options += len(ids)
+            routes.update(
+                (travel_option.source_location_id, travel_option.destination_location_id)
+                for travel_option in travel_options
+                if travel_option.source_location_id and travel_option.destination_location_id
+            )
+    if archived_options:
+        signals.invalidate_travel_options(routes)
+        summaries.rebuild_route_summaries(date_to=timezone.localdate(cutoff))
+    return archived_options, archived_bookings
+
+
+def user_bookings(user, status=None):
+    """Return ``(hot, archived)`` querysets of a user's bookings, newest first."""
+    hot = Booking.objects.filter(user=user).select_related('travel_option')
+    archived = ArchivedBooking.objects.filter(user=user).select_related('travel_option')
+    if status:
+        hot, archived = hot.filter(status=status), archived.filter(status=status)
+    return hot.order_by('-booking_date', '-id'), archived.order_by('-booking_date', '-id')
+
+
+def booking_history_page(user, per_page, page_number=None, cursor=None, cursor_pagination=False, status=None):
+    """Return a page of hot and archived bookings merged by booking date.
+
+    Archived bookings keep their original ids, so ``(booking_date, id)``
+    stays unique across both tables. Numbered pages paginate a UNION of
+    just those keys and then load the rows of the page from each table;
+    cursor pages read both tables from the cursor and merge.
+    """
+    hot, archived = user_bookings(user, status)
+    if cursor_pagination:
+        paginator = MergedKeysetPaginator([hot, archived], per_page, keys=('booking_date', 'id'), descending=True)
+        return paginator.get_page(cursor)
+
+    keys = hot.order_by().values_list('booking_date', 'id', Value(False)).union(
+        archived.order_by().values_list('booking_date', 'id', Value(True)), all=True
+    ).order_by('-booking_date', '-id')
+    page = Paginator(keys, per_page).get_page(page_number)
+
+    hot_ids = [pk for _, pk, is_archived in page.object_list if not is_archived]
+    archived_ids = [pk for _, pk, is_archived in page.object_list if is_archived]
+    rows = {}
+    if hot_ids:
+        rows.update(((False, booking.pk), booking) for booking in hot.filter(pk__in=hot_ids))
+    if archived_ids:
+        rows.update(((True, booking.pk), booking) for booking in archived.filter(pk__in=archived_ids))
+    page.object_list = [rows[(bool(is_archived), pk)] for _, pk, is_archived in page.object_list]
+    return page
@@ -0,0 +1,134 @@
+"""Async versions of the public read views, served when BOOKINGS_ASYNC_VIEWS is on.
+
+They read through the same caches as ``views`` and query with the async
+ORM, so under an ASGI server a request waiting on the database or the
+cache does not hold a worker. Form validation (city names are resolved to
+Location ids in ``clean()``) and template rendering (the context
+processors read the session lazily) stay synchronous and run through
+``sync_to_async``. Booking posts are handed to the sync ``travel_detail``.
+"""
+from asgiref.sync import sync_to_async
+from django.core.paginator import Paginator
+from django.http import JsonResponse, Http404
+from django.shortcuts import render
+from django.utils.cache import get_conditional_response
+
+from . import conditional, views
+from .models import TravelOption
+from .page_cache import anonymous_page_cache, TRAVEL_OPTIONS
+from .forms import BookingForm, TravelSearchForm
+from .pagination import KeysetPaginator
+from .autocomplete import aget_city_index
+from .search import build_travel_queryset, afacet_counts
+from .catalog import aget_travel_option
+from .summaries import apopular_routes
+from .cache import acached_search, serialize_page, deserialize_page, rows_from, atravel_options_from
+
+arender = sync_to_async(render)
+
+
+async def _aget_travel_option_or_404(pk):
+    try:
+        return await aget_travel_option(pk)
+    except TravelOption.DoesNotExist:
+        raise Http404('No TravelOption matches the given query.')
+
+
+@anonymous_page_cache(TRAVEL_OPTIONS)
+async def home(request):
+    """Async ``views.home``."""
+    search_form = TravelSearchForm(request.GET or None)
+
+    async def fetch_home():
+        return rows_from([travel_option async for travel_option in build_travel_queryset()[:6]])
+
+    context = {
+        'search_form': search_form,
+        'travel_options': await atravel_options_from(await acached_search(None, 'home', fetch_home)),
+        'popular_routes': await acached_search(None, 'popular_routes', apopular_routes),
+    }
+    return await arender(request, 'home.html', context)
+
+
+@anonymous_page_cache(TRAVEL_OPTIONS)
+async def travel_list(request):
+    """Async ``views.travel_list``."""
+    search_form = TravelSearchForm(request.GET or None)
+    cleaned_data = search_form.cleaned_data if await sync_to_async(search_form.is_valid)() else None
+    cursor_pagination = views._use_cursor_pagination(request)
+    if cursor_pagination:
+        page_key = ('cursor', request.GET.get('cursor', ''))
+    else:
+        page_key = ('page', request.GET.get('page', ''))
+
+    async def fetch_page():
+        travel_options = build_travel_queryset(cleaned_data)
+        facets = await afacet_counts(travel_options)
+        if cursor_pagination:
+            page = await KeysetPaginator(travel_options, 12, keys=('departure_datetime', 'id')).aget_page(page_key[1])
+        else:
+            paginator = Paginator(travel_options, 12)
+            paginator.count = facets['total']
+            # The count is known, so the page's object_list is still a lazy slice
+            page = paginator.get_page(page_key[1])
+            page.object_list = [travel_option async for travel_option in page.object_list]
+        payload = serialize_page(page)
+        payload['facets'] = facets
+        return payload
+
+    payload = await acached_search(cleaned_data, page_key, fetch_page)
+    page_obj = deserialize_page(payload, 12, await atravel_options_from(payload['rows']))
+
+    context = {
+        'search_form': search_form,
+        'page_obj': page_obj,
+        'travel_options': page_obj,
+        'cursor_pagination': cursor_pagination,
+        'facets': views._facet_links(request, payload['facets']),
+    }
+    return await arender(request, 'bookings/travel_list.html', context)
+
+
+async def travel_detail(request, pk):
+    """Async ``views.travel_detail`` for GET; bookings go through the sync view."""
+    if request.method == 'POST':
+        return await sync_to_async(views.travel_detail)(request, pk)
+
+    if conditional.is_conditional(request):
+        state = await conditional.atravel_option_state(pk)
+        if state is not None:
+            etag = await sync_to_async(conditional.page_etag)(request, 'travel_option', pk, *state)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                not_modified.headers['ETag'] = etag
+                return not_modified
+
+    travel_option = await _aget_travel_option_or_404(pk)
+    context = {
+        'travel_option': travel_option,
+        'form': BookingForm(travel_option=travel_option),
+        'held_seats': await travel_option.aheld_seats(),
+    }
+    return await sync_to_async(_render_travel_detail)(request, context)
+
+
+def _render_travel_detail(request, context):
+    response = render(request, 'bookings/travel_detail.html', context)
+    etag = conditional.travel_option_etag(request, context['travel_option'], context['held_seats'])
+    return conditional.private_page(response, etag)
+
+
+async def search_autocomplete(request):
+    """Async ``views.search_autocomplete``."""
+    query = request.GET.get('q', '')
+    field = request.GET.get('field', '')
+
+    if not query or len(query) < 2:
+        return JsonResponse({'results': []})
+
+    if field in ('source', 'destination'):
+        results = (await aget_city_index(field)).search(query, limit=10)
+    else:
+        results = []
+
+    return conditional.json_response(request, {'results': list(results)})
@@ -0,0 +1,147 @@
+"""In-process city name index backing the search autocomplete endpoint.
+
+Each worker keeps a sorted suffix list of the distinct source and
+destination names, so prefix and substring lookups are a ``bisect`` plus a
+short scan instead of an ``icontains`` table scan. A version stamp in the
+shared cache tells every worker when its copy is out of date.
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import TravelOption
+
+VERSION_KEY = 'bookings:city_index:version'
+FIELDS = ('source', 'destination')
+
+
+class CityIndex:
+    """Sorted suffix index answering prefix and substring queries."""
+
+    def __init__(self, names=()):
+        self._names = {}
+        for name in names:
+            self._names.setdefault(name.lower(), name)
+        self._suffixes = sorted(
+            (key[offset:], offset, key)
+            for key in self._names
+            for offset in range(len(key))
+        )
+
+    def __contains__(self, name):
+        return name.lower() in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """Insert a single name without rebuilding the index."""
+        key = name.lower()
+        if not key or key in self._names:
+            return
+        self._names[key] = name
+        for offset in range(len(key)):
+            insort(self._suffixes, (key[offset:], offset, key))
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` names containing ``query``, prefixes first."""
+        query = query.lower()
+        prefix_matches, substring_matches = set(), set()
+        start = bisect_left(self._suffixes, (query,))
+        for i in range(start, len(self._suffixes)):
+            suffix, offset, key = self._suffixes[i]
+            if not suffix.startswith(query):
+                break
+            (substring_matches if offset else prefix_matches).add(key)
+
+        ordered = sorted(prefix_matches) + sorted(substring_matches - prefix_matches)
+        return [self._names[key] for key in ordered[:limit]]
+
+
+_lock = threading.Lock()
+_state = {'version': None, 'indexes': {}}
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start somewhere new so an index from before an eviction is not reused
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def _acurrent_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def _build(field):
+    # Clear Meta.ordering, or departure_datetime joins the SELECT DISTINCT
+    names = TravelOption.objects.values_list(field, flat=True).order_by().distinct()
+    return CityIndex(names)
+
+
+def get_city_index(field):
+    """Return this worker's index for ``field``, rebuilding it if stale."""
+    version = _current_version()
+    if _state['version'] != version:
+        with _lock:
+            if _state['version'] != version:
+                _state['indexes'] = {name: _build(name) for name in FIELDS}
+                _state['version'] = version
+    return _state['indexes'][field]
+
+
+async def aget_city_index(field):
+    """Async ``get_city_index()``.
+
+    One request rebuilds a stale index while concurrent ones keep answering
+    from the previous copy, rather than each building its own. Until the
+    first index exists they wait for it in a thread.
+    """
+    version = await _acurrent_version()
+    if _state['version'] != version and _lock.acquire(blocking=False):
+        try:
+            if _state['version'] != version:
+                indexes = {}
+                for name in FIELDS:
+                    names = TravelOption.objects.values_list(name, flat=True).distinct()
+                    indexes[name] = CityIndex([value async for value in names])
+                _state['indexes'] = indexes
+                _state['version'] = version
+        finally:
+            _lock.release()
+    if field not in _state['indexes']:
+        return await sync_to_async(get_city_index, thread_sensitive=False)(field)
+    return _state['indexes'][field]
+
+
+def bump_version():
+    """Tell every worker, including this one, to rebuild its index."""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        return cache.get(VERSION_KEY)
+
+
+def add_travel_option(travel_option):
+    """Apply a newly created travel option to this worker's index in place.
+
+    Other workers still rebuild on the version bump, but this one moves to
+    the new version directly if it was up to date beforehand.
+    """
+    with _lock:
+        local_version = _state['version']
+        new_version = bump_version()
+        if local_version is not None and new_version == local_version + 1:
+            for field in FIELDS:
+                _state['indexes'][field].add(getattr(travel_option, field))
+            _state['version'] = new_version
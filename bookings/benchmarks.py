@@ -0,0 +1,149 @@
+"""View scenarios shared by the ``bench_views`` command and the query budget tests.
+
+Each scenario drives one view through the test client. Query budgets and
+latency baselines for them are checked in at ``bench_baseline.json``.
+
+The HTTP helpers at the end are used by ``bench_asgi``, which runs real
+gunicorn servers; it also loads this module as their gunicorn config so the
+workers can simulate a remote database (``BOOKINGS_BENCH_DB_LATENCY_MS``).
+"""
+import json
+import os
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+BASELINE_PATH = Path(__file__).with_name('bench_baseline.json')
+
+
+def scenarios(travel_option, booking):
+    """Return ``(name, method, url, data, login_required)`` for each view."""
+    return [
+        ('home', 'get', reverse('bookings:home'), {}, False),
+        ('travel_list', 'get', reverse('bookings:travel_list'), {
+            'source': travel_option.source, 'destination': travel_option.destination,
+        }, False),
+        ('travel_detail', 'get', reverse('bookings:travel_detail', args=[travel_option.pk]), {}, False),
+        ('search_autocomplete', 'get', reverse('bookings:search_autocomplete'), {
+            'q': travel_option.source[:3], 'field': 'source',
+        }, False),
+        ('booking_list', 'get', reverse('bookings:booking_list'), {}, True),
+        ('booking_detail', 'get', reverse('bookings:booking_detail', args=[booking.pk]), {}, True),
+        ('book', 'post', reverse('bookings:hold_seats', args=[travel_option.pk]), {
+            'num_seats': 1,
+        }, True),
+    ]
+
+
+def run_scenario(client, method, url, data, iterations=1):
+    """Request ``url`` repeatedly; return latencies (ms) and the max query count."""
+    latencies, max_queries = [], 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            latencies.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise AssertionError(f'{method.upper()} {url} returned {response.status_code}')
+        max_queries = max(max_queries, len(queries))
+    return latencies, max_queries
+
+
+def percentiles(latencies):
+    """Return p50/p95/p99 in milliseconds."""
+    if len(latencies) < 2:
+        value = round(latencies[0], 2)
+        return {'p50': value, 'p95': value, 'p99': value}
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {'p50': round(cuts[49], 2), 'p95': round(cuts[94], 2), 'p99': round(cuts[98], 2)}
+
+
+def load_baseline(path=BASELINE_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_baseline(baseline, path=BASELINE_PATH):
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def add_db_latency(milliseconds):
+    """Sleep this long before every query on connections opened from now on."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(milliseconds / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # The wrapper object outlives its connection, so this fires on every reconnect
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+
+
+def post_worker_init(worker):
+    """gunicorn hook (``-c python:bookings.benchmarks``)."""
+    latency = float(os.environ.get('BOOKINGS_BENCH_DB_LATENCY_MS') or 0)
+    if latency:
+        add_db_latency(latency)
+
+
+def worker_rss_mb(master_pid):
+    """Return the resident memory (MB) of each child process of ``master_pid`` (Linux)."""
+    sizes = []
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                status = dict(line.split(':', 1) for line in f if ':' in line)
+        except OSError:
+            continue
+        if int(status['PPid']) == master_pid and 'VmRSS' in status:
+            sizes.append(int(status['VmRSS'].split()[0]) / 1024)
+    return sizes
+
+
+def run_load(urls, concurrency, duration):
+    """Request ``urls`` round robin from ``concurrency`` threads for ``duration`` seconds.
+
+    Returns ``(latencies_ms, errors)``; responses of 400 and above, timeouts
+    and refused connections count as errors.
+    """
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        i = offset
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(urls[i % len(urls)], timeout=30) as response:
+                    response.read()
+                ok = True
+            except (urllib.error.URLError, OSError):
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0]
@@ -0,0 +1,214 @@
+"""Versioned cache for travel search results.
+
+Pages of search results are cached as light row tuples of the static card
+columns, keyed on the normalized search, the page and the version counters
+of the routes the search covers. Creating, editing or deleting a travel
+option bumps the counters for its route; searches that are not scoped to a
+route use a short timeout instead. Seat counts are not cached at all: they
+are read fresh from SeatInventory whenever a page is rendered. The
+``a``-prefixed functions are the same lookups for async views.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+
+from .catalog import with_live_seats, awith_live_seats
+from .models import TravelOption
+from .pagination import KeysetPage
+from .search import CARD_FIELDS
+
+KEY_PREFIX = 'bookings:search'
+HITS_KEY = f'{KEY_PREFIX}:hits'
+MISSES_KEY = f'{KEY_PREFIX}:misses'
+
+
+def _incr(key, delta=1):
+    """Increment a counter in the cache, creating it if missing."""
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key, delta)
+
+
+async def _aincr(key, delta=1):
+    try:
+        return await cache.aincr(key, delta)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        return await cache.aincr(key, delta)
+
+
+def route_version_keys(source_ids=None, destination_ids=None):
+    """Return the version keys a search over these locations depends on."""
+    if source_ids is not None and destination_ids is not None:
+        return [f'{KEY_PREFIX}:route:{s}:{d}' for s in source_ids for d in destination_ids]
+    if source_ids is not None:
+        return [f'{KEY_PREFIX}:from:{s}' for s in source_ids]
+    if destination_ids is not None:
+        return [f'{KEY_PREFIX}:to:{d}' for d in destination_ids]
+    return []
+
+
+def bump_route_version(source_location_id, destination_location_id):
+    """Invalidate cached searches that cover this route."""
+    if source_location_id is None or destination_location_id is None:
+        return
+    keys = (
+        route_version_keys([source_location_id], [destination_location_id])
+        + route_version_keys(source_ids=[source_location_id])
+        + route_version_keys(destination_ids=[destination_location_id])
+    )
+    for key in keys:
+        _incr(key)
+
+
+def _route_versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start evicted counters somewhere new so old entries are not revived
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def _aroute_versions(keys):
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, int(time.time() * 1000), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def normalize_search(cleaned_data):
+    """Return a hashable, order-independent form of a search.
+
+    Free-text cities are replaced by the location ids they resolved to, so
+    differently typed names for the same city share cache entries.
+    """
+    normalized = []
+    for name, value in sorted((cleaned_data or {}).items()):
+        if name in ('source', 'destination') or value in (None, ''):
+            continue
+        if isinstance(value, (list, tuple)):
+            value = tuple(sorted(value))
+        normalized.append((name, str(value)))
+    return tuple(normalized)
+
+
+def _search_version_keys(cleaned_data):
+    return route_version_keys(
+        cleaned_data.get('source_location_ids') if cleaned_data.get('source') else None,
+        cleaned_data.get('destination_location_ids') if cleaned_data.get('destination') else None,
+    )
+
+
+def _search_key(cleaned_data, page_key, versions):
+    if versions:
+        timeout = settings.SEARCH_CACHE_TIMEOUT
+    else:
+        timeout = settings.SEARCH_CACHE_UNSCOPED_TIMEOUT
+    raw = repr((normalize_search(cleaned_data), page_key, versions))
+    return f'{KEY_PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}', timeout
+
+
+def search_cache_key(cleaned_data, page_key):
+    """Return ``(key, timeout)`` for a search and page."""
+    cleaned_data = cleaned_data or {}
+    versions = _route_versions(_search_version_keys(cleaned_data))
+    return _search_key(cleaned_data, page_key, versions)
+
+
+async def asearch_cache_key(cleaned_data, page_key):
+    """Async ``search_cache_key()``."""
+    cleaned_data = cleaned_data or {}
+    versions = await _aroute_versions(_search_version_keys(cleaned_data))
+    return _search_key(cleaned_data, page_key, versions)
+
+
+def cached_search(cleaned_data, page_key, compute):
+    """Return the cached payload for a search page, computing it on a miss."""
+    key, timeout = search_cache_key(cleaned_data, page_key)
+    payload = cache.get(key)
+    if payload is None:
+        _incr(MISSES_KEY)
+        payload = compute()
+        cache.set(key, payload, timeout)
+    else:
+        _incr(HITS_KEY)
+    return payload
+
+
+async def acached_search(cleaned_data, page_key, compute):
+    """Async ``cached_search()``; ``compute`` is a coroutine function."""
+    key, timeout = await asearch_cache_key(cleaned_data, page_key)
+    payload = await cache.aget(key)
+    if payload is None:
+        await _aincr(MISSES_KEY)
+        payload = await compute()
+        await cache.aset(key, payload, timeout)
+    else:
+        await _aincr(HITS_KEY)
+    return payload
+
+
+def search_cache_stats():
+    """Return the hit and miss counters across all workers."""
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counters.get(HITS_KEY, 0), counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def rows_from(travel_options):
+    """Flatten travel options to the tuples stored in the cache."""
+    return [tuple(getattr(option, field) for field in CARD_FIELDS) for option in travel_options]
+
+
+def travel_options_from(rows):
+    """Rebuild TravelOption instances from cached rows with live seat counts."""
+    return with_live_seats([TravelOption(**dict(zip(CARD_FIELDS, row))) for row in rows])
+
+
+async def atravel_options_from(rows):
+    """Async ``travel_options_from()``."""
+    return await awith_live_seats([TravelOption(**dict(zip(CARD_FIELDS, row))) for row in rows])
+
+
+def serialize_page(page):
+    """Return a cacheable payload for a Paginator or keyset page."""
+    if isinstance(page, KeysetPage):
+        return {
+            'rows': rows_from(page),
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        }
+    return {
+        'rows': rows_from(page),
+        'number': page.number,
+        'count': page.paginator.count,
+    }
+
+
+def deserialize_page(payload, per_page, travel_options=None):
+    """Rebuild the page object the list templates expect from a payload.
+
+    ``travel_options`` are the payload's rows already rebuilt, e.g. by
+    ``atravel_options_from()``.
+    """
+    if travel_options is None:
+        travel_options = travel_options_from(payload['rows'])
+    if 'count' not in payload:
+        return KeysetPage(travel_options, payload['next_cursor'], payload['previous_cursor'])
+    paginator = Paginator([], per_page)
+    paginator.count = payload['count']
+    return Page(travel_options, payload['number'], paginator)
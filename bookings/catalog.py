@@ -0,0 +1,136 @@
+"""In-process cache of the static part of travel options.
+
+Title, route, schedule and price change rarely, while the seat count
+changes with every booking and lives in its own SeatInventory row. Each
+worker keeps recently viewed travel options in a small LRU and reads only
+the live seat count per request. A version stamp in the shared cache,
+bumped whenever a travel option is saved or deleted, tells every worker
+when its entries are out of date. The ``a``-prefixed functions are the
+same lookups for async views.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from .models import TravelOption, SeatInventory
+
+VERSION_KEY = 'bookings:catalog:version'
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+
+
+def _current_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start somewhere new so entries from before an eviction are not revived
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def _acurrent_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Tell every worker, including this one, to drop its cached options."""
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+
+
+def _remember(version, travel_option):
+    static = copy.copy(travel_option)
+    static.__dict__.pop('_available_seats', None)
+    with _lock:
+        _entries[travel_option.pk] = (version, static)
+        _entries.move_to_end(travel_option.pk)
+        while len(_entries) > settings.CATALOG_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def get_travel_option(pk):
+    """Return the travel option with a fresh seat count, in one query.
+
+    Raises ``TravelOption.DoesNotExist`` like ``objects.get()``.
+    """
+    version = _current_version()
+    static = _cached(version, pk)
+    if static is None:
+        travel_option = TravelOption.objects.annotate(
+            available_seats=F('inventory__available_seats')
+        ).get(pk=pk)
+        _remember(version, travel_option)
+        return travel_option
+
+    travel_option = copy.copy(static)
+    travel_option.available_seats = live_seats([pk]).get(pk, 0)
+    return travel_option
+
+
+async def aget_travel_option(pk):
+    """Async ``get_travel_option()``."""
+    version = await _acurrent_version()
+    static = _cached(version, pk)
+    if static is None:
+        travel_option = await TravelOption.objects.annotate(
+            available_seats=F('inventory__available_seats')
+        ).aget(pk=pk)
+        _remember(version, travel_option)
+        return travel_option
+
+    travel_option = copy.copy(static)
+    travel_option.available_seats = (await alive_seats([pk])).get(pk, 0)
+    return travel_option
+
+
+def _cached(version, pk):
+    with _lock:
+        entry = _entries.get(pk)
+        if entry is not None and entry[0] == version:
+            _entries.move_to_end(pk)
+            return entry[1]
+    return None
+
+
+def live_seats(travel_option_ids):
+    """Return ``{travel_option_id: available_seats}`` read fresh from the inventory."""
+    return dict(
+        SeatInventory.objects.filter(pk__in=travel_option_ids)
+        .values_list('travel_option_id', 'available_seats')
+    )
+
+
+def with_live_seats(travel_options):
+    """Fill in the current seat count of cached travel options in one query."""
+    seats = live_seats([travel_option.pk for travel_option in travel_options]) if travel_options else {}
+    for travel_option in travel_options:
+        travel_option.available_seats = seats.get(travel_option.pk, 0)
+    return travel_options
+
+
+async def alive_seats(travel_option_ids):
+    """Async ``live_seats()``."""
+    return {
+        pk: seats async for pk, seats in SeatInventory.objects.filter(pk__in=travel_option_ids)
+        .values_list('travel_option_id', 'available_seats')
+    }
+
+
+async def awith_live_seats(travel_options):
+    """Async ``with_live_seats()``."""
+    seats = await alive_seats([travel_option.pk for travel_option in travel_options]) if travel_options else {}
+    for travel_option in travel_options:
+        travel_option.available_seats = seats.get(travel_option.pk, 0)
+    return travel_options
@@ -0,0 +1,151 @@
+"""Validators for conditional GETs of detail pages and JSON endpoints.
+
+Detail pages get a weak ETag from the timestamps and live counts they
+render. When a request carries ``If-None-Match`` or ``If-Modified-Since``
+the validators are read with one narrow query before the page is built, so
+an unchanged page is answered with 304 without loading or rendering it;
+other requests get the same validators from the objects the view loaded.
+Pages embed the user's menu and CSRF token, so both are part of the ETag,
+and no ETag is issued while flash messages are waiting to be shown. JSON
+payloads mostly come from caches and are validated by their content hash.
+"""
+import hashlib
+
+from django.contrib import messages
+from django.db.models import OuterRef, Subquery, Sum
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, set_response_etag
+from django.utils.http import http_date
+
+from .models import TravelOption, SeatHold, Booking, ArchivedBooking
+
+
+def is_conditional(request):
+    """Whether validators could produce a 304 for this request."""
+    return request.method in ('GET', 'HEAD') and (
+        'HTTP_IF_NONE_MATCH' in request.META or 'HTTP_IF_MODIFIED_SINCE' in request.META
+    )
+
+
+def page_etag(request, *parts):
+    """Return a weak ETag for a page showing ``parts``, or None if it must not be reused."""
+    if len(messages.get_messages(request)):
+        return None
+    raw = repr((request.user.pk, request.META.get('CSRF_COOKIE'), parts))
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def private_page(response, etag=None, last_modified=None):
+    """Attach validators to a rendered page and make browsers revalidate it."""
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    if last_modified:
+        response.headers.setdefault('Last-Modified', http_date(last_modified.timestamp()))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _travel_option_state_query(pk):
+    held = SeatHold.objects.filter(
+        travel_option=OuterRef('pk'), status='active', expires_at__gt=timezone.now()
+    ).order_by().values('travel_option').annotate(seats=Sum('num_seats')).values('seats')
+    return TravelOption.objects.filter(pk=pk).annotate(held=Subquery(held)).values_list(
+        'updated_at', 'inventory__available_seats', 'held'
+    )
+
+
+def _travel_option_state(row):
+    if row is None:
+        return None
+    updated_at, seats, held_seats = row
+    return updated_at, seats or 0, held_seats or 0
+
+
+def travel_option_state(pk):
+    """Narrow query: ``(updated_at, available_seats, held_seats)`` or None."""
+    return _travel_option_state(_travel_option_state_query(pk).first())
+
+
+async def atravel_option_state(pk):
+    """Async ``travel_option_state()``."""
+    return _travel_option_state(await _travel_option_state_query(pk).afirst())
+
+
+def travel_option_etag(request, travel_option, held_seats):
+    return page_etag(
+        request, 'travel_option', travel_option.pk, travel_option.updated_at,
+        travel_option.available_seats or 0, held_seats,
+    )
+
+
+def travel_detail_etag(request, pk):
+    """``etag_func`` for ``condition``: the travel detail ETag from one narrow query."""
+    if not is_conditional(request):
+        return None
+    state = travel_option_state(pk)
+    return state and page_etag(request, 'travel_option', pk, *state)
+
+
+def booking_state(request, pk):
+    """Narrow query: ``(kind, updated_at, travel_option_updated_at)`` of a user's booking, or None.
+
+    Memoized on the request, since ``condition`` asks for the ETag and the
+    Last-Modified date separately.
+    """
+    if not hasattr(request, '_booking_state'):
+        row = Booking.objects.filter(pk=pk, user=request.user).values_list(
+            'updated_at', 'travel_option__updated_at'
+        ).first()
+        kind = 'booking'
+        if row is None:
+            # Archived bookings and their travel options no longer change
+            row = ArchivedBooking.objects.filter(pk=pk, user=request.user).values_list(
+                'updated_at', 'archived_at'
+            ).first()
+            kind = 'archived'
+        request._booking_state = row and (kind, *row)
+    return request._booking_state
+
+
+def booking_etag(request, booking):
+    if booking.is_archived:
+        return page_etag(request, 'archived', booking.pk, booking.updated_at, booking.archived_at)
+    return page_etag(request, 'booking', booking.pk, booking.updated_at, booking.travel_option.updated_at)
+
+
+def booking_last_modified(booking):
+    if booking.is_archived:
+        return max(booking.updated_at, booking.archived_at)
+    return max(booking.updated_at, booking.travel_option.updated_at)
+
+
+def booking_detail_etag(request, pk):
+    if not is_conditional(request):
+        return None
+    state = booking_state(request, pk)
+    if state is None:
+        return None
+    kind, *stamps = state
+    return page_etag(request, kind, pk, *stamps)
+
+
+def booking_detail_last_modified(request, pk):
+    if not is_conditional(request) or len(messages.get_messages(request)):
+        return None
+    state = booking_state(request, pk)
+    return state and max(state[1:])
+
+
+def json_response(request, data, private=False):
+    """A JsonResponse validated by its content hash; 304 when the client has it.
+
+    Public payloads may be stored by shared caches, which revalidate them
+    with us on every use.
+    """
+    response = JsonResponse(data)
+    set_response_etag(response)
+    if private:
+        patch_cache_control(response, private=True)
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=response['ETag'], response=response)
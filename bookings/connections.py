@@ -0,0 +1,345 @@
+"""Multi-leg connection search over upcoming travel options.
+
+Each worker holds the upcoming travel options that have an arrival time as
+a time-expanded graph: per departure location, columnar arrays of departure
+and arrival timestamps, destinations, prices and ids sorted by departure. A
+search enumerates itineraries best first over those arrays and only goes to
+the database to load the legs it returns.
+
+Saving a travel option bumps a version stamp in the shared cache; workers
+then re-read just the rows changed since their last sync and rebuild the
+arrays of the locations involved. Deleting one bumps an epoch that forces a
+full rebuild, as does the graph's age, which also drops departed options.
+"""
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict, namedtuple
+from datetime import timedelta
+from itertools import count
+
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .models import TravelOption
+
+VERSION_KEY = 'bookings:connections:version'
+EPOCH_KEY = 'bookings:connections:epoch'
+
+# A save commits a little after its updated_at, so syncs re-read this far back
+SYNC_OVERLAP = timedelta(minutes=1)
+# Patches touching more options than this rebuild arrays instead of editing them
+BULK_PATCH_SIZE = 1000
+# Rebuild from scratch after this many seconds to drop departed options
+MAX_GRAPH_AGE = 3600
+# Longest layover considered between two legs
+MAX_WAIT = timedelta(hours=12)
+# Upper bound on partial itineraries expanded by one search
+MAX_EXPANSIONS = 50_000
+
+GRAPH_FIELDS = (
+    'id', 'source_location_id', 'destination_location_id', 'departure_datetime', 'arrival_datetime', 'price',
+)
+
+Departures = namedtuple('Departures', 'departs arrives destinations prices ids')
+# ``legs`` are travel option ids; times are Unix timestamps
+Itinerary = namedtuple('Itinerary', 'legs departs arrives price')
+
+_lock = threading.Lock()
+_graph = None
+
+
+def _stamps():
+    stamps = cache.get_many([VERSION_KEY, EPOCH_KEY])
+    for key in (VERSION_KEY, EPOCH_KEY):
+        if key not in stamps:
+            # Start somewhere new so a graph from before an eviction is not reused
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            stamps[key] = cache.get(key)
+    return stamps[VERSION_KEY], stamps[EPOCH_KEY]
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=None)
+
+
+def bump_version():
+    """Tell every worker to pick up travel options saved since its last sync."""
+    _bump(VERSION_KEY)
+
+
+def bump_epoch():
+    """Tell every worker to rebuild its graph, e.g. after deletions."""
+    _bump(EPOCH_KEY)
+
+
+def _edge(row, now_ts):
+    """Return ``(source, (departs, arrives, destination, price, id))`` or None if unusable."""
+    pk, source, destination, departs, arrives, price = row
+    if source is None or destination is None or arrives is None:
+        return None
+    departs, arrives = int(departs.timestamp()), int(arrives.timestamp())
+    if departs < now_ts or arrives <= departs:
+        return None
+    return source, (departs, arrives, destination, float(price), pk)
+
+
+def _departures(edges):
+    edges = sorted(edges)
+    return Departures(
+        array('q', [edge[0] for edge in edges]),
+        array('q', [edge[1] for edge in edges]),
+        array('q', [edge[2] for edge in edges]),
+        array('d', [edge[3] for edge in edges]),
+        array('q', [edge[4] for edge in edges]),
+    )
+
+
+class ConnectionGraph:
+    """Upcoming travel options indexed by departure location.
+
+    ``departures`` maps a location id to its Departures arrays. Patching
+    replaces a location's arrays rather than mutating them, so a search
+    running in another thread keeps a consistent view.
+    """
+
+    def __init__(self, version, epoch):
+        self.version, self.epoch = version, epoch
+        self.built = time.monotonic()
+        self.synced_at = timezone.now()
+        self.departures = {}
+        # Number of options per (source, destination), and the sources
+        # serving each destination, for pruning searches
+        self.routes = {}
+        self.inbound = defaultdict(set)
+        # Source location of every option, sorted by id, to find stale entries
+        self.option_ids = array('q')
+        self.option_sources = array('q')
+
+    @classmethod
+    def build(cls, version, epoch):
+        graph = cls(version, epoch)
+        now_ts = int(graph.synced_at.timestamp())
+        rows = TravelOption.objects.filter(
+            departure_datetime__gte=graph.synced_at, arrival_datetime__isnull=False
+        ).order_by().values_list(*GRAPH_FIELDS)
+
+        edges, index = defaultdict(list), []
+        for row in rows.iterator(chunk_size=5000):
+            edge = _edge(row, now_ts)
+            if edge is not None:
+                source, edge = edge
+                edges[source].append(edge)
+                index.append((edge[4], source))
+        for source, source_edges in edges.items():
+            graph._replace(source, _departures(source_edges))
+        index.sort()
+        graph.option_ids = array('q', [pk for pk, _ in index])
+        graph.option_sources = array('q', [source for _, source in index])
+        return graph
+
+    def __len__(self):
+        return len(self.option_ids)
+
+    def _replace(self, source, departures):
+        old = self.departures.get(source)
+        before = Counter(old.destinations) if old is not None else Counter()
+        after = Counter(departures.destinations) if departures is not None else Counter()
+        for destination in before.keys() | after.keys():
+            count = self.routes.get((source, destination), 0) + after[destination] - before[destination]
+            if count > 0:
+                self.routes[source, destination] = count
+                self.inbound[destination].add(source)
+            else:
+                self.routes.pop((source, destination), None)
+                self.inbound[destination].discard(source)
+        if departures is not None and departures.ids:
+            self.departures[source] = departures
+        else:
+            self.departures.pop(source, None)
+
+    def _patched(self, source, stale, edges):
+        """Return a copy of a location's arrays without ``stale`` ids and with ``edges``."""
+        old = self.departures.get(source)
+        if old is None or len(stale) + len(edges) > BULK_PATCH_SIZE:
+            kept = [] if old is None else [edge for edge in zip(*old) if edge[4] not in stale]
+            return _departures(kept + edges)
+        departures = Departures(*(array(column.typecode, column) for column in old))
+        for pk in stale:
+            i = departures.ids.index(pk)
+            for column in departures:
+                del column[i]
+        for edge in edges:
+            i = bisect_right(departures.departs, edge[0])
+            for column, value in zip(departures, edge):
+                column.insert(i, value)
+        return departures
+
+    def apply_changes(self, version):
+        """Patch in travel options saved since the last sync; return how many were read."""
+        since, self.synced_at = self.synced_at - SYNC_OVERLAP, timezone.now()
+        now_ts = int(self.synced_at.timestamp())
+        rows = list(TravelOption.objects.filter(updated_at__gte=since).order_by().values_list(*GRAPH_FIELDS))
+
+        removed, added = defaultdict(set), defaultdict(list)
+        for row in rows:
+            i = bisect_left(self.option_ids, row[0])
+            if i < len(self.option_ids) and self.option_ids[i] == row[0]:
+                removed[self.option_sources[i]].add(row[0])
+            edge = _edge(row, now_ts)
+            if edge is not None:
+                added[edge[0]].append(edge[1])
+        self._reindex(removed, added)
+
+        for source in set(removed) | set(added):
+            self._replace(source, self._patched(source, removed[source], added[source]))
+        self.version = version
+        return len(rows)
+
+    def _reindex(self, removed, added):
+        """Update the id index for removed and added options."""
+        stale = set().union(*removed.values())
+        fresh = sorted((edge[4], source) for source, edges in added.items() for edge in edges)
+        if len(stale) + len(fresh) > BULK_PATCH_SIZE:
+            index = [
+                (pk, source) for pk, source in zip(self.option_ids, self.option_sources) if pk not in stale
+            ]
+            index = list(heapq.merge(index, fresh))
+            self.option_ids = array('q', [pk for pk, _ in index])
+            self.option_sources = array('q', [source for _, source in index])
+            return
+        for pk in stale:
+            i = bisect_left(self.option_ids, pk)
+            del self.option_ids[i]
+            del self.option_sources[i]
+        for pk, source in fresh:
+            i = bisect_left(self.option_ids, pk)
+            self.option_ids.insert(i, pk)
+            self.option_sources.insert(i, source)
+
+    def _reachable(self, destinations, max_legs):
+        """``levels[n]`` is the set of locations with a route to a destination in at most n legs."""
+        levels = [set(destinations)]
+        for _ in range(max_legs - 1):
+            level = set(levels[-1])
+            for location in levels[-1]:
+                level.update(self.inbound.get(location, ()))
+            levels.append(level)
+        return levels
+
+    def search(self, origins, destinations, earliest, latest, max_legs=3,
+               min_connection=timedelta(minutes=45), sort='arrival', limit=5):
+        """Return up to ``limit`` itineraries ordered by arrival time or total price.
+
+        The first leg departs from one of ``origins`` between ``earliest``
+        and ``latest``; each following leg departs between ``min_connection``
+        and ``MAX_WAIT`` after the previous arrival. Locations are not
+        revisited. Partial itineraries are expanded in sort order, so one is
+        dropped once ``limit`` earlier expansions at its location could catch
+        every departure it could; one that can catch none is dropped too.
+        """
+        origins, destinations = set(origins), set(destinations)
+        levels = self._reachable(destinations, max_legs)
+        min_gap, max_gap = int(min_connection.total_seconds()), int(MAX_WAIT.total_seconds())
+        by_price = sort == 'price'
+        tiebreak = count()
+        heap = []
+
+        def push(location, visited, legs, departs, arrives, price):
+            key = (price, arrives) if by_price else (arrives, price)
+            heapq.heappush(heap, (key, len(legs), next(tiebreak), location, visited, legs, departs, arrives, price))
+
+        def window(location, lo_ts, hi_ts):
+            """Index range of the location's departures between two timestamps."""
+            departures = self.departures.get(location)
+            if departures is None:
+                return 0, 0
+            return bisect_left(departures.departs, lo_ts), bisect_right(departures.departs, hi_ts)
+
+        def extend(location, visited, legs, first_departs, arrives, price, lo, hi):
+            departures = self.departures[location]
+            allowed = levels[max_legs - len(legs) - 1]
+            for i in range(lo, hi):
+                destination = departures.destinations[i]
+                if destination in visited or destination not in allowed:
+                    continue
+                push(
+                    destination, visited + (destination,), legs + (departures.ids[i],),
+                    first_departs or departures.departs[i], departures.arrives[i], price + departures.prices[i],
+                )
+
+        earliest_ts, latest_ts = int(earliest.timestamp()), int(latest.timestamp())
+        for origin in origins:
+            lo, hi = window(origin, earliest_ts, latest_ts)
+            if lo < hi:
+                extend(origin, tuple(origins), (), None, None, 0.0, lo, hi)
+
+        # Departure index ranges of the partial itineraries expanded at each location
+        results, expanded, expansions = [], defaultdict(list), 0
+        while heap and len(results) < limit and expansions < MAX_EXPANSIONS:
+            _, _, _, location, visited, legs, departs, arrives, price = heapq.heappop(heap)
+            if location in destinations:
+                results.append(Itinerary(legs, departs, arrives, price))
+                continue
+            if len(legs) >= max_legs:
+                continue
+            lo, hi = window(location, arrives + min_gap, arrives + max_gap)
+            if lo == hi:
+                continue
+            # Popped in order, so every earlier expansion is cheaper or sooner
+            dominated = sum(1 for seen_lo, seen_hi in expanded[location] if seen_lo <= lo and seen_hi >= hi)
+            if dominated >= limit:
+                continue
+            expanded[location].append((lo, hi))
+            expansions += 1
+            extend(location, visited, legs, departs, arrives, price, lo, hi)
+        return results
+
+
+def get_graph():
+    """Return this worker's graph, synced with the latest saved travel options."""
+    global _graph
+    version, epoch = _stamps()
+    with _lock:
+        graph = _graph
+        if graph is None or graph.epoch != epoch or time.monotonic() - graph.built > MAX_GRAPH_AGE:
+            graph = _graph = ConnectionGraph.build(version, epoch)
+        elif graph.version != version:
+            graph.apply_changes(version)
+    return graph
+
+
+def find_connections(origins, destinations, earliest, latest, max_legs=3,
+                     min_connection=timedelta(minutes=45), sort='arrival', limit=5, seats=1):
+    """Return up to ``limit`` bookable itineraries as lists of travel options.
+
+    The graph may be a moment behind the database, so the legs are loaded
+    with their live seat counts in one query and itineraries whose legs
+    changed schedule, were removed or lack ``seats`` seats are dropped;
+    twice as many candidates as needed are searched to make up for them.
+    """
+    candidates = get_graph().search(
+        origins, destinations, earliest, latest, max_legs, min_connection, sort, limit * 2
+    )
+    travel_options = TravelOption.objects.annotate(
+        available_seats=F('inventory__available_seats')
+    ).in_bulk({pk for itinerary in candidates for pk in itinerary.legs})
+
+    itineraries = []
+    for itinerary in candidates:
+        legs = [travel_options.get(pk) for pk in itinerary.legs]
+        if any(leg is None or leg.arrival_datetime is None or (leg.available_seats or 0) < seats for leg in legs):
+            continue
+        if any(later.departure_datetime < earlier.arrival_datetime + min_connection
+               for earlier, later in zip(legs, legs[1:])):
+            continue
+        itineraries.append(legs)
+        if len(itineraries) == limit:
+            break
+    return itineraries
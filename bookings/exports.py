@@ -0,0 +1,132 @@
+"""Streaming CSV and NDJSON exports of bookings and travel options.
+
+Rows are read as ``values_list`` tuples one chunk at a time and encoded as
+they are sent, so memory use does not grow with the size of the export.
+Booking rows pull their user and travel option columns through joins in the
+same query.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Booking, TravelOption
+from .search import local_day_range
+
+EXPORT_CHUNK_SIZE = 2000
+
+# (column header, values_list lookup)
+BOOKING_COLUMNS = (
+    ('id', 'id'),
+    ('booking_date', 'booking_date'),
+    ('status', 'status'),
+    ('num_seats', 'num_seats'),
+    ('total_price', 'total_price'),
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+    ('travel_option_id', 'travel_option_id'),
+    ('travel_option_title', 'travel_option__title'),
+    ('travel_type', 'travel_option__type'),
+    ('source', 'travel_option__source'),
+    ('destination', 'travel_option__destination'),
+    ('departure_datetime', 'travel_option__departure_datetime'),
+)
+
+TRAVEL_OPTION_COLUMNS = (
+    ('id', 'id'),
+    ('type', 'type'),
+    ('title', 'title'),
+    ('source', 'source'),
+    ('destination', 'destination'),
+    ('departure_datetime', 'departure_datetime'),
+    ('arrival_datetime', 'arrival_datetime'),
+    ('price', 'price'),
+    ('available_seats', 'inventory__available_seats'),
+    ('created_at', 'created_at'),
+)
+
+
+def _date_filters(field, cleaned_data):
+    filters = {}
+    if cleaned_data.get('date_from'):
+        filters[f'{field}__gte'] = local_day_range(cleaned_data['date_from'])[0]
+    if cleaned_data.get('date_to'):
+        filters[f'{field}__lt'] = local_day_range(cleaned_data['date_to'])[1]
+    return filters
+
+
+def booking_export_queryset(cleaned_data):
+    """Bookings matching an ExportFilterForm, dates on ``booking_date``."""
+    filters = _date_filters('booking_date', cleaned_data)
+    if cleaned_data.get('status'):
+        filters['status'] = cleaned_data['status']
+    if cleaned_data.get('type'):
+        filters['travel_option__type'] = cleaned_data['type']
+    return Booking.objects.filter(**filters)
+
+
+def travel_option_export_queryset(cleaned_data):
+    """Travel options matching an ExportFilterForm, dates on ``departure_datetime``."""
+    filters = _date_filters('departure_datetime', cleaned_data)
+    if cleaned_data.get('type'):
+        filters['type'] = cleaned_data['type']
+    return TravelOption.objects.filter(**filters)
+
+
+EXPORTS = {
+    'bookings': (booking_export_queryset, BOOKING_COLUMNS),
+    'travel_options': (travel_option_export_queryset, TRAVEL_OPTION_COLUMNS),
+}
+
+
+def iter_rows(queryset, lookups, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield ``values_list`` rows in primary key order, one chunk in memory at a time.
+
+    Chunks are fetched by primary key range rather than through a single
+    cursor, because the MySQL client buffers a whole result set in memory.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(page.values_list('pk', *lookups)[:chunk_size])
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to csv.writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(columns, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([header for header, _ in columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(columns, rows):
+    headers = [header for header, _ in columns]
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+}
+
+
+def export_lines(name, cleaned_data, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return ``(lines, content_type)`` for export ``name`` in the requested format."""
+    build_queryset, columns = EXPORTS[name]
+    encode, content_type = FORMATS[cleaned_data.get('format') or 'csv']
+    rows = iter_rows(build_queryset(cleaned_data), [lookup for _, lookup in columns], chunk_size)
+    return encode(columns, rows), content_type
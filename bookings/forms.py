@@ -2,7 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
-from .models import UserProfile, TravelOption, Booking
+from .models import UserProfile, TravelOption, Booking, Location
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -126,5 +126,103 @@ class TravelSearchForm(forms.Form):
         
         if min_price and max_price and min_price > max_price:
             raise ValidationError('Minimum price cannot be greater than maximum price.')
+
+        # Resolve free-text cities to Location ids for indexed equality lookups
+        for field in ('source', 'destination'):
+            if cleaned_data.get(field):
+                cleaned_data[f'{field}_location_ids'] = Location.resolve(cleaned_data[field])
         
         return cleaned_data
+
+
+class MultiBookingForm(forms.Form):
+    """Form for booking several travel options (legs) in one order.
+
+    Legs are submitted as parallel ``travel_option`` and ``num_seats`` lists.
+    """
+
+    def clean(self):
+        cleaned_data = super().clean()
+        travel_option_ids = self.data.getlist('travel_option')
+        seat_counts = self.data.getlist('num_seats')
+
+        if not travel_option_ids:
+            raise ValidationError('Select at least one travel option.')
+        if len(travel_option_ids) != len(seat_counts):
+            raise ValidationError('Each travel option needs a number of seats.')
+
+        legs = []
+        for travel_option_id, num_seats in zip(travel_option_ids, seat_counts):
+            try:
+                travel_option_id, num_seats = int(travel_option_id), int(num_seats)
+            except (TypeError, ValueError):
+                raise ValidationError('Travel options and seat counts must be numbers.')
+            if num_seats < 1:
+                raise ValidationError('Each leg must book at least one seat.')
+            legs.append((travel_option_id, num_seats))
+
+        cleaned_data['legs'] = legs
+        return cleaned_data
+
+
+class ExportFilterForm(forms.Form):
+    """Filters for the booking and travel option exports (query string or CLI)."""
+    FORMATS = [('csv', 'CSV'), ('ndjson', 'NDJSON')]
+
+    format = forms.ChoiceField(choices=FORMATS, required=False)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    status = forms.ChoiceField(choices=Booking.STATUS_CHOICES, required=False)
+    type = forms.ChoiceField(choices=TravelOption.TRAVEL_TYPES, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError('The start date cannot be after the end date.')
+        cleaned_data['format'] = cleaned_data.get('format') or 'csv'
+        return cleaned_data
+
+
+class FareCalendarForm(forms.Form):
+    """Route and window of the fare calendar endpoint."""
+    MAX_DAYS = 90
+
+    source = forms.CharField(max_length=100)
+    destination = forms.CharField(max_length=100)
+    type = forms.ChoiceField(choices=TravelOption.TRAVEL_TYPES, required=False)
+    start = forms.DateField(required=False)
+    days = forms.IntegerField(min_value=1, max_value=MAX_DAYS, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        cleaned_data['days'] = cleaned_data.get('days') or 30
+        for field in ('source', 'destination'):
+            if cleaned_data.get(field):
+                cleaned_data[f'{field}_location_ids'] = Location.resolve(cleaned_data[field])
+        return cleaned_data
+
+
+class ConnectionSearchForm(forms.Form):
+    """Route, date and limits of the connection finder endpoint."""
+    SORT_CHOICES = [('arrival', 'Earliest arrival'), ('price', 'Lowest price')]
+
+    source = forms.CharField(max_length=100)
+    destination = forms.CharField(max_length=100)
+    date = forms.DateField(required=False)
+    max_legs = forms.IntegerField(min_value=1, max_value=4, required=False)
+    min_connection = forms.IntegerField(min_value=0, max_value=720, required=False, help_text='Minutes')
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+    limit = forms.IntegerField(min_value=1, max_value=20, required=False)
+    seats = forms.IntegerField(min_value=1, max_value=10, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        defaults = {'max_legs': 3, 'min_connection': 45, 'sort': 'arrival', 'limit': 5, 'seats': 1}
+        for name, default in defaults.items():
+            if cleaned_data.get(name) in (None, ''):
+                cleaned_data[name] = default
+        for field in ('source', 'destination'):
+            if cleaned_data.get(field):
+                cleaned_data[f'{field}_location_ids'] = Location.resolve(cleaned_data[field])
+        return cleaned_data
@@ -0,0 +1,174 @@
+"""Streaming import of operator timetables into TravelOption.
+
+Rows are read lazily from CSV or NDJSON files, validated against the
+TravelOption field rules and upserted in batches on the natural key
+``(title, departure_datetime)``. Existing services get their schedule data
+updated but keep their seat inventory; new services start with the row's
+``available_seats``.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import autocomplete, catalog, connections, page_cache, summaries
+from .cache import bump_route_version
+from .models import TravelOption, SeatInventory, Location
+
+IMPORT_BATCH_SIZE = 2000
+IMPORT_FIELDS = ('type', 'title', 'source', 'destination', 'departure_datetime', 'price', 'available_seats')
+OPTIONAL_FIELDS = ('arrival_datetime',)
+UNIQUE_FIELDS = ['title', 'departure_datetime']
+UPDATE_FIELDS = [
+    'type', 'source', 'destination', 'source_location', 'destination_location', 'arrival_datetime', 'price',
+    'updated_at',
+]
+
+
+def read_rows(path, file_format=None):
+    """Yield ``(line_number, row)`` from a CSV or NDJSON file, one row at a time.
+
+    CSV rows are dicts; NDJSON rows are the raw lines, decoded by
+    ``build_travel_option`` so a malformed line is reported like any other
+    invalid row.
+    """
+    file_format = file_format or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+    with open(path, newline='', encoding='utf-8') as source:
+        if file_format == 'csv':
+            reader = csv.DictReader(source)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(source, start=1):
+                if line.strip():
+                    yield line_number, line
+
+
+def _error_text(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f"{name}: {' '.join(messages)}" for name, messages in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def build_travel_option(row):
+    """Return an unsaved TravelOption for a row or raise ``ValidationError``."""
+    if isinstance(row, str):
+        try:
+            row = json.loads(row)
+        except ValueError as e:
+            raise ValidationError(f'Invalid JSON: {e}')
+    if not isinstance(row, dict):
+        raise ValidationError('Expected an object with the travel option fields.')
+
+    missing = [name for name in IMPORT_FIELDS if row.get(name) in (None, '')]
+    if missing:
+        raise ValidationError(f"Missing {', '.join(missing)}")
+
+    travel_option = TravelOption(**{name: row[name] for name in IMPORT_FIELDS if name != 'available_seats'})
+    for name in OPTIONAL_FIELDS:
+        setattr(travel_option, name, row.get(name) or None)
+    travel_option.clean_fields(exclude=['source_location', 'destination_location'])
+    try:
+        travel_option.available_seats = int(row['available_seats'])
+    except (TypeError, ValueError):
+        raise ValidationError({'available_seats': ['Enter a whole number.']})
+    if travel_option.available_seats < 0:
+        raise ValidationError({'available_seats': ['Ensure this value is greater than or equal to 0.']})
+    for name in ('departure_datetime', 'arrival_datetime'):
+        value = getattr(travel_option, name)
+        if value is not None and timezone.is_naive(value):
+            setattr(travel_option, name, timezone.make_aware(value))
+    travel_option.clean()
+    return travel_option
+
+
+def upsert_travel_options(travel_options):
+    """Insert or update one batch on the natural key, in one transaction.
+
+    Returns the ids of the batch. Seat inventory is only created for
+    services that did not exist yet.
+    """
+    kwargs = {'update_conflicts': True, 'update_fields': UPDATE_FIELDS}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = UNIQUE_FIELDS
+
+    with transaction.atomic():
+        TravelOption.objects.bulk_create(travel_options, **kwargs)
+        if any(travel_option.pk is None for travel_option in travel_options):
+            # Backends that don't return ids from upserts (MySQL)
+            ids = {
+                (title, departure): pk for title, departure, pk in TravelOption.objects.filter(
+                    title__in={travel_option.title for travel_option in travel_options},
+                    departure_datetime__in={travel_option.departure_datetime for travel_option in travel_options},
+                ).values_list('title', 'departure_datetime', 'id')
+            }
+            for travel_option in travel_options:
+                travel_option.pk = ids[(travel_option.title, travel_option.departure_datetime)]
+        SeatInventory.objects.bulk_create(
+            [
+                SeatInventory(travel_option_id=travel_option.pk, available_seats=travel_option.available_seats)
+                for travel_option in travel_options
+            ],
+            ignore_conflicts=True,
+        )
+    return [travel_option.pk for travel_option in travel_options]
+
+
+def import_travel_options(rows, batch_size=IMPORT_BATCH_SIZE, max_errors=None, on_batch=None):
+    """Validate and upsert ``(line_number, row)`` pairs in batches.
+
+    Each batch is committed on its own, so an import stopped by
+    ``max_errors`` keeps the batches written before it. ``on_batch`` is
+    called with the running result after each batch. Returns a dict with
+    ``rows``, ``imported``, ``errors`` (``(line_number, message)`` pairs)
+    and ``aborted``.
+    """
+    result = {'rows': 0, 'imported': 0, 'errors': [], 'aborted': False}
+    location_ids, routes, days, batch = {}, set(), set(), {}
+
+    def location_id(name):
+        if name not in location_ids:
+            location_ids[name] = Location.for_name(name).pk
+        return location_ids[name]
+
+    def flush():
+        if batch:
+            upsert_travel_options(list(batch.values()))
+            result['imported'] += len(batch)
+            batch.clear()
+            if on_batch:
+                on_batch(result)
+
+    for line_number, row in rows:
+        result['rows'] += 1
+        try:
+            travel_option = build_travel_option(row)
+        except ValidationError as e:
+            result['errors'].append((line_number, _error_text(e)))
+            if max_errors is not None and len(result['errors']) > max_errors:
+                result['aborted'] = True
+                break
+            continue
+
+        travel_option.source_location_id = location_id(travel_option.source)
+        travel_option.destination_location_id = location_id(travel_option.destination)
+        routes.add((travel_option.source_location_id, travel_option.destination_location_id))
+        days.add(timezone.localdate(travel_option.departure_datetime))
+        # A later row for the same service wins, as it would across batches
+        batch[(travel_option.title, travel_option.departure_datetime)] = travel_option
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    # bulk_create skips signals, so invalidate derived data explicitly
+    if result['imported']:
+        autocomplete.bump_version()
+        catalog.bump_version()
+        connections.bump_version()
+        page_cache.purge(page_cache.TRAVEL_OPTIONS)
+        for source_location_id, destination_location_id in routes:
+            bump_route_version(source_location_id, destination_location_id)
+        summaries.rebuild_route_summaries(min(days), max(days))
+    return result
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from bookings.archive import ARCHIVE_CHUNK_SIZE, archive_past_departures
+from bookings.search import local_day_range
+
+
+class Command(BaseCommand):
+	help = 'Move departed travel options and their bookings into the archive tables'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--days', type=int, default=30, help='Archive departures older than this many days')
+		parser.add_argument('--before', help='Archive departures before this date (YYYY-MM-DD) instead')
+		parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, help='Travel options per transaction')
+
+	def handle(self, *args, **options):
+		if options['before']:
+			day = parse_date(options['before'])
+			if day is None:
+				raise CommandError('--before must be a date in YYYY-MM-DD format')
+			cutoff = local_day_range(day)[0]
+		else:
+			cutoff = timezone.now() - timedelta(days=options['days'])
+		if cutoff > timezone.now():
+			raise CommandError('The cutoff must be in the past.')
+
+		travel_options, bookings = archive_past_departures(cutoff, options['chunk_size'])
+		self.stdout.write(self.style.SUCCESS(
+			f'Archived {travel_options} travel option(s) and {bookings} booking(s) departed before {cutoff:%Y-%m-%d %H:%M}'
+		))
@@ -0,0 +1,119 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from bookings.benchmarks import percentiles, run_load, worker_rss_mb
+from bookings.search import build_travel_queryset
+
+MODES = {
+	'sync': ('travel_booker_project.wsgi:application', ['--worker-class', 'sync'], False),
+	'async': ('travel_booker_project.asgi:application', ['--worker-class', 'uvicorn.workers.UvicornWorker'], True),
+}
+
+
+class Command(BaseCommand):
+	help = (
+		'Compare gunicorn sync workers with uvicorn workers running the async views, '
+		'each with as many workers as fit in the same memory budget'
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument('--memory-mb', type=int, default=512, help='Memory budget for all workers of a server')
+		parser.add_argument('--concurrency', default='8,32,128', help='Comma-separated client concurrency levels')
+		parser.add_argument('--duration', type=float, default=10, help='Seconds of load per concurrency level')
+		parser.add_argument(
+			'--db-latency-ms', type=float, default=0,
+			help='Delay added to every query in the workers, to simulate a database across the network',
+		)
+		parser.add_argument('--modes', default='sync,async', help=f"Any of {', '.join(MODES)}")
+		parser.add_argument('--port', type=int, default=8765)
+
+	def handle(self, *args, **options):
+		travel_option = build_travel_queryset().first()
+		if travel_option is None:
+			raise CommandError('Seed the database first: manage.py seed_travel_options --generate')
+		base = f"http://127.0.0.1:{options['port']}"
+		urls = [
+			base + reverse('bookings:home'),
+			base + reverse('bookings:travel_list') + '?' + urlencode({
+				'source': travel_option.source, 'destination': travel_option.destination,
+			}),
+			base + reverse('bookings:travel_detail', args=[travel_option.pk]),
+			base + reverse('bookings:search_autocomplete') + '?' + urlencode({
+				'q': travel_option.source[:3], 'field': 'source',
+			}),
+		]
+		levels = [int(level) for level in options['concurrency'].split(',')]
+
+		self.stdout.write(
+			f"{'mode':<6} {'workers':>7} {'MB/worker':>9} {'clients':>7} {'req/s':>8} "
+			f"{'p50 ms':>8} {'p95 ms':>8} {'errors':>6}"
+		)
+		for mode in options['modes'].split(','):
+			if mode not in MODES:
+				raise CommandError(f'Unknown mode {mode!r}')
+			warmup = min(options['duration'], 5)
+			# Size one worker after it has served the heaviest load, then fill the budget
+			with self.server(mode, 1, options) as server:
+				run_load(urls, max(levels), warmup)
+				per_worker = max(worker_rss_mb(server.pid))
+			workers = max(1, int(options['memory_mb'] // per_worker))
+
+			with self.server(mode, workers, options):
+				# Every worker has its own caches to fill
+				run_load(urls, workers * len(urls), warmup)
+				for level in levels:
+					latencies, errors = run_load(urls, level, options['duration'])
+					stats = percentiles(latencies) if latencies else {'p50': '-', 'p95': '-'}
+					self.stdout.write(
+						f"{mode:<6} {workers:>7} {per_worker:>9.1f} {level:>7} "
+						f"{len(latencies) / options['duration']:>8.1f} {stats['p50']:>8} {stats['p95']:>8} {errors:>6}"
+					)
+
+	def server(self, mode, workers, options):
+		app, worker_args, async_views = MODES[mode]
+		env = dict(
+			os.environ,
+			BOOKINGS_ASYNC_VIEWS=str(async_views),
+			BOOKINGS_BENCH_DB_LATENCY_MS=str(options['db_latency_ms']),
+		)
+		process = subprocess.Popen(
+			[
+				sys.executable, '-m', 'gunicorn', app, *worker_args,
+				'--workers', str(workers), '--bind', f"127.0.0.1:{options['port']}",
+				'--config', 'python:bookings.benchmarks', '--timeout', '120', '--log-level', 'warning',
+			],
+			env=env,
+		)
+		return _Server(process, options['port'])
+
+
+class _Server:
+	"""Context manager that waits for a gunicorn server to listen and stops it."""
+
+	def __init__(self, process, port):
+		self.process, self.port = process, port
+
+	def __enter__(self):
+		deadline = time.monotonic() + 30
+		while time.monotonic() < deadline:
+			if self.process.poll() is not None:
+				raise CommandError('gunicorn exited; is uvicorn installed for the async mode?')
+			try:
+				socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+				return self.process
+			except OSError:
+				time.sleep(0.2)
+		self.__exit__()
+		raise CommandError('gunicorn did not start listening within 30 seconds')
+
+	def __exit__(self, *exc):
+		self.process.send_signal(signal.SIGTERM)
+		self.process.wait()
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction, OperationalError
+from django.utils import timezone
+
+from bookings.models import TravelOption
+
+
+def legacy_book_seats(travel_option_id, num_seats):
+	"""The original lock, re-read and full-row save booking path."""
+	with transaction.atomic():
+		travel_option = TravelOption.objects.select_for_update().get(id=travel_option_id)
+		if travel_option.available_seats >= num_seats:
+			travel_option.set_available_seats(travel_option.available_seats - num_seats)
+			travel_option.save()
+			return True
+		return False
+
+
+def conditional_book_seats(travel_option_id, num_seats):
+	"""The single-statement reservation used by TravelOption.book_seats."""
+	return TravelOption(pk=travel_option_id, available_seats=0).book_seats(num_seats)
+
+
+STRATEGIES = {
+	'legacy': legacy_book_seats,
+	'conditional': conditional_book_seats,
+}
+
+
+class Command(BaseCommand):
+	help = 'Benchmark bookings/sec against a single hot travel option'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--strategy', choices=['legacy', 'conditional', 'both'], default='both')
+		parser.add_argument('--threads', type=int, default=8)
+		parser.add_argument('--bookings', type=int, default=2000)
+		parser.add_argument('--seats', type=int, default=1, help='Seats reserved per booking')
+		parser.add_argument('--retries', type=int, default=20, help='Retries per booking on lock errors')
+
+	def handle(self, *args, **options):
+		if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in (':memory:', ''):
+			raise CommandError('Use a file-based or server database; in-memory SQLite is per-connection.')
+
+		strategies = ['legacy', 'conditional'] if options['strategy'] == 'both' else [options['strategy']]
+		for name in strategies:
+			self.run_strategy(name, options)
+
+	def run_strategy(self, name, options):
+		book = STRATEGIES[name]
+		total = options['bookings']
+		num_seats = options['seats']
+		travel_option = TravelOption.objects.create(
+			type='flight',
+			title=f'Contention benchmark ({name})',
+			source='Benchmark City',
+			destination='Hot Route',
+			departure_datetime=timezone.now() + timedelta(days=30),
+			price=Decimal('100.00'),
+			available_seats=total * num_seats,
+		)
+
+		def worker(_):
+			for attempt in range(options['retries'] + 1):
+				try:
+					return book(travel_option.pk, num_seats), attempt
+				except OperationalError:
+					time.sleep(0.001 * (attempt + 1))
+			return False, options['retries']
+
+		try:
+			started = time.perf_counter()
+			with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+				results = list(pool.map(worker, range(total)))
+			elapsed = time.perf_counter() - started
+		finally:
+			travel_option.refresh_from_db()
+			remaining = travel_option.available_seats
+			travel_option.delete()
+
+		booked = sum(1 for ok, _ in results if ok)
+		retries = sum(attempts for _, attempts in results)
+		self.stdout.write(
+			f'{name:<12} {booked}/{total} bookings in {elapsed:.2f}s '
+			f'({booked / elapsed:.0f} bookings/sec, {retries} retries, '
+			f'{remaining} seats left)'
+		)
+		if remaining != (total - booked) * num_seats:
+			self.stdout.write(self.style.ERROR('Seat count does not match successful bookings!'))
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.template import engines
+from django.test import RequestFactory
+
+# The per-page loop the list templates used before the pagination tag
+LEGACY_TEMPLATE = """
+{% for num in page_obj.paginator.page_range %}
+{% if page_obj.number == num %}
+<li class="page-item active"><span class="page-link">{{ num }}</span></li>
+{% elif num > page_obj.number|add:'-3' and num < page_obj.number|add:'3' %}
+<li class="page-item"><a class="page-link" href="?page={{ num }}{% for key, value in request.GET.items %}{% if key != 'page' %}&{{ key }}={{ value }}{% endif %}{% endfor %}">{{ num }}</a></li>
+{% endif %}
+{% endfor %}
+"""
+
+WINDOWED_TEMPLATE = """{% load pagination_tags %}{% pagination page_obj %}"""
+
+
+class Command(BaseCommand):
+	help = 'Benchmark pagination rendering for large result sets'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--results', type=int, nargs='+', default=[1000, 100000, 1000000])
+		parser.add_argument('--per-page', type=int, default=12)
+		parser.add_argument('--iterations', type=int, default=50)
+
+	def handle(self, *args, **options):
+		engine = engines['django']
+		templates = {
+			'legacy': engine.from_string(LEGACY_TEMPLATE),
+			'windowed': engine.from_string(WINDOWED_TEMPLATE),
+		}
+		request = RequestFactory().get('/travel/', {
+			'type': 'flight', 'source': 'New York', 'destination': 'London',
+			'min_price': '100', 'max_price': '900',
+		})
+
+		for results in options['results']:
+			paginator = Paginator(range(results), options['per_page'])
+			page_obj = paginator.get_page(paginator.num_pages // 2)
+			context = {'page_obj': page_obj, 'request': request}
+
+			timings = {}
+			for name, template in templates.items():
+				started = time.perf_counter()
+				for _ in range(options['iterations']):
+					template.render(context, request)
+				timings[name] = (time.perf_counter() - started) / options['iterations'] * 1000
+
+			self.stdout.write(
+				f'{results:>9} results ({paginator.num_pages} pages): '
+				f"legacy {timings['legacy']:.2f} ms, windowed {timings['windowed']:.2f} ms"
+			)
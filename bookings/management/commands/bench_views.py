@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment
+
+from bookings.benchmarks import (
+	BASELINE_PATH, scenarios, run_scenario, percentiles, load_baseline, write_baseline,
+)
+from bookings.models import Booking
+from bookings.search import build_travel_queryset
+
+
+class Command(BaseCommand):
+	help = 'Benchmark the main views against a seeded database and enforce query budgets'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--iterations', type=int, default=50)
+		parser.add_argument('--baseline', default=str(BASELINE_PATH))
+		parser.add_argument(
+			'--max-regression', type=float, default=None,
+			help='Also fail when p95 latency exceeds the baseline by this percentage',
+		)
+		parser.add_argument(
+			'--write-baseline', action='store_true',
+			help='Record the measured query counts and latencies as the new baseline',
+		)
+
+	def handle(self, *args, **options):
+		travel_option = build_travel_queryset().filter(inventory__available_seats__gte=options['iterations']).first()
+		booking = Booking.objects.select_related('user').order_by('-id').first()
+		if travel_option is None or booking is None:
+			raise CommandError('Seed the database first: manage.py seed_travel_options --generate')
+
+		setup_test_environment()
+		anonymous, logged_in = Client(), Client()
+		logged_in.force_login(booking.user)
+		baseline = {} if options['write_baseline'] else load_baseline(options['baseline'])
+
+		results, failures = {}, []
+		self.stdout.write(f"{'view':<20} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+		for name, method, url, data, login_required in scenarios(travel_option, booking):
+			cache.clear()
+			client = logged_in if login_required else anonymous
+			latencies, queries = run_scenario(client, method, url, data, options['iterations'])
+			stats = percentiles(latencies)
+			results[name] = {'queries': queries, 'p95_ms': stats['p95']}
+			self.stdout.write(
+				f"{name:<20} {queries:>7} {stats['p50']:>8} {stats['p95']:>8} {stats['p99']:>8}"
+			)
+
+			if name not in baseline:
+				continue
+			if queries > baseline[name]['queries']:
+				failures.append(f"{name}: {queries} queries, budget is {baseline[name]['queries']}")
+			limit = options['max_regression']
+			if limit is not None and stats['p95'] > baseline[name]['p95_ms'] * (1 + limit / 100):
+				failures.append(f"{name}: p95 {stats['p95']} ms, baseline is {baseline[name]['p95_ms']} ms")
+
+		if options['write_baseline']:
+			write_baseline(results, options['baseline'])
+			self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+		if failures:
+			raise CommandError('Benchmark budget exceeded:\n' + '\n'.join(failures))
+		self.stdout.write(self.style.SUCCESS('All views within budget.'))
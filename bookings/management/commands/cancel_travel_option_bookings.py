@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import TravelOption
+from bookings.services import BULK_CANCEL_CHUNK_SIZE, cancel_travel_option_bookings
+
+
+class Command(BaseCommand):
+	help = 'Cancel every confirmed booking on disrupted travel options and restore their seats'
+
+	def add_arguments(self, parser):
+		parser.add_argument('travel_option_ids', nargs='+', type=int)
+		parser.add_argument('--chunk-size', type=int, default=BULK_CANCEL_CHUNK_SIZE, help='Bookings per UPDATE')
+
+	def handle(self, *args, **options):
+		ids = options['travel_option_ids']
+		titles = dict(TravelOption.objects.filter(pk__in=ids).values_list('id', 'title'))
+		missing = sorted(set(ids) - set(titles))
+		if missing:
+			raise CommandError(f"Travel option(s) not found: {', '.join(map(str, missing))}")
+
+		cancelled = cancel_travel_option_bookings(ids, options['chunk_size'])
+		for travel_option_id, count in cancelled.items():
+			self.stdout.write(f'{titles[travel_option_id]}: cancelled {count} booking(s)')
+		self.stdout.write(self.style.SUCCESS(f'Cancelled {sum(cancelled.values())} booking(s) in total'))
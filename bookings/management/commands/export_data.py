@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.exports import EXPORTS, EXPORT_CHUNK_SIZE, export_lines
+from bookings.forms import ExportFilterForm
+
+
+class Command(BaseCommand):
+	help = 'Stream bookings or travel options to a CSV or NDJSON file'
+
+	def add_arguments(self, parser):
+		parser.add_argument('dataset', choices=sorted(EXPORTS))
+		parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+		parser.add_argument('--from', dest='date_from', help='First date (YYYY-MM-DD), inclusive')
+		parser.add_argument('--to', dest='date_to', help='Last date (YYYY-MM-DD), inclusive')
+		parser.add_argument('--status', help='Booking status (bookings only)')
+		parser.add_argument('--type', help='Travel type')
+		parser.add_argument('--output', '-o', help='File to write; defaults to stdout')
+		parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+	def handle(self, *args, **options):
+		form = ExportFilterForm({
+			name: options[name]
+			for name in ('format', 'date_from', 'date_to', 'status', 'type')
+			if options[name]
+		})
+		if not form.is_valid():
+			raise CommandError(form.errors.as_text())
+
+		lines, _ = export_lines(options['dataset'], form.cleaned_data, options['chunk_size'])
+		if options['output']:
+			with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+				output.writelines(lines)
+			self.stderr.write(self.style.SUCCESS(f"Export written to {options['output']}"))
+		else:
+			for line in lines:
+				self.stdout.write(line, ending='')
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.importers import IMPORT_BATCH_SIZE, IMPORT_FIELDS, import_travel_options, read_rows
+
+
+class Command(BaseCommand):
+	help = 'Stream a CSV or NDJSON timetable into travel options, upserting on (title, departure_datetime)'
+
+	def add_arguments(self, parser):
+		parser.add_argument('path', help=f"File with columns: {', '.join(IMPORT_FIELDS)}")
+		parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+		parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+		parser.add_argument('--max-errors', type=int, default=None, help='Stop after this many invalid rows')
+
+	def handle(self, *args, **options):
+		started = time.perf_counter()
+
+		def progress(result):
+			if options['verbosity'] > 1:
+				elapsed = time.perf_counter() - started
+				self.stdout.write(f"  {result['imported']} rows imported ({result['imported'] / elapsed:.0f} rows/sec)")
+
+		try:
+			result = import_travel_options(
+				read_rows(options['path'], options['format']),
+				batch_size=options['batch_size'],
+				max_errors=options['max_errors'],
+				on_batch=progress,
+			)
+		except OSError as e:
+			raise CommandError(f'Cannot read {options["path"]}: {e}')
+		elapsed = time.perf_counter() - started
+
+		for line_number, message in result['errors'][:20]:
+			self.stderr.write(f'Line {line_number}: {message}')
+		if len(result['errors']) > 20:
+			self.stderr.write(f"... and {len(result['errors']) - 20} more invalid rows")
+
+		summary = (
+			f"Read {result['rows']} rows, imported {result['imported']}, "
+			f"rejected {len(result['errors'])} in {elapsed:.1f}s ({result['rows'] / max(elapsed, 1e-9):.0f} rows/sec)"
+		)
+		if result['aborted']:
+			raise CommandError(f'Too many invalid rows, stopped early. {summary}')
+		self.stdout.write(self.style.SUCCESS(summary))
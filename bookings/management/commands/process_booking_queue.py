@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.services import pending_travel_option_ids, process_booking_queue
+
+
+class Command(BaseCommand):
+	help = 'Drain queued booking requests in batches, one writer per travel option'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--batch-size', type=int, default=None, help='Defaults to BOOKING_QUEUE_BATCH_SIZE')
+		parser.add_argument('--loop', action='store_true', help='Keep draining until interrupted')
+		parser.add_argument('--interval', type=float, default=0.05, help='Seconds to sleep when the queue is empty')
+		parser.add_argument('--shard', type=int, default=0, help='Only serve travel options where id %% shards == shard')
+		parser.add_argument('--shards', type=int, default=1, help='Number of worker processes sharing the queue')
+
+	def handle(self, *args, **options):
+		if not 0 <= options['shard'] < options['shards']:
+			raise CommandError('--shard must be between 0 and --shards - 1')
+
+		while True:
+			confirmed = rejected = 0
+			for travel_option_id in pending_travel_option_ids():
+				if travel_option_id % options['shards'] != options['shard']:
+					continue
+				batch = process_booking_queue(travel_option_id, options['batch_size'])
+				confirmed += batch[0]
+				rejected += batch[1]
+
+			if confirmed or rejected or not options['loop']:
+				self.stdout.write(self.style.SUCCESS(f'Confirmed {confirmed}, rejected {rejected} booking request(s)'))
+			if not options['loop']:
+				return
+			if not confirmed and not rejected:
+				try:
+					time.sleep(options['interval'])
+				except KeyboardInterrupt:
+					return
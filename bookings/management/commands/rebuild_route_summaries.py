@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from bookings.summaries import rebuild_route_summaries
+
+
+class Command(BaseCommand):
+	help = 'Recompute the precomputed route summaries from the travel catalog'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--from', dest='date_from', help='First departure date to rebuild (YYYY-MM-DD)')
+		parser.add_argument('--to', dest='date_to', help='Last departure date to rebuild (YYYY-MM-DD)')
+
+	def handle(self, *args, **options):
+		dates = {}
+		for name in ('date_from', 'date_to'):
+			if options[name]:
+				dates[name] = parse_date(options[name])
+				if dates[name] is None:
+					raise CommandError(f"--{name[5:]} must be a date in YYYY-MM-DD format")
+
+		started = time.perf_counter()
+		rows = rebuild_route_summaries(**dates)
+		self.stdout.write(self.style.SUCCESS(
+			f'Rebuilt {rows} route summary row(s) in {time.perf_counter() - started:.1f}s'
+		))
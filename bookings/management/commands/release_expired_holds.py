@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.services import release_expired_holds
+
+
+class Command(BaseCommand):
+	help = 'Release expired seat holds back to their travel options'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--loop', action='store_true', help='Keep sweeping until interrupted')
+		parser.add_argument('--interval', type=float, default=30, help='Seconds between sweeps with --loop')
+
+	def handle(self, *args, **options):
+		while True:
+			seats = release_expired_holds()
+			if seats or not options['loop']:
+				self.stdout.write(self.style.SUCCESS(f'Released {seats} seat(s) from expired holds'))
+			if not options['loop']:
+				return
+			try:
+				time.sleep(options['interval'])
+			except KeyboardInterrupt:
+				return
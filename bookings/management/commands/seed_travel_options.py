@@ -1,14 +1,79 @@
-from django.core.management.base import BaseCommand
-from django.utils import timezone
-from decimal import Decimal
+import random
+import time
+from array import array
+from bisect import bisect
 from datetime import timedelta
-from bookings.models import TravelOption
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from bookings import signals, summaries
+from bookings.models import TravelOption, Booking, Location, SeatInventory, SeatHold, BookingRequest
+
+REAL_CITIES = [
+	'New York', 'London', 'Paris', 'Tokyo', 'Chicago', 'Los Angeles', 'Berlin', 'Munich',
+	'Lyon', 'Boston', 'Osaka', 'Washington DC', 'Manchester', 'Hamburg', 'Birmingham',
+	'Liverpool', 'San Francisco', 'Madrid', 'Barcelona', 'Rome', 'Milan', 'Amsterdam',
+	'Brussels', 'Vienna', 'Prague', 'Zurich', 'Dublin', 'Lisbon', 'Toronto', 'Montreal',
+	'Seattle', 'Miami', 'Dallas', 'Denver', 'Delhi', 'Mumbai', 'Singapore', 'Sydney',
+	'Dubai', 'Seoul',
+]
+SYLLABLES = ['ka', 'lo', 'mir', 'sen', 'dor', 'vel', 'tan', 'ri', 'bor', 'nal', 'os', 'ten', 'mar', 'quin', 'zel']
+
+# Per type: title prefix, capacity, price range per route in dollars,
+# duration range per route in minutes
+TYPE_PROFILES = {
+	'flight': ('FL', 180, (80, 1500), (60, 720)),
+	'train': ('TR', 300, (20, 250), (45, 360)),
+	'bus': ('BS', 50, (10, 90), (60, 600)),
+}
+SYNTHETIC_USER_PREFIX = 'seeduser'
+
+
+def synthetic_city_names(count, rng):
+	"""Return ``count`` distinct city names, real ones first."""
+	names = list(REAL_CITIES[:count])
+	seen = {name.lower() for name in names}
+	while len(names) < count:
+		name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+		name = f'{name} {len(names)}'
+		if name.lower() not in seen:
+			seen.add(name.lower())
+			names.append(name)
+	return names
 
 
 class Command(BaseCommand):
-	help = 'Seed the database with sample travel options'
+	help = 'Seed the database with sample travel options, or generate a large synthetic dataset'
+
+	def add_arguments(self, parser):
+		parser.add_argument(
+			'--generate', action='store_true',
+			help='Generate a deterministic synthetic dataset instead of the sample rows',
+		)
+		parser.add_argument('--seed', type=int, default=42, help='Random seed (same seed, same data)')
+		parser.add_argument('--scale', type=float, default=1.0, help='Multiplier for all generated counts')
+		parser.add_argument('--options', type=int, default=1_000_000, help='Travel options at scale 1')
+		parser.add_argument('--routes', type=int, default=5_000, help='Routes at scale 1')
+		parser.add_argument('--users', type=int, default=10_000, help='Users at scale 1')
+		parser.add_argument('--bookings', type=int, default=500_000, help='Bookings at scale 1')
+		parser.add_argument('--days', type=int, default=180, help='Departures are spread over this many days')
+		parser.add_argument(
+			'--skew', type=float, default=1.1,
+			help='Zipf exponent for route popularity (0 = uniform)',
+		)
+		parser.add_argument('--cancelled-ratio', type=float, default=0.1)
+		parser.add_argument('--chunk-size', type=int, default=5_000, help='Rows per bulk_create/transaction')
 
 	def handle(self, *args, **options):
+		if options['generate']:
+			return self.generate(options)
+
 		self.stdout.write('Creating sample travel options...')
 
 		# Clear existing travel options
@@ -23,6 +88,7 @@ class Command(BaseCommand):
 				'source': 'New York',
 				'destination': 'London',
 				'departure_datetime': timezone.now() + timedelta(days=2),
+				'arrival_datetime': timezone.now() + timedelta(days=2, hours=7),
 				'price': Decimal('850.00'),
 				'available_seats': 150,
 			},
@@ -32,6 +98,7 @@ class Command(BaseCommand):
 				'source': 'London',
 				'destination': 'Paris',
 				'departure_datetime': timezone.now() + timedelta(days=1),
+				'arrival_datetime': timezone.now() + timedelta(days=1, hours=1, minutes=15),
 				'price': Decimal('320.00'),
 				'available_seats': 120,
 			},
@@ -41,6 +108,7 @@ class Command(BaseCommand):
 				'source': 'Berlin',
 				'destination': 'Rome',
 				'departure_datetime': timezone.now() + timedelta(days=3),
+				'arrival_datetime': timezone.now() + timedelta(days=3, hours=2, minutes=10),
 				'price': Decimal('450.00'),
 				'available_seats': 80,
 			},
@@ -50,6 +118,7 @@ class Command(BaseCommand):
 				'source': 'Paris',
 				'destination': 'Tokyo',
 				'departure_datetime': timezone.now() + timedelta(days=5),
+				'arrival_datetime': timezone.now() + timedelta(days=5, hours=14),
 				'price': Decimal('1200.00'),
 				'available_seats': 200,
 			},
@@ -59,6 +128,7 @@ class Command(BaseCommand):
 				'source': 'Chicago',
 				'destination': 'Los Angeles',
 				'departure_datetime': timezone.now() + timedelta(days=1),
+				'arrival_datetime': timezone.now() + timedelta(days=1, hours=4, minutes=30),
 				'price': Decimal('280.00'),
 				'available_seats': 180,
 			},
@@ -70,6 +140,7 @@ class Command(BaseCommand):
 				'source': 'London',
 				'destination': 'Paris',
 				'departure_datetime': timezone.now() + timedelta(days=2),
+				'arrival_datetime': timezone.now() + timedelta(days=2, hours=2, minutes=20),
 				'price': Decimal('120.00'),
 				'available_seats': 300,
 			},
@@ -79,6 +150,7 @@ class Command(BaseCommand):
 				'source': 'Berlin',
 				'destination': 'Munich',
 				'departure_datetime': timezone.now() + timedelta(days=1),
+				'arrival_datetime': timezone.now() + timedelta(days=1, hours=4),
 				'price': Decimal('85.00'),
 				'available_seats': 250,
 			},
@@ -88,6 +160,7 @@ class Command(BaseCommand):
 				'source': 'Paris',
 				'destination': 'Lyon',
 				'departure_datetime': timezone.now() + timedelta(days=3),
+				'arrival_datetime': timezone.now() + timedelta(days=3, hours=2),
 				'price': Decimal('65.00'),
 				'available_seats': 200,
 			},
@@ -97,6 +170,7 @@ class Command(BaseCommand):
 				'source': 'New York',
 				'destination': 'Boston',
 				'departure_datetime': timezone.now() + timedelta(days=1),
+				'arrival_datetime': timezone.now() + timedelta(days=1, hours=3, minutes=30),
 				'price': Decimal('95.00'),
 				'available_seats': 150,
 			},
@@ -106,6 +180,7 @@ class Command(BaseCommand):
 				'source': 'Tokyo',
 				'destination': 'Osaka',
 				'departure_datetime': timezone.now() + timedelta(days=2),
+				'arrival_datetime': timezone.now() + timedelta(days=2, hours=2, minutes=30),
 				'price': Decimal('130.00'),
 				'available_seats': 400,
 			},
@@ -117,6 +192,7 @@ class Command(BaseCommand):
 				'source': 'New York',
 				'destination': 'Washington DC',
 				'departure_datetime': timezone.now() + timedelta(days=1),
+				'arrival_datetime': timezone.now() + timedelta(days=1, hours=4, minutes=30),
 				'price': Decimal('45.00'),
 				'available_seats': 50,
 			},
@@ -126,6 +202,7 @@ class Command(BaseCommand):
 				'source': 'London',
 				'destination': 'Manchester',
 				'departure_datetime': timezone.now() + timedelta(days=2),
+				'arrival_datetime': timezone.now() + timedelta(days=2, hours=4, minutes=30),
 				'price': Decimal('25.00'),
 				'available_seats': 60,
 			},
@@ -135,6 +212,7 @@ class Command(BaseCommand):
 				'source': 'Berlin',
 				'destination': 'Hamburg',
 				'departure_datetime': timezone.now() + timedelta(days=1),
+				'arrival_datetime': timezone.now() + timedelta(days=1, hours=3),
 				'price': Decimal('35.00'),
 				'available_seats': 45,
 			},
@@ -144,6 +222,7 @@ class Command(BaseCommand):
 				'source': 'Birmingham',
 				'destination': 'Liverpool',
 				'departure_datetime': timezone.now() + timedelta(days=3),
+				'arrival_datetime': timezone.now() + timedelta(days=3, hours=2, minutes=30),
 				'price': Decimal('20.00'),
 				'available_seats': 40,
 			},
@@ -153,6 +232,7 @@ class Command(BaseCommand):
 				'source': 'Los Angeles',
 				'destination': 'San Francisco',
 				'departure_datetime': timezone.now() + timedelta(days=2),
+				'arrival_datetime': timezone.now() + timedelta(days=2, hours=7, minutes=30),
 				'price': Decimal('55.00'),
 				'available_seats': 55,
 			},
@@ -178,3 +258,227 @@ class Command(BaseCommand):
 		self.stdout.write(f'Flights: {flight_count}')
 		self.stdout.write(f'Trains: {train_count}')
 		self.stdout.write(f'Buses: {bus_count}')
+
+
+	def generate(self, options):
+		"""Generate options, users and bookings with skewed route popularity."""
+		scale = options['scale']
+		num_options = int(options['options'] * scale)
+		num_routes = max(1, min(int(options['routes'] * scale), num_options))
+		num_users = max(1, int(options['users'] * scale))
+		num_bookings = int(options['bookings'] * scale)
+		self.chunk_size = options['chunk_size']
+		if num_options < 1:
+			raise CommandError('Nothing to generate; increase --options or --scale.')
+
+		rng = random.Random(options['seed'])
+		started = time.perf_counter()
+
+		self.stdout.write('Clearing existing travel options and synthetic users...')
+		old_routes = self.clear_catalog()
+		User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX).delete()
+
+		# Routes: distinct (type, source, destination), popularity ~ 1 / rank^skew
+		num_cities = max(2, min(int(num_routes ** 0.5 * 2), 20_000))
+		cities = synthetic_city_names(num_cities, rng)
+		location_ids = self.create_locations(cities)
+		routes, seen = [], set()
+		while len(routes) < num_routes:
+			source, destination = rng.sample(range(num_cities), 2)
+			travel_type = rng.choice(list(TYPE_PROFILES))
+			if (travel_type, source, destination) in seen:
+				continue
+			seen.add((travel_type, source, destination))
+			low, high = TYPE_PROFILES[travel_type][2]
+			shortest, longest = TYPE_PROFILES[travel_type][3]
+			routes.append((travel_type, source, destination, rng.uniform(low, high), rng.randint(shortest, longest)))
+		weights = [1 / (rank + 1) ** options['skew'] for rank in range(num_routes)]
+		cum_weights = list(accumulate(weights))
+
+		# Options per route follow popularity too; each route gets at least one
+		counts = [1] * num_routes
+		spare = num_options - num_routes
+		for route in range(num_routes):
+			counts[route] += int(spare * weights[route] / cum_weights[-1])
+		for i in range(num_options - sum(counts)):
+			counts[i % num_routes] += 1
+		route_starts = [0] + list(accumulate(counts))
+
+		# Plan bookings first so seat counts can be written with each option
+		booked = array('I', bytes(4 * num_options))
+		plan = []
+		for _ in range(num_bookings):
+			route = bisect(cum_weights, rng.random() * cum_weights[-1])
+			option = rng.randrange(route_starts[route], route_starts[route + 1])
+			capacity = TYPE_PROFILES[routes[route][0]][1]
+			num_seats = rng.choices((1, 2, 3, 4), weights=(60, 25, 10, 5))[0]
+			cancelled = rng.random() < options['cancelled_ratio']
+			if not cancelled:
+				if booked[option] + num_seats > capacity:
+					continue
+				booked[option] += num_seats
+			booked_minutes_ago = rng.randrange(options['days'] * 1440)
+			plan.append((option, rng.randrange(num_users), num_seats, cancelled, booked_minutes_ago))
+
+		option_ids, prices = self.create_travel_options(
+			routes, route_starts, booked, cities, location_ids, options['days'], rng
+		)
+		user_ids = self.create_users(num_users)
+		self.create_bookings(plan, option_ids, user_ids, prices)
+
+		# bulk_create skips signals, so invalidate derived data explicitly
+		new_routes = {
+			(location_ids[cities[source]], location_ids[cities[destination]])
+			for _, source, destination, _, _ in routes
+		}
+		signals.invalidate_travel_options(old_routes | new_routes)
+		summaries.rebuild_route_summaries()
+
+		elapsed = time.perf_counter() - started
+		total_rows = num_options + num_users + len(plan)
+		self.stdout.write(
+			self.style.SUCCESS(
+				f'Generated {num_options} travel options on {num_routes} routes, '
+				f'{num_users} users and {len(plan)} bookings in {elapsed:.1f}s '
+				f'({total_rows / elapsed:.0f} rows/sec)'
+			)
+		)
+
+	def clear_catalog(self):
+		"""Delete every travel option and the rows depending on it; return their routes.
+
+		Children go first so the option deletes have nothing left to cascade,
+		and the per-option delete receiver is muted; the caller invalidates
+		caches and rebuilds summaries once at the end.
+		"""
+		routes = set(
+			TravelOption.objects.filter(source_location__isnull=False, destination_location__isnull=False)
+			.values_list('source_location_id', 'destination_location_id').distinct().order_by()
+		)
+		for model in (BookingRequest, SeatHold, SeatInventory):
+			model.objects.all().delete()
+		with signals.travel_option_deletes_muted():
+			for model in (Booking, TravelOption):
+				self.delete_in_chunks(model)
+		return routes
+
+	def delete_in_chunks(self, model):
+		"""Delete every row of ``model``, one chunk of primary keys per transaction.
+
+		Bookings and options have reverse relations, so the collector loads
+		the rows it deletes; chunking keeps that bounded.
+		"""
+		queryset = model.objects.order_by('pk').values_list('pk', flat=True)
+		while True:
+			with transaction.atomic():
+				ids = list(queryset[:self.chunk_size])
+				if not ids:
+					break
+				model.objects.filter(pk__in=ids).delete()
+
+	def bulk_insert(self, model, objs):
+		"""bulk_create ``objs`` in chunks, one transaction per chunk."""
+		created = []
+		for start in range(0, len(objs), self.chunk_size):
+			with transaction.atomic():
+				created.extend(model.objects.bulk_create(objs[start:start + self.chunk_size]))
+		return created
+
+	def create_locations(self, cities):
+		slugs = {Location.normalize(name): name for name in cities}
+		existing = set(Location.objects.filter(slug__in=slugs).values_list('slug', flat=True))
+		self.bulk_insert(Location, [
+			Location(name=name, slug=slug) for slug, name in slugs.items() if slug not in existing
+		])
+		ids = dict(Location.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+		return {name: ids[slug] for slug, name in slugs.items()}
+
+	def create_travel_options(self, routes, route_starts, booked, cities, location_ids, days, rng):
+		self.stdout.write(f'Creating {len(booked)} travel options...')
+		now = timezone.now().replace(second=0, microsecond=0)
+		option_ids = array('q')
+		prices = array('I')
+		batch = []
+		for route, (travel_type, source, destination, base_price, minutes) in enumerate(routes):
+			prefix, capacity, _, _ = TYPE_PROFILES[travel_type]
+			for option in range(route_starts[route], route_starts[route + 1]):
+				price_cents = int(base_price * rng.uniform(0.7, 1.6) * 100)
+				prices.append(price_cents)
+				departure = now + timedelta(minutes=5 * rng.randrange(1, days * 288))
+				batch.append(TravelOption(
+					type=travel_type,
+					title=f'{prefix}-{option + 1:07d}',
+					source=cities[source],
+					destination=cities[destination],
+					source_location_id=location_ids[cities[source]],
+					destination_location_id=location_ids[cities[destination]],
+					departure_datetime=departure,
+					arrival_datetime=departure + timedelta(minutes=minutes),
+					price=Decimal(price_cents) / 100,
+					available_seats=capacity - booked[option],
+				))
+				if len(batch) >= self.chunk_size:
+					option_ids.extend(self.insert_travel_options(batch))
+					batch = []
+		option_ids.extend(self.insert_travel_options(batch))
+		return option_ids, prices
+
+	def insert_travel_options(self, batch):
+		"""Insert a chunk of options with their seat inventory and return their ids in order."""
+		if not batch:
+			return []
+		with transaction.atomic():
+			TravelOption.objects.bulk_create(batch)
+			if batch[0].pk is None:
+				# Backends that don't return ids (MySQL): look them up by title
+				ids = dict(TravelOption.objects.filter(
+					title__in=[option.title for option in batch]
+				).values_list('title', 'id'))
+				option_ids = [ids[option.title] for option in batch]
+			else:
+				option_ids = [option.pk for option in batch]
+			SeatInventory.objects.bulk_create([
+				SeatInventory(travel_option_id=option_id, available_seats=option.available_seats)
+				for option_id, option in zip(option_ids, batch)
+			])
+		return option_ids
+
+	def create_users(self, num_users):
+		self.stdout.write(f'Creating {num_users} users...')
+		password = make_password('password123')
+		self.bulk_insert(User, [
+			User(
+				username=f'{SYNTHETIC_USER_PREFIX}{i:07d}',
+				email=f'{SYNTHETIC_USER_PREFIX}{i:07d}@example.com',
+				password=password,
+			)
+			for i in range(num_users)
+		])
+		return list(
+			User.objects.filter(username__startswith=SYNTHETIC_USER_PREFIX)
+			.order_by('username').values_list('id', flat=True)
+		)
+
+	def create_bookings(self, plan, option_ids, user_ids, prices):
+		self.stdout.write(f'Creating {len(plan)} bookings...')
+		now = timezone.now().replace(second=0, microsecond=0)
+		for start in range(0, len(plan), self.chunk_size):
+			chunk = plan[start:start + self.chunk_size]
+			with transaction.atomic():
+				bookings = Booking.objects.bulk_create([
+					Booking(
+						user_id=user_ids[user],
+						travel_option_id=option_ids[option],
+						num_seats=num_seats,
+						total_price=Decimal(prices[option] * num_seats) / 100,
+						status='cancelled' if cancelled else 'confirmed',
+					)
+					for option, user, num_seats, cancelled, _ in chunk
+				])
+				# booking_date is auto_now_add, so the insert stamps every row with
+				# the same time; backdate them afterwards. Backends that don't
+				# return ids (MySQL) keep the insert time.
+				if bookings and bookings[0].pk is not None:
+					for booking, (*_, booked_minutes_ago) in zip(bookings, chunk):
+						booking.booking_date = now - timedelta(minutes=booked_minutes_ago)
+					Booking.objects.bulk_update(bookings, ['booking_date'])
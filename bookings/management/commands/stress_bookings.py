@@ -0,0 +1,201 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction, OperationalError
+from django.db.models import Sum
+from django.utils import timezone
+
+from bookings.models import TravelOption, Booking, SeatHold
+
+STRESS_TITLE = 'Stress test'
+STRESS_USER_PREFIX = 'stressuser'
+
+
+def timed_updates(totals):
+	"""Execute wrapper adding the time spent in UPDATE statements to ``totals``.
+
+	Seat changes are UPDATEs, so this is where workers block on row locks.
+	"""
+	def wrapper(execute, sql, params, many, context):
+		if not sql.lstrip().upper().startswith('UPDATE'):
+			return execute(sql, params, many, context)
+		started = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			totals[0] += time.perf_counter() - started
+	return wrapper
+
+
+def run_operation(args):
+	"""Run one book or cancel operation, retrying on lock errors.
+
+	Returns ``(kind, outcome, latency, lock_wait, retries)`` where lock_wait
+	is the time spent in UPDATE statements plus failed attempts and backoff.
+	"""
+	update_time = [0.0]
+	with connection.execute_wrapper(timed_updates(update_time)):
+		kind, outcome, latency, retry_wait, retries = _run_operation(args)
+	return kind, outcome, latency, retry_wait + update_time[0], retries
+
+
+def _run_operation(args):
+	"""Retry lock errors raised before the commit only.
+
+	An error from an on_commit hook comes after the booking or cancellation
+	is durable; retrying it would book twice or cancel another booking.
+	"""
+	seed, option_ids, user_ids, cancel_ratio, max_seats, max_retries = args
+	rng = random.Random(seed)
+	kind = 'cancel' if rng.random() < cancel_ratio else 'book'
+	travel_option_id = rng.choice(option_ids)
+
+	started = time.perf_counter()
+	lock_wait = 0.0
+	for attempt in range(max_retries + 1):
+		attempt_started = time.perf_counter()
+		committed = []
+		try:
+			# Reads stay outside the transaction so SQLite starts it with a write
+			if kind == 'book':
+				booking = Booking(
+					user_id=rng.choice(user_ids),
+					travel_option=TravelOption.objects.get(pk=travel_option_id),
+					num_seats=rng.randint(1, max_seats),
+				)
+			else:
+				booking = Booking.objects.filter(
+					travel_option_id=travel_option_id, status='confirmed'
+				).select_related('travel_option').order_by('?').first()
+			with transaction.atomic():
+				# Registered first, so it runs before any hook that might fail
+				transaction.on_commit(lambda: committed.append(True))
+				if kind == 'book':
+					try:
+						booking.save()
+						outcome = 'ok'
+					except ValueError:
+						outcome = 'rejected'
+				else:
+					outcome = 'ok' if booking and booking.cancel() else 'noop'
+			return kind, outcome, time.perf_counter() - started, lock_wait, attempt
+		except OperationalError:
+			if committed:
+				return kind, outcome, time.perf_counter() - started, lock_wait, attempt
+			time.sleep(0.002 * (attempt + 1) * rng.random())
+			lock_wait += time.perf_counter() - attempt_started
+	return kind, 'error', time.perf_counter() - started, lock_wait, max_retries
+
+
+class Command(BaseCommand):
+	help = 'Fire concurrent book/cancel operations at a few travel options and verify seat inventory'
+
+	def add_arguments(self, parser):
+		parser.add_argument('--operations', type=int, default=5000)
+		parser.add_argument('--workers', type=int, default=16)
+		parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+		parser.add_argument('--options', type=int, default=3, help='Number of hot travel options')
+		parser.add_argument('--capacity', type=int, default=500, help='Seats per travel option')
+		parser.add_argument('--users', type=int, default=50)
+		parser.add_argument('--cancel-ratio', type=float, default=0.3)
+		parser.add_argument('--max-seats', type=int, default=3)
+		parser.add_argument('--retries', type=int, default=20)
+		parser.add_argument('--seed', type=int, default=1)
+		parser.add_argument('--keep', action='store_true', help='Keep the stress test rows afterwards')
+
+	def handle(self, *args, **options):
+		if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in (':memory:', ''):
+			raise CommandError('Use a file-based SQLite database or MySQL; in-memory SQLite is per-connection.')
+
+		option_ids = [
+			TravelOption.objects.create(
+				type='flight',
+				title=f'{STRESS_TITLE} {i + 1}',
+				source='Stress City',
+				destination=f'Hot Route {i + 1}',
+				departure_datetime=timezone.now() + timedelta(days=30),
+				price=Decimal('100.00'),
+				available_seats=options['capacity'],
+			).pk
+			for i in range(options['options'])
+		]
+		user_ids = [
+			User.objects.get_or_create(username=f'{STRESS_USER_PREFIX}{i:04d}')[0].pk
+			for i in range(options['users'])
+		]
+
+		tasks = [
+			(options['seed'] * 1_000_003 + i, option_ids, user_ids,
+			 options['cancel_ratio'], options['max_seats'], options['retries'])
+			for i in range(options['operations'])
+		]
+		if options['mode'] == 'process':
+			connections.close_all()
+			executor = ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup)
+		else:
+			executor = ThreadPoolExecutor(max_workers=options['workers'])
+
+		self.stdout.write(
+			f"Running {options['operations']} operations on {options['workers']} "
+			f"{options['mode']} workers against {connection.vendor}..."
+		)
+		started = time.perf_counter()
+		with executor:
+			results = list(executor.map(run_operation, tasks, chunksize=1))
+		elapsed = time.perf_counter() - started
+
+		try:
+			self.report(results, elapsed)
+			self.verify(option_ids, options['capacity'])
+		finally:
+			if not options['keep']:
+				TravelOption.objects.filter(pk__in=option_ids).delete()
+
+	def report(self, results, elapsed):
+		counts = {}
+		for kind, outcome, _, _, _ in results:
+			counts[(kind, outcome)] = counts.get((kind, outcome), 0) + 1
+		latencies = sorted(latency * 1000 for _, _, latency, _, _ in results)
+		lock_wait = sum(wait for _, _, _, wait, _ in results)
+		retries = sum(attempts for _, _, _, _, attempts in results)
+		errors = sum(n for (kind, outcome), n in counts.items() if outcome == 'error')
+		p95 = statistics.quantiles(latencies, n=100)[94] if len(latencies) > 1 else latencies[0]
+
+		self.stdout.write(f'Throughput:      {len(results) / elapsed:.0f} ops/sec ({elapsed:.2f}s)')
+		for kind in ('book', 'cancel'):
+			breakdown = ', '.join(
+				f'{outcome} {n}' for (k, outcome), n in sorted(counts.items()) if k == kind
+			)
+			self.stdout.write(f'{kind.capitalize() + ":":<16} {breakdown}')
+		self.stdout.write(f'Latency:         p50 {statistics.median(latencies):.1f} ms, p95 {p95:.1f} ms')
+		self.stdout.write(f'Lock wait:       {lock_wait:.2f}s total, {retries} retries '
+						  f'({retries / len(results):.2%} per op)')
+		self.stdout.write(f'Failure rate:    {errors / len(results):.2%}')
+
+	def verify(self, option_ids, capacity):
+		"""Check available seats equal capacity minus confirmed and held seats."""
+		confirmed = dict(
+			Booking.objects.filter(travel_option_id__in=option_ids, status='confirmed')
+			.values('travel_option_id').annotate(seats=Sum('num_seats'))
+			.values_list('travel_option_id', 'seats')
+		)
+		held = dict(
+			SeatHold.objects.filter(travel_option_id__in=option_ids, status='active')
+			.values('travel_option_id').annotate(seats=Sum('num_seats'))
+			.values_list('travel_option_id', 'seats')
+		)
+		broken = []
+		for travel_option in TravelOption.objects.filter(pk__in=option_ids):
+			expected = capacity - confirmed.get(travel_option.pk, 0) - held.get(travel_option.pk, 0)
+			if travel_option.available_seats != expected:
+				broken.append(f'{travel_option.title}: {travel_option.available_seats} available, expected {expected}')
+		if broken:
+			raise CommandError('Seat inventory is inconsistent:\n' + '\n'.join(broken))
+		self.stdout.write(self.style.SUCCESS('Seat inventory consistent: available = capacity - confirmed - held seats'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.2 on 2026-10-17 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='traveloption',
+            constraint=models.CheckConstraint(check=models.Q(('available_seats__gte', 0)), name='traveloption_available_seats_non_negative'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def normalize(name):
+    name = (name or '').strip()
+    return slugify(name, allow_unicode=True) or name.lower()
+
+
+def populate_locations(apps, schema_editor):
+    Location = apps.get_model('bookings', 'Location')
+    TravelOption = apps.get_model('bookings', 'TravelOption')
+
+    names = set(TravelOption.objects.values_list('source', flat=True))
+    names.update(TravelOption.objects.values_list('destination', flat=True))
+
+    locations = {}
+    for name in sorted(names):
+        slug = normalize(name)
+        if slug not in locations:
+            locations[slug], _ = Location.objects.get_or_create(slug=slug, defaults={'name': name.strip()})
+        TravelOption.objects.filter(source=name).update(source_location=locations[slug])
+        TravelOption.objects.filter(destination=name).update(destination_location=locations[slug])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_location'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_locations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.2 on 2026-10-17 05:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_populate_locations'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='traveloption',
+            name='bookings_tr_type_9146b9_idx',
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['type', 'source_location', 'destination_location', 'departure_datetime'], name='travel_type_route_dep_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['source_location', 'destination_location', 'departure_datetime'], name='travel_route_dep_idx'),
+        ),
+    ]
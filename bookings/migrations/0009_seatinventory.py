@@ -0,0 +1,68 @@
+# Generated by Django 5.0.2 on 2026-10-17 06:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_seats_to_inventory(apps, schema_editor):
+    TravelOption = apps.get_model('bookings', 'TravelOption')
+    SeatInventory = apps.get_model('bookings', 'SeatInventory')
+
+    batch = []
+    for travel_option_id, available_seats in TravelOption.objects.values_list(
+        'id', 'available_seats'
+    ).iterator(chunk_size=2000):
+        batch.append(SeatInventory(travel_option_id=travel_option_id, available_seats=available_seats))
+        if len(batch) >= 2000:
+            SeatInventory.objects.bulk_create(batch)
+            batch = []
+    SeatInventory.objects.bulk_create(batch)
+
+
+def copy_seats_to_travel_options(apps, schema_editor):
+    TravelOption = apps.get_model('bookings', 'TravelOption')
+    SeatInventory = apps.get_model('bookings', 'SeatInventory')
+
+    for travel_option_id, available_seats in SeatInventory.objects.values_list(
+        'travel_option_id', 'available_seats'
+    ).iterator(chunk_size=2000):
+        TravelOption.objects.filter(pk=travel_option_id).update(available_seats=available_seats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_bookingrequest'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatInventory',
+            fields=[
+                ('travel_option', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory', serialize=False, to='bookings.traveloption')),
+                ('available_seats', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name_plural': 'seat inventories',
+            },
+        ),
+        migrations.RunPython(copy_seats_to_inventory, copy_seats_to_travel_options),
+        # Give the old column a default so this migration can be reversed
+        migrations.AlterField(
+            model_name='traveloption',
+            name='available_seats',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RemoveConstraint(
+            model_name='traveloption',
+            name='traveloption_available_seats_non_negative',
+        ),
+        migrations.RemoveField(
+            model_name='traveloption',
+            name='available_seats',
+        ),
+        migrations.AddConstraint(
+            model_name='seatinventory',
+            constraint=models.CheckConstraint(check=models.Q(('available_seats__gte', 0)), name='seatinventory_available_seats_non_negative'),
+        ),
+    ]
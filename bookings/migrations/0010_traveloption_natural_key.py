@@ -0,0 +1,41 @@
+# Generated by Django 5.0.2 on 2026-10-17 06:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    """Refuse to add the constraint over duplicate (title, departure_datetime) rows.
+
+    Duplicates may both have bookings, so they are not merged here; they
+    must be resolved by hand before migrating.
+    """
+    TravelOption = apps.get_model('bookings', 'TravelOption')
+    duplicates = list(
+        TravelOption.objects.values('title', 'departure_datetime')
+        .annotate(count=Count('id')).filter(count__gt=1).order_by('departure_datetime')
+    )
+    if duplicates:
+        examples = ', '.join(
+            f"{row['title']!r} at {row['departure_datetime']} ({row['count']} rows)" for row in duplicates[:5]
+        )
+        raise ValueError(
+            f'Cannot add traveloption_title_departure_uniq: {len(duplicates)} (title, departure) '
+            f'pair(s) belong to more than one travel option, e.g. {examples}. '
+            'Rename or delete the duplicates and run migrate again.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_seatinventory'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='traveloption',
+            constraint=models.UniqueConstraint(fields=('title', 'departure_datetime'), name='traveloption_title_departure_uniq'),
+        ),
+    ]
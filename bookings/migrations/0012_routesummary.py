@@ -0,0 +1,67 @@
+# Generated by Django 5.0.2 on 2026-10-17 06:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def backfill_route_summaries(apps, schema_editor):
+    """Summarize the existing catalog, as ``summaries.rebuild_route_summaries`` does."""
+    TravelOption = apps.get_model('bookings', 'TravelOption')
+    RouteSummary = apps.get_model('bookings', 'RouteSummary')
+    groups = TravelOption.objects.filter(
+        source_location__isnull=False, destination_location__isnull=False
+    ).annotate(
+        day=TruncDate('departure_datetime', tzinfo=timezone.get_current_timezone())
+    ).values('type', 'source_location_id', 'destination_location_id', 'day').annotate(
+        min_price=Min('price'),
+        option_count=Count('id'),
+        seats=Sum('inventory__available_seats'),
+    ).order_by()
+    RouteSummary.objects.bulk_create([
+        RouteSummary(
+            type=group['type'],
+            source_location_id=group['source_location_id'],
+            destination_location_id=group['destination_location_id'],
+            departure_date=group['day'],
+            min_price=group['min_price'],
+            option_count=group['option_count'],
+            available_seats=group['seats'] or 0,
+        )
+        for group in groups
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('flight', 'Flight'), ('train', 'Train'), ('bus', 'Bus')], max_length=10)),
+                ('departure_date', models.DateField()),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('option_count', models.PositiveIntegerField()),
+                ('available_seats', models.PositiveIntegerField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('destination_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bookings.location')),
+                ('source_location', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='bookings.location')),
+            ],
+            options={
+                'verbose_name_plural': 'route summaries',
+                'indexes': [models.Index(fields=['departure_date'], name='bookings_ro_departu_fc00e6_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='routesummary',
+            constraint=models.UniqueConstraint(fields=('source_location', 'destination_location', 'type', 'departure_date'), name='routesummary_route_date_uniq'),
+        ),
+        migrations.RunPython(backfill_route_summaries, migrations.RunPython.noop),
+    ]
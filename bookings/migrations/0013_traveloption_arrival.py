@@ -0,0 +1,22 @@
+# Generated by Django 5.0.2 on 2026-10-17 06:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_routesummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='traveloption',
+            name='arrival_datetime',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='traveloption',
+            index=models.Index(fields=['updated_at'], name='bookings_tr_updated_9e7ee1_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.2 on 2026-10-17 07:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_bookingrequest_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtraveloption',
+            name='arrival_datetime',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
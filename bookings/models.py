@@ -1,10 +1,19 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.text import slugify
 from decimal import Decimal
 
 
+# Sent with ``travel_option`` and ``delta`` whenever seats are booked or released
+inventory_changed = Signal()
+
+
 class UserProfile(models.Model):
     """Extended user profile with additional fields."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -17,6 +26,76 @@ class UserProfile(models.Model):
         return f"{self.user.username}'s Profile"
 
 
+class Location(models.Model):
+    """A normalized city or station that travel options depart from or arrive at."""
+    # Each matched location adds route version keys to a search's cache key
+    PREFIX_MATCH_LIMIT = 5
+
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True, allow_unicode=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def normalize(name):
+        """Return the slug used to match a free-text location name."""
+        name = (name or '').strip()
+        return slugify(name, allow_unicode=True) or name.lower()
+
+    @classmethod
+    def for_name(cls, name):
+        """Return the location for ``name``, creating it if needed."""
+        slug = cls.normalize(name)
+        alias = LocationAlias.objects.filter(slug=slug).select_related('location').first()
+        if alias:
+            return alias.location
+        location, _ = cls.objects.get_or_create(slug=slug, defaults={'name': name.strip()})
+        return location
+
+    @classmethod
+    def resolve(cls, query):
+        """Return ids of the locations matching user input.
+
+        An exact name or alias match wins; otherwise the input is treated as
+        a prefix of the slug so partially typed names still find results,
+        up to ``PREFIX_MATCH_LIMIT`` locations in name order. Both are
+        lookups on the unique slug indexes, so a word from the middle of a
+        name ("York" for "New York") does not match.
+        """
+        slug = cls.normalize(query)
+        if not slug:
+            return []
+        exact = cls.objects.filter(slug=slug).order_by().values_list('id', flat=True).union(
+            LocationAlias.objects.filter(slug=slug).order_by().values_list('location_id', flat=True)
+        )
+        exact = sorted(exact)
+        if exact:
+            return exact
+        return list(cls.objects.filter(slug__startswith=slug).values_list('id', flat=True)[:cls.PREFIX_MATCH_LIMIT])
+
+
+class LocationAlias(models.Model):
+    """Alternative spelling or code (e.g. "NYC", "JFK") for a location."""
+    location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='aliases')
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True, allow_unicode=True)
+
+    class Meta:
+        verbose_name_plural = 'location aliases'
+
+    def __str__(self):
+        return f"{self.name} ({self.location.name})"
+
+    def save(self, *args, **kwargs):
+        self.slug = Location.normalize(self.name)
+        super().save(*args, **kwargs)
+
+
 class TravelOption(models.Model):
     """Model for travel options (flights, trains, buses)."""
     TRAVEL_TYPES = [
@@ -29,36 +108,179 @@ class TravelOption(models.Model):
     title = models.CharField(max_length=200)
     source = models.CharField(max_length=100)
     destination = models.CharField(max_length=100)
+    source_location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name='departures', null=True, editable=False
+    )
+    destination_location = models.ForeignKey(
+        Location, on_delete=models.PROTECT, related_name='arrivals', null=True, editable=False
+    )
     departure_datetime = models.DateTimeField()
+    # Optional; only options with an arrival time can be chained into connections
+    arrival_datetime = models.DateTimeField(null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
-    available_seats = models.PositiveIntegerField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['departure_datetime']
         indexes = [
-            models.Index(fields=['type', 'source', 'destination']),
+            models.Index(
+                fields=['type', 'source_location', 'destination_location', 'departure_datetime'],
+                name='travel_type_route_dep_idx',
+            ),
+            models.Index(
+                fields=['source_location', 'destination_location', 'departure_datetime'],
+                name='travel_route_dep_idx',
+            ),
             models.Index(fields=['departure_datetime']),
+            # Lets the connection graph fetch only options changed since its last sync
+            models.Index(fields=['updated_at']),
+        ]
+        constraints = [
+            # Natural key of a scheduled service, used by import_travel_options
+            models.UniqueConstraint(
+                fields=['title', 'departure_datetime'],
+                name='traveloption_title_departure_uniq',
+            ),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.source} to {self.destination}"
 
+    def clean(self):
+        if self.arrival_datetime and self.departure_datetime and self.arrival_datetime <= self.departure_datetime:
+            raise ValidationError({'arrival_datetime': 'Arrival must be after departure.'})
+
+    @property
+    def available_seats(self):
+        """Live seat count, stored in the travel option's SeatInventory row.
+
+        Querysets that need it for many options annotate it instead
+        (``annotate(available_seats=F('inventory__available_seats'))``);
+        otherwise it is read on first access.
+        """
+        if '_available_seats' not in self.__dict__:
+            self._available_seats = 0
+            if self.pk is not None:
+                self._available_seats = SeatInventory.objects.filter(
+                    pk=self.pk
+                ).values_list('available_seats', flat=True).first() or 0
+        return self._available_seats
+
+    @available_seats.setter
+    def available_seats(self, value):
+        self._available_seats = value
+
+    def save(self, *args, **kwargs):
+        """Resolve the free-text route to Location rows before saving.
+
+        A new travel option gets its SeatInventory row with the initial
+        ``available_seats``; afterwards seats only change through
+        ``book_seats``, ``release_seats`` and ``set_available_seats``.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'source', 'destination'} & set(update_fields):
+            self.source_location = Location.for_name(self.source)
+            self.destination_location = Location.for_name(self.destination)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'source_location', 'destination_location'}
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                SeatInventory.objects.create(travel_option=self, available_seats=self.available_seats)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        """Also forget the seat count so the next access reads it again."""
+        self.__dict__.pop('_available_seats', None)
+        if fields is not None:
+            fields = [field for field in fields if field != 'available_seats']
+            if not fields:
+                return
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+
     def is_available(self, num_seats=1):
         """Check if requested number of seats are available."""
         return self.available_seats >= num_seats
 
+    def held_seats(self):
+        """Seats currently set aside by unexpired holds (already excluded from available_seats)."""
+        return self.holds.filter(
+            status='active', expires_at__gt=timezone.now()
+        ).aggregate(seats=models.Sum('num_seats'))['seats'] or 0
+
+    async def aheld_seats(self):
+        """Async ``held_seats()``."""
+        totals = await self.holds.filter(
+            status='active', expires_at__gt=timezone.now()
+        ).aaggregate(seats=models.Sum('num_seats'))
+        return totals['seats'] or 0
+
     def book_seats(self, num_seats):
-        """Atomically book seats and return success status."""
+        """Atomically book seats and return success status.
+
+        The reservation is a single conditional UPDATE, so the row lock is
+        held only for the duration of that statement and the affected-row
+        count tells us whether enough seats were left.
+        """
+        updated = SeatInventory.objects.filter(
+            pk=self.pk, available_seats__gte=num_seats
+        ).update(available_seats=F('available_seats') - num_seats)
+        if updated:
+            if '_available_seats' in self.__dict__:
+                self._available_seats -= num_seats
+            inventory_changed.send(sender=TravelOption, travel_option=self, delta=-num_seats)
+        return bool(updated)
+
+    def release_seats(self, num_seats):
+        """Return previously booked seats to the pool."""
+        updated = SeatInventory.objects.filter(pk=self.pk).update(
+            available_seats=F('available_seats') + num_seats
+        )
+        if updated:
+            if '_available_seats' in self.__dict__:
+                self._available_seats += num_seats
+            inventory_changed.send(sender=TravelOption, travel_option=self, delta=num_seats)
+        return bool(updated)
+
+    def set_available_seats(self, num_seats):
+        """Overwrite the seat count, e.g. when an admin resizes the vehicle."""
         with transaction.atomic():
-            # Use select_for_update to prevent race conditions
-            travel_option = TravelOption.objects.select_for_update().get(id=self.id)
-            if travel_option.available_seats >= num_seats:
-                travel_option.available_seats -= num_seats
-                travel_option.save()
-                return True
-            return False
+            inventory, created = SeatInventory.objects.select_for_update().get_or_create(
+                pk=self.pk, defaults={'available_seats': num_seats}
+            )
+            # A newly created row is announced by its own post_save
+            delta = 0 if created else num_seats - inventory.available_seats
+            if delta:
+                SeatInventory.objects.filter(pk=self.pk).update(available_seats=num_seats)
+        self._available_seats = num_seats
+        if delta:
+            inventory_changed.send(sender=TravelOption, travel_option=self, delta=delta)
+
+
+class SeatInventory(models.Model):
+    """Live seat count of a travel option.
+
+    Every booking and cancellation updates this narrow row instead of the
+    travel option itself, so the static travel option data (title, route,
+    schedule, price) stays unchanged and can be cached (see ``catalog``).
+    """
+    travel_option = models.OneToOneField(
+        TravelOption, on_delete=models.CASCADE, primary_key=True, related_name='inventory'
+    )
+    available_seats = models.PositiveIntegerField()
+
+    class Meta:
+        verbose_name_plural = 'seat inventories'
+        constraints = [
+            models.CheckConstraint(
+                check=Q(available_seats__gte=0),
+                name='seatinventory_available_seats_non_negative',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.travel_option_id}: {self.available_seats} seat(s)"
 
 
 class Booking(models.Model):
@@ -80,36 +302,217 @@ class Booking(models.Model):
         ordering = ['-booking_date']
         indexes = [
             models.Index(fields=['user', 'status']),
+            models.Index(fields=['user', 'booking_date']),
             models.Index(fields=['travel_option', 'status']),
         ]
 
     def __str__(self):
         return f"Booking {self.id} - {self.user.username} - {self.travel_option.title}"
 
-    def save(self, *args, **kwargs):
-        """Override save to calculate total price and handle seat booking."""
-        if not self.pk:  # New booking
-            self.total_price = self.travel_option.price * self.num_seats
-            # Book seats atomically
-            if not self.travel_option.book_seats(self.num_seats):
+    def save(self, *args, seats_reserved=False, **kwargs):
+        """Override save to calculate total price and handle seat booking.
+
+        Pass ``seats_reserved=True`` when the seats were already taken from
+        the travel option, e.g. by a seat hold being converted.
+        """
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        # services imports this module
+        from .services import take_seats
+
+        # New booking: reserve the seats and insert the row together
+        self.total_price = self.travel_option.price * self.num_seats
+        with transaction.atomic():
+            if not seats_reserved and not take_seats(self.travel_option, self.num_seats):
+                self.travel_option.refresh_from_db(fields=['available_seats'])
                 raise ValueError(f"Not enough seats available. Requested: {self.num_seats}, Available: {self.travel_option.available_seats}")
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
     def cancel(self):
         """Cancel booking and restore seats."""
-        if self.status == 'confirmed':
-            with transaction.atomic():
-                # Use select_for_update to prevent race conditions
-                travel_option = TravelOption.objects.select_for_update().get(id=self.travel_option.id)
-                travel_option.available_seats += self.num_seats
-                travel_option.save()
-                
-                self.status = 'cancelled'
-                self.save()
-                return True
-        return False
+        if self.status != 'confirmed':
+            return False
+
+        with transaction.atomic():
+            # Flip the status conditionally so a booking is only refunded once
+            updated = Booking.objects.filter(pk=self.pk, status='confirmed').update(
+                status='cancelled', updated_at=timezone.now()
+            )
+            if not updated:
+                return False
+            self.travel_option.release_seats(self.num_seats)
+        self.status = 'cancelled'
+        return True
 
     @property
     def can_cancel(self):
         """Check if booking can be cancelled."""
         return self.status == 'confirmed'
+
+    is_archived = False
+
+
+class SeatHold(models.Model):
+    """Seats set aside for a user for a short time while they check out.
+
+    Creating a hold takes the seats from ``TravelOption.available_seats``
+    straight away, so confirming it only flips the hold's status and never
+    touches the contended travel option row again. Expired holds give their
+    seats back in bulk (see ``services.release_expired_holds``).
+    """
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('converted', 'Converted'),
+        ('released', 'Released'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='seat_holds')
+    travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE, related_name='holds')
+    num_seats = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    booking = models.OneToOneField(
+        Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='hold'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['travel_option', 'status', 'expires_at']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.id} - {self.user.username} - {self.num_seats} seat(s)"
+
+    @property
+    def is_active(self):
+        """Check if the hold can still be converted into a booking."""
+        return self.status == 'active' and self.expires_at > timezone.now()
+
+
+class BookingRequest(models.Model):
+    """A booking waiting in the queue for the single writer of its travel option.
+
+    In queued booking mode requests are appended here instead of reserving
+    seats inline; ``services.process_booking_queue`` confirms a whole batch
+    with one seat UPDATE and fills in ``booking`` or ``error``.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('confirmed', 'Confirmed'),
+        ('rejected', 'Rejected'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='booking_requests')
+    travel_option = models.ForeignKey(TravelOption, on_delete=models.CASCADE, related_name='booking_requests')
+    num_seats = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    booking = models.OneToOneField(
+        Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='request'
+    )
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'travel_option', 'id']),
+        ]
+
+    def __str__(self):
+        return f"Request {self.id} - {self.user.username} - {self.num_seats} seat(s)"
+
+
+class ArchivedTravelOption(models.Model):
+    """A departed travel option moved out of the hot TravelOption table.
+
+    Rows keep their original primary key and are written only by
+    ``archive.archive_past_departures``.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    type = models.CharField(max_length=10, choices=TravelOption.TRAVEL_TYPES)
+    title = models.CharField(max_length=200)
+    source = models.CharField(max_length=100)
+    destination = models.CharField(max_length=100)
+    departure_datetime = models.DateTimeField()
+    arrival_datetime = models.DateTimeField(null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    available_seats = models.PositiveIntegerField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['departure_datetime']
+        indexes = [
+            models.Index(fields=['departure_datetime']),
+        ]
+
+    def __str__(self):
+        return f"{self.title} - {self.source} to {self.destination}"
+
+
+class ArchivedBooking(models.Model):
+    """A booking on an archived travel option; read-only, shown as a past trip."""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    travel_option = models.ForeignKey(
+        ArchivedTravelOption, on_delete=models.CASCADE, related_name='bookings'
+    )
+    num_seats = models.PositiveIntegerField()
+    total_price = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    booking_date = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-booking_date']
+        indexes = [
+            models.Index(fields=['user', 'booking_date']),
+            models.Index(fields=['user', 'status']),
+        ]
+
+    def __str__(self):
+        return f"Archived booking {self.id} - {self.user.username} - {self.travel_option.title}"
+
+    # Archived trips have departed, so they can never be cancelled
+    can_cancel = False
+    is_archived = True
+
+
+class RouteSummary(models.Model):
+    """Per route and local departure date totals, maintained from TravelOption changes.
+
+    Lets the home page and browse views read a few precomputed rows instead
+    of grouping the whole catalog; see ``summaries`` for how rows are kept
+    up to date and ``manage.py rebuild_route_summaries`` for repairs.
+    """
+    type = models.CharField(max_length=10, choices=TravelOption.TRAVEL_TYPES)
+    source_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='+')
+    destination_location = models.ForeignKey(Location, on_delete=models.CASCADE, related_name='+')
+    departure_date = models.DateField()
+    min_price = models.DecimalField(max_digits=10, decimal_places=2)
+    option_count = models.PositiveIntegerField()
+    available_seats = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'route summaries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source_location', 'destination_location', 'type', 'departure_date'],
+                name='routesummary_route_date_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['departure_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_display()} {self.source_location_id}-{self.destination_location_id} on {self.departure_date}"
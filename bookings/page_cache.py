@@ -0,0 +1,221 @@
+"""Shared full-page cache of the anonymous home and browse pages.
+
+Visitors without a session see the same HTML for a given path and query,
+so ``anonymous_page_cache`` keeps the rendered page in the shared cache and
+answers from it without running the view. A page is fresh for
+``ANONYMOUS_PAGE_CACHE_TIMEOUT`` seconds and may then be served stale for
+``ANONYMOUS_PAGE_CACHE_STALE_TIMEOUT`` more: the first request to find it
+stale takes a lock in the cache and renders the replacement while the
+others keep getting the stale copy. On a cold miss, requests that do not
+get the lock wait briefly for the one rendering.
+
+Pages record the version of their tags when stored. ``purge(tag)`` bumps
+the version, which makes every page with that tag stale, so it is
+refreshed as above. Seat counts shown on cached pages can lag by up to the
+fresh timeout; the travel detail page always reads them live.
+
+Requests with a session cookie or pending messages, and responses that set
+cookies, use a CSRF token or are not plain 200s, bypass the cache.
+"""
+import asyncio
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+KEY_PREFIX = 'bookings:page'
+# Pages showing travel options; purged whenever one is saved or deleted
+TRAVEL_OPTIONS = 'travel_options'
+
+# How long a lock holder may take to render before another request may try;
+# each holder stores its own token so it never deletes a successor's lock
+LOCK_TIMEOUT = 30
+# How long a cold miss waits for the request holding the lock
+LOCK_WAIT = 2.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+def _tag_key(tag):
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def purge(*tags):
+    """Mark every cached page with one of ``tags`` stale."""
+    for tag in tags:
+        try:
+            cache.incr(_tag_key(tag))
+        except ValueError:
+            cache.add(_tag_key(tag), int(time.time() * 1000), timeout=None)
+
+
+def page_key(request):
+    """Cache key for the request's path and normalized query."""
+    query = sorted((name, value) for name, values in request.GET.lists() for value in values if value != '')
+    raw = repr((request.path, query))
+    return f'{KEY_PREFIX}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def _cacheable(request):
+    return (
+        settings.ANONYMOUS_PAGE_CACHE_TIMEOUT > 0
+        and request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and not len(messages.get_messages(request))
+    )
+
+
+def _storable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def _versions(found, tag_keys):
+    """Return the tag versions from ``found``, starting missing ones somewhere new."""
+    for key in tag_keys:
+        if key not in found:
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in tag_keys)
+
+
+async def _aversions(found, tag_keys):
+    """Async ``_versions()``."""
+    for key in tag_keys:
+        if key not in found:
+            await cache.aadd(key, int(time.time() * 1000), timeout=None)
+            found[key] = await cache.aget(key)
+    return tuple(found[key] for key in tag_keys)
+
+
+def _release(lock, token):
+    """Delete ``lock`` unless it expired and another request has taken it."""
+    if cache.get(lock) == token:
+        cache.delete(lock)
+
+
+async def _arelease(lock, token):
+    """Async ``_release()``."""
+    if await cache.aget(lock) == token:
+        await cache.adelete(lock)
+
+
+def _entry(response, versions):
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'created': time.time(),
+        'versions': versions,
+    }
+
+
+def _is_fresh(entry, versions):
+    return entry['versions'] == versions and time.time() - entry['created'] < settings.ANONYMOUS_PAGE_CACHE_TIMEOUT
+
+
+def _cached_response(entry, state):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['X-Page-Cache'] = state
+    response['Age'] = int(time.time() - entry['created'])
+    patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def _rendered(request, response, versions):
+    """Return the entry to store for a freshly rendered response, or None.
+
+    Only responses that are the same for every visitor are stored.
+    """
+    entry = None
+    if _storable(request, response):
+        entry = _entry(response, versions)
+        response['X-Page-Cache'] = 'miss'
+    patch_vary_headers(response, ['Cookie'])
+    return entry
+
+
+def _entry_timeout():
+    return settings.ANONYMOUS_PAGE_CACHE_TIMEOUT + settings.ANONYMOUS_PAGE_CACHE_STALE_TIMEOUT
+
+
+def anonymous_page_cache(*tags):
+    """Cache a view's pages for anonymous visitors, stale while revalidating.
+
+    Works on sync and async views.
+    """
+    tag_keys = [_tag_key(tag) for tag in tags]
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async def wrapper(request, *args, **kwargs):
+                if not _cacheable(request):
+                    return await view(request, *args, **kwargs)
+                key = page_key(request)
+                lock, token = f'{key}:lock', uuid.uuid4().hex
+                found = await cache.aget_many([key, *tag_keys])
+                versions = await _aversions(found, tag_keys)
+                entry = found.get(key)
+                if entry is not None and _is_fresh(entry, versions):
+                    return _cached_response(entry, 'hit')
+                if not await cache.aadd(lock, token, LOCK_TIMEOUT):
+                    if entry is not None:
+                        return _cached_response(entry, 'stale')
+                    deadline = time.monotonic() + LOCK_WAIT
+                    while time.monotonic() < deadline:
+                        await asyncio.sleep(LOCK_POLL_INTERVAL)
+                        entry = await cache.aget(key)
+                        if entry is not None:
+                            return _cached_response(entry, 'hit')
+                    return await view(request, *args, **kwargs)
+                try:
+                    response = await view(request, *args, **kwargs)
+                    entry = _rendered(request, response, versions)
+                    if entry is not None:
+                        await cache.aset(key, entry, _entry_timeout())
+                    return response
+                finally:
+                    await _arelease(lock, token)
+        else:
+            def wrapper(request, *args, **kwargs):
+                if not _cacheable(request):
+                    return view(request, *args, **kwargs)
+                key = page_key(request)
+                lock, token = f'{key}:lock', uuid.uuid4().hex
+                found = cache.get_many([key, *tag_keys])
+                versions = _versions(found, tag_keys)
+                entry = found.get(key)
+                if entry is not None and _is_fresh(entry, versions):
+                    return _cached_response(entry, 'hit')
+                if not cache.add(lock, token, LOCK_TIMEOUT):
+                    if entry is not None:
+                        return _cached_response(entry, 'stale')
+                    deadline = time.monotonic() + LOCK_WAIT
+                    while time.monotonic() < deadline:
+                        time.sleep(LOCK_POLL_INTERVAL)
+                        entry = cache.get(key)
+                        if entry is not None:
+                            return _cached_response(entry, 'hit')
+                    # The lock holder is slow; render rather than keep waiting
+                    return view(request, *args, **kwargs)
+                try:
+                    response = view(request, *args, **kwargs)
+                    entry = _rendered(request, response, versions)
+                    if entry is not None:
+                        cache.set(key, entry, _entry_timeout())
+                    return response
+                finally:
+                    _release(lock, token)
+
+        return wraps(view)(wrapper)
+    return decorator
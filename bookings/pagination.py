@@ -0,0 +1,160 @@
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """A page of results fetched by keyset (cursor) pagination."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Paginate a queryset by a unique, ordered tuple of fields.
+
+    Each page is an index range read starting after (or before) the keys of
+    the last row seen, so deep pages cost the same as the first one and no
+    ``COUNT(*)`` is needed. Cursors are signed so clients cannot forge
+    arbitrary filter values.
+    """
+    salt = 'bookings.pagination.cursor'
+
+    def __init__(self, queryset, per_page, keys, descending=False):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = tuple(keys)
+        self.descending = descending
+
+    def get_page(self, cursor=None):
+        """Return the page addressed by ``cursor``, or the first page."""
+        direction, values = self.decode_cursor(cursor)
+        backwards = direction == 'p'
+        return self._page(self._fetch(values, backwards), values, backwards)
+
+    async def aget_page(self, cursor=None):
+        """Async ``get_page()``."""
+        direction, values = self.decode_cursor(cursor)
+        backwards = direction == 'p'
+        return self._page(await self._afetch(values, backwards), values, backwards)
+
+    def _page(self, rows, values, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        if not rows:
+            return KeysetPage(rows)
+
+        if backwards:
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor('n', rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor('p', rows[0]) if has_previous else None,
+        )
+
+    def _fetch(self, values, backwards):
+        """Return up to ``per_page + 1`` rows after ``values`` in page order."""
+        return list(self._page_queryset(self.queryset, values, backwards))
+
+    async def _afetch(self, values, backwards):
+        return [row async for row in self._page_queryset(self.queryset, values, backwards)]
+
+    def _page_queryset(self, queryset, values, backwards):
+        if values is not None:
+            queryset = queryset.filter(self._after(values, backwards))
+        return queryset.order_by(*self._ordering(backwards))[:self.per_page + 1]
+
+    def encode_cursor(self, direction, obj):
+        values = []
+        for key in self.keys:
+            value = getattr(obj, key)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return signing.dumps([direction, values], salt=self.salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return ``(direction, values)``; a bad cursor means the first page."""
+        if not cursor:
+            return 'n', None
+        try:
+            direction, raw_values = signing.loads(cursor, salt=self.salt)
+            if direction not in ('n', 'p') or len(raw_values) != len(self.keys):
+                raise ValueError(cursor)
+            opts = self.queryset.model._meta
+            values = [
+                opts.get_field(key).to_python(value)
+                for key, value in zip(self.keys, raw_values)
+            ]
+        except (signing.BadSignature, TypeError, ValueError, ValidationError):
+            return 'n', None
+        return direction, values
+
+    def _ordering(self, backwards):
+        descending = self.descending != backwards
+        return [f'-{key}' if descending else key for key in self.keys]
+
+    def _after(self, values, backwards):
+        """Build ``(k1, k2, ...) > (v1, v2, ...)`` as an OR of prefix matches."""
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        condition = Q()
+        for i, key in enumerate(self.keys):
+            prefix = {k: v for k, v in zip(self.keys[:i], values[:i])}
+            condition |= Q(**prefix, **{f'{key}__{lookup}': values[i]})
+        return condition
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """Keyset pagination across several querysets sharing the same unique keys.
+
+    Every queryset is read from the cursor on its own and the rows are
+    merged in Python, so a page can span tables (e.g. hot and archived
+    bookings) without a UNION that the per-table indexes could not serve.
+    """
+
+    def __init__(self, querysets, per_page, keys, descending=False):
+        super().__init__(querysets[0], per_page, keys, descending)
+        self.querysets = querysets
+
+    def _fetch(self, values, backwards):
+        rows = []
+        for queryset in self.querysets:
+            rows.extend(self._page_queryset(queryset, values, backwards))
+        return self._merge(rows, backwards)
+
+    async def _afetch(self, values, backwards):
+        rows = []
+        for queryset in self.querysets:
+            rows.extend([row async for row in self._page_queryset(queryset, values, backwards)])
+        return self._merge(rows, backwards)
+
+    def _merge(self, rows, backwards):
+        rows.sort(
+            key=lambda obj: tuple(getattr(obj, key) for key in self.keys),
+            reverse=self.descending != backwards,
+        )
+        return rows[:self.per_page + 1]
@@ -0,0 +1,153 @@
+"""Translate a validated TravelSearchForm into index-friendly queries.
+
+Every predicate compares a bare column with a constant so the composite
+indexes on TravelOption can be used: the departure date becomes a half-open
+datetime range in the user's timezone instead of a per-row ``__date``
+conversion, and routes are equality lookups on Location ids.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from .models import TravelOption
+
+# Static columns rendered by the travel option cards on the home and list
+# pages; the live seat count is added from SeatInventory when rendering
+CARD_FIELDS = (
+    'id', 'type', 'title', 'source', 'destination',
+    'departure_datetime', 'price',
+)
+
+# (from, below) bounds of the price facet bands; None leaves a side open
+PRICE_BANDS = (
+    (None, Decimal('100')),
+    (Decimal('100'), Decimal('250')),
+    (Decimal('250'), Decimal('500')),
+    (Decimal('500'), None),
+)
+
+# (key, label, first hour, end hour) of the departure time facet, local time
+HOUR_BANDS = (
+    ('night', 'Night (00-06)', 0, 6),
+    ('morning', 'Morning (06-12)', 6, 12),
+    ('afternoon', 'Afternoon (12-18)', 12, 18),
+    ('evening', 'Evening (18-24)', 18, 24),
+)
+
+
+def local_day_range(day, tz=None):
+    """Return the aware ``[start, end)`` datetimes covering ``day`` in ``tz``."""
+    tz = tz or timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def search_filters(cleaned_data=None, now=None):
+    """Return the ``filter()`` kwargs for a search."""
+    cleaned_data = cleaned_data or {}
+    now = now or timezone.now()
+    filters = {'departure_datetime__gte': now}
+
+    if cleaned_data.get('type'):
+        filters['type'] = cleaned_data['type']
+    if cleaned_data.get('source'):
+        filters['source_location__in'] = cleaned_data['source_location_ids']
+    if cleaned_data.get('destination'):
+        filters['destination_location__in'] = cleaned_data['destination_location_ids']
+    if cleaned_data.get('departure_date'):
+        start, end = local_day_range(cleaned_data['departure_date'])
+        filters['departure_datetime__gte'] = max(start, now)
+        filters['departure_datetime__lt'] = end
+    if cleaned_data.get('min_price') is not None:
+        filters['price__gte'] = cleaned_data['min_price']
+    if cleaned_data.get('max_price') is not None:
+        filters['price__lte'] = cleaned_data['max_price']
+    return filters
+
+
+def build_travel_queryset(cleaned_data=None, now=None):
+    """Return upcoming travel options matching a search, card columns only."""
+    return TravelOption.objects.filter(
+        **search_filters(cleaned_data, now)
+    ).only(*CARD_FIELDS).order_by('departure_datetime', 'id')
+
+
+def _price_band_label(low, high):
+    if low is None:
+        return f'Under ${high}'
+    if high is None:
+        return f'${low}+'
+    return f'${low} - ${high}'
+
+
+def _facet_query(travel_options):
+    """Return the rows and the filtered ``COUNT`` of every facet bucket."""
+    buckets = {'total': Count('id')}
+    for value, _ in TravelOption.TRAVEL_TYPES:
+        buckets[f'type_{value}'] = Count('id', filter=Q(type=value))
+    for i, (low, high) in enumerate(PRICE_BANDS):
+        band = Q()
+        if low is not None:
+            band &= Q(price__gte=low)
+        if high is not None:
+            band &= Q(price__lt=high)
+        buckets[f'price_{i}'] = Count('id', filter=band)
+    for key, _, first, end in HOUR_BANDS:
+        buckets[f'hour_{key}'] = Count('id', filter=Q(departure_hour__gte=first, departure_hour__lt=end))
+
+    # DISTINCT (a no-op, ids are unique) makes Django aggregate over a
+    # subquery, so the local hour is computed once per row rather than once
+    # per hour bucket; on SQLite that conversion runs in Python
+    rows = travel_options.order_by().annotate(
+        departure_hour=ExtractHour('departure_datetime', tzinfo=timezone.get_current_timezone())
+    ).values('id', 'type', 'price', 'departure_hour').distinct()
+    return rows, buckets
+
+
+def _facet_groups(counts):
+    price_params = [
+        {
+            'min_price': '' if low is None else str(low),
+            'max_price': '' if high is None else str(high - Decimal('0.01')),
+        }
+        for low, high in PRICE_BANDS
+    ]
+    return {
+        'total': counts['total'],
+        'groups': [
+            ('Type', [
+                {'label': label, 'count': counts[f'type_{value}'], 'params': {'type': value}}
+                for value, label in TravelOption.TRAVEL_TYPES
+            ]),
+            ('Price', [
+                {'label': _price_band_label(low, high), 'count': counts[f'price_{i}'], 'params': price_params[i]}
+                for i, (low, high) in enumerate(PRICE_BANDS)
+            ]),
+            ('Departure', [
+                {'label': label, 'count': counts[f'hour_{key}'], 'params': None}
+                for key, label, _, _ in HOUR_BANDS
+            ]),
+        ],
+    }
+
+
+def facet_counts(travel_options):
+    """Return the type, price band and departure hour counts of a search.
+
+    Every bucket is a filtered ``COUNT`` in one aggregate query over the
+    search's queryset, together with the total, so adding buckets does not
+    add round trips. Each bucket carries the search ``params`` that narrow
+    the results to it, if the search form has a field for that.
+    """
+    rows, buckets = _facet_query(travel_options)
+    return _facet_groups(rows.aggregate(**buckets))
+
+
+async def afacet_counts(travel_options):
+    """Async ``facet_counts()``."""
+    rows, buckets = _facet_query(travel_options)
+    return _facet_groups(await rows.aaggregate(**buckets))
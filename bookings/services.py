@@ -0,0 +1,316 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import TravelOption, Booking, SeatHold, BookingRequest
+
+BULK_CANCEL_CHUNK_SIZE = 1000
+
+
+def book_many(user, legs):
+    """Book several travel options for one user in a single transaction.
+
+    ``legs`` is an iterable of ``(travel_option_id, num_seats)`` pairs.
+    Seats are reserved in ascending travel option id order so that two
+    overlapping orders always lock rows in the same sequence and cannot
+    deadlock. If any leg lacks seats the whole order is rolled back and a
+    ``ValueError`` is raised.
+    """
+    requested = defaultdict(int)
+    legs = [(int(travel_option_id), int(num_seats)) for travel_option_id, num_seats in legs]
+    for travel_option_id, num_seats in legs:
+        if num_seats < 1:
+            raise ValueError('Each leg must book at least one seat.')
+        requested[travel_option_id] += num_seats
+    if not requested:
+        raise ValueError('No travel options selected.')
+
+    travel_options = TravelOption.objects.in_bulk(list(requested))
+    missing = set(requested) - set(travel_options)
+    if missing:
+        raise ValueError(f"Travel option(s) not found: {', '.join(map(str, sorted(missing)))}")
+
+    with transaction.atomic():
+        for travel_option_id in sorted(requested):
+            travel_option = travel_options[travel_option_id]
+            if not take_seats(travel_option, requested[travel_option_id]):
+                raise ValueError(
+                    f"Not enough seats available on {travel_option.title}. "
+                    f"Requested: {requested[travel_option_id]}"
+                )
+
+        bookings = [
+            Booking(
+                user=user,
+                travel_option=travel_options[travel_option_id],
+                num_seats=num_seats,
+                total_price=travel_options[travel_option_id].price * num_seats,
+            )
+            for travel_option_id, num_seats in legs
+        ]
+        return Booking.objects.bulk_create(bookings)
+
+
+def hold_seats(user, travel_option, num_seats, ttl=None):
+    """Set seats aside for ``user`` for ``ttl`` seconds and return the hold.
+
+    Any earlier active hold by the same user on this travel option is
+    released first, unless the new hold fails. Seats still tied up in expired holds are reclaimed (see
+    ``take_seats``). Raises ``ValueError`` when the seats are not available.
+    """
+    ttl = settings.SEAT_HOLD_TTL if ttl is None else ttl
+    with transaction.atomic():
+        # Released in the same transaction, so a failed new hold keeps the old one
+        for hold in SeatHold.objects.filter(user=user, travel_option=travel_option, status='active'):
+            hold.travel_option = travel_option
+            release_hold(hold)
+        if not take_seats(travel_option, num_seats):
+            travel_option.refresh_from_db(fields=['available_seats'])
+            raise ValueError(f"Not enough seats available. Requested: {num_seats}, Available: {travel_option.available_seats}")
+        return SeatHold.objects.create(
+            user=user,
+            travel_option=travel_option,
+            num_seats=num_seats,
+            expires_at=timezone.now() + timedelta(seconds=ttl),
+        )
+
+
+def confirm_hold(hold):
+    """Turn an active hold into a confirmed booking.
+
+    The seats were taken when the hold was created, so this only claims the
+    hold row; the travel option row is not locked again. Raises
+    ``ValueError`` if the hold has expired or was already used.
+    """
+    with transaction.atomic():
+        claimed = SeatHold.objects.filter(
+            pk=hold.pk, status='active', expires_at__gt=timezone.now()
+        ).update(status='converted')
+        if not claimed:
+            raise ValueError('Your seat hold has expired. Please select your seats again.')
+
+        booking = Booking(user=hold.user, travel_option=hold.travel_option, num_seats=hold.num_seats)
+        booking.save(seats_reserved=True)
+        SeatHold.objects.filter(pk=hold.pk).update(booking=booking)
+    hold.status, hold.booking = 'converted', booking
+    return booking
+
+
+def release_hold(hold):
+    """Give an active hold's seats back; return whether anything was released."""
+    with transaction.atomic():
+        released = SeatHold.objects.filter(pk=hold.pk, status='active').update(status='released')
+        if released:
+            hold.travel_option.release_seats(hold.num_seats)
+    if released:
+        hold.status = 'released'
+    return bool(released)
+
+
+def _release_holds(holds):
+    """Release the still active holds among ``(id, num_seats)`` pairs; return their seats.
+
+    Holds converted or released since they were read are skipped. There is
+    one UPDATE per distinct hold size, so the changed row counts give the
+    freed seats exactly, even where ``select_for_update`` is a no-op (SQLite).
+    """
+    by_size = defaultdict(list)
+    for hold_id, num_seats in holds:
+        by_size[num_seats].append(hold_id)
+    return sum(
+        num_seats * SeatHold.objects.filter(pk__in=hold_ids, status='active').update(status='released')
+        for num_seats, hold_ids in by_size.items()
+    )
+
+
+def release_expired_holds(now=None, travel_option_ids=None):
+    """Release every expired active hold and return the number of seats freed.
+
+    Holds are released per travel option in one transaction, with an
+    UPDATE per distinct hold size and a single UPDATE returning their seats.
+    """
+    now = now or timezone.now()
+    expired = SeatHold.objects.filter(status='active', expires_at__lte=now)
+    if travel_option_ids is not None:
+        expired = expired.filter(travel_option_id__in=travel_option_ids)
+
+    option_ids = set(expired.values_list('travel_option_id', flat=True).distinct())
+    travel_options = TravelOption.objects.in_bulk(option_ids)
+    freed = 0
+    for travel_option_id in sorted(option_ids):
+        with transaction.atomic():
+            holds = list(
+                expired.filter(travel_option_id=travel_option_id)
+                .select_for_update().values_list('id', 'num_seats')
+            )
+            seats = _release_holds(holds)
+            if seats:
+                travel_options[travel_option_id].release_seats(seats)
+                freed += seats
+    return freed
+
+
+def take_seats(travel_option, num_seats):
+    """``book_seats``, reclaiming the option's expired holds if seats run short.
+
+    Expired holds keep their seats until the sweeper runs, so a stopped
+    sweeper only delays releases. Returns whether the seats were taken.
+    """
+    if travel_option.book_seats(num_seats):
+        return True
+    return bool(release_expired_holds(travel_option_ids=[travel_option.pk])) and travel_option.book_seats(num_seats)
+
+
+def enqueue_booking(user, travel_option, num_seats):
+    """Append a booking to the queue and return the pending request."""
+    if num_seats < 1:
+        raise ValueError('You must book at least one seat.')
+    return BookingRequest.objects.create(user=user, travel_option=travel_option, num_seats=num_seats)
+
+
+def pending_travel_option_ids():
+    """Return the ids of travel options with queued booking requests."""
+    return list(
+        BookingRequest.objects.filter(status='pending')
+        .values_list('travel_option_id', flat=True).order_by('travel_option_id').distinct()
+    )
+
+
+def _claim_requests(requests):
+    """Claim pending requests read without row locks; return the ones this worker got.
+
+    Without SKIP LOCKED two workers can read the same batch. The conditional
+    UPDATE settles it: rows another worker processed meanwhile are no
+    longer pending, and ours are told apart by the claim time. The claim is
+    never committed; the batch leaves ``processing`` in the same transaction.
+    """
+    claimed_at = timezone.now()
+    ids = [booking_request.pk for booking_request in requests]
+    claimed = BookingRequest.objects.filter(pk__in=ids, status='pending').update(
+        status='processing', processed_at=claimed_at
+    )
+    if claimed == len(requests):
+        return requests
+    return list(BookingRequest.objects.filter(pk__in=ids, status='processing', processed_at=claimed_at).order_by('id'))
+
+
+def process_booking_queue(travel_option_id, batch_size=None):
+    """Confirm or reject the next batch of queued requests for one travel option.
+
+    Requests are served first come, first served; each one that still fits
+    is accepted and the rest are rejected. All accepted seats are taken with
+    a single conditional UPDATE and the bookings are inserted together, so a
+    batch costs one lock acquisition on the travel option row however many
+    requests it holds. Returns ``(confirmed, rejected)`` counts.
+    """
+    batch_size = batch_size or settings.BOOKING_QUEUE_BATCH_SIZE
+    with transaction.atomic():
+        pending = BookingRequest.objects.filter(
+            travel_option_id=travel_option_id, status='pending'
+        ).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            requests = list(pending.select_for_update(skip_locked=True)[:batch_size])
+        else:
+            requests = _claim_requests(list(pending[:batch_size]))
+        if not requests:
+            return 0, 0
+
+        travel_option = TravelOption.objects.get(pk=travel_option_id)
+        if sum(booking_request.num_seats for booking_request in requests) > travel_option.available_seats and \
+                release_expired_holds(travel_option_ids=[travel_option_id]):
+            travel_option.refresh_from_db(fields=['available_seats'])
+        # Direct bookings may still race us between the read and the UPDATE
+        for _ in range(3):
+            accepted, remaining = [], travel_option.available_seats
+            for booking_request in requests:
+                if booking_request.num_seats <= remaining:
+                    accepted.append(booking_request)
+                    remaining -= booking_request.num_seats
+            seats = sum(booking_request.num_seats for booking_request in accepted)
+            if not seats or travel_option.book_seats(seats):
+                break
+            travel_option.refresh_from_db(fields=['available_seats'])
+        else:
+            return 0, 0
+
+        bookings = [
+            Booking(
+                user_id=booking_request.user_id,
+                travel_option=travel_option,
+                num_seats=booking_request.num_seats,
+                total_price=travel_option.price * booking_request.num_seats,
+            )
+            for booking_request in accepted
+        ]
+        if connection.features.can_return_rows_from_bulk_insert:
+            Booking.objects.bulk_create(bookings)
+        else:
+            # The request rows need the booking ids, which bulk_create cannot
+            # return here; the seats are already taken either way
+            for booking in bookings:
+                booking.save(seats_reserved=True)
+
+        now = timezone.now()
+        booked = dict(zip((booking_request.pk for booking_request in accepted), bookings))
+        for booking_request in requests:
+            booking_request.processed_at = now
+            if booking_request.pk in booked:
+                booking_request.status = 'confirmed'
+                booking_request.booking = booked[booking_request.pk]
+            else:
+                booking_request.status = 'rejected'
+                booking_request.error = (
+                    f"Not enough seats available. Requested: {booking_request.num_seats}, "
+                    f"Available: {travel_option.available_seats}"
+                )
+        BookingRequest.objects.bulk_update(requests, ['status', 'booking', 'error', 'processed_at'])
+    return len(accepted), len(requests) - len(accepted)
+
+
+def cancel_travel_option_bookings(travel_option_ids, chunk_size=BULK_CANCEL_CHUNK_SIZE):
+    """Cancel every confirmed booking and active hold on disrupted travel options.
+
+    Each travel option is handled in its own transaction: bookings are
+    cancelled with set-based UPDATEs of ``chunk_size`` rows and the seats
+    are returned with a single ``release_seats`` call at the end. Returns
+    ``{travel_option_id: cancelled_bookings}``.
+    """
+    travel_options = TravelOption.objects.in_bulk(list(travel_option_ids))
+    cancelled = {}
+    for travel_option_id in sorted(travel_options):
+        now = timezone.now()
+        count = seats = 0
+        with transaction.atomic():
+            confirmed = Booking.objects.filter(
+                travel_option_id=travel_option_id, status='confirmed'
+            ).order_by('id').select_for_update()
+            while True:
+                chunk = list(confirmed.values_list('id', 'num_seats')[:chunk_size])
+                if not chunk:
+                    break
+                ids = [booking_id for booking_id, _ in chunk]
+                updated = Booking.objects.filter(pk__in=ids, status='confirmed').update(
+                    status='cancelled', updated_at=now
+                )
+                if updated == len(chunk):
+                    seats += sum(num_seats for _, num_seats in chunk)
+                else:
+                    # Some were cancelled by their owners meanwhile; count only ours
+                    seats += Booking.objects.filter(
+                        pk__in=ids, status='cancelled', updated_at=now
+                    ).aggregate(seats=Sum('num_seats'))['seats'] or 0
+                count += updated
+
+            seats += _release_holds(
+                SeatHold.objects.filter(travel_option_id=travel_option_id, status='active')
+                .select_for_update().values_list('id', 'num_seats')
+            )
+
+            if seats:
+                travel_options[travel_option_id].release_seats(seats)
+        cancelled[travel_option_id] = count
+    return cancelled
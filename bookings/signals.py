@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import autocomplete, catalog, connections, page_cache, summaries
+from .cache import bump_route_version
+from .models import TravelOption, SeatInventory, inventory_changed
+
+
+def _bump_route_on_commit(travel_option):
+    source_id, destination_id = travel_option.source_location_id, travel_option.destination_location_id
+    transaction.on_commit(lambda: bump_route_version(source_id, destination_id))
+
+
+def _purge_pages_on_commit():
+    transaction.on_commit(lambda: page_cache.purge(page_cache.TRAVEL_OPTIONS))
+
+
+def _refresh_summaries(*keys):
+    if summaries.is_deferred():
+        return
+    for i, key in enumerate(keys):
+        if key is not None and key not in keys[:i]:
+            summaries.refresh_route_summary(key)
+
+
+@receiver(pre_save, sender=TravelOption)
+def travel_option_saving(sender, instance, **kwargs):
+    """Remember which route summary an edited option counted towards."""
+    instance._previous_summary_key = None
+    if not instance._state.adding and not summaries.is_deferred():
+        previous = TravelOption.objects.filter(pk=instance.pk).only(
+            'type', 'source_location', 'destination_location', 'departure_datetime'
+        ).first()
+        if previous is not None:
+            instance._previous_summary_key = summaries.summary_key(previous)
+
+
+@receiver(post_save, sender=TravelOption)
+def travel_option_saved(sender, instance, created, **kwargs):
+    """Keep the autocomplete index in step with new and edited options once they commit."""
+    if created:
+        transaction.on_commit(lambda: autocomplete.add_travel_option(instance))
+    else:
+        # An edit may have renamed a city, so rebuild rather than patch
+        transaction.on_commit(autocomplete.bump_version)
+        transaction.on_commit(catalog.bump_version)
+    _bump_route_on_commit(instance)
+    _purge_pages_on_commit()
+    transaction.on_commit(connections.bump_version)
+    if not created:
+        # New options are counted once their inventory row exists, below
+        _refresh_summaries(summaries.summary_key(instance), getattr(instance, '_previous_summary_key', None))
+
+
+@receiver(post_save, sender=SeatInventory)
+def seat_inventory_created(sender, instance, created, **kwargs):
+    if created:
+        _refresh_summaries(summaries.summary_key(instance.travel_option))
+
+
+@receiver(post_delete, sender=TravelOption)
+def travel_option_deleted(sender, instance, **kwargs):
+    transaction.on_commit(autocomplete.bump_version)
+    transaction.on_commit(catalog.bump_version)
+    _bump_route_on_commit(instance)
+    _purge_pages_on_commit()
+    transaction.on_commit(connections.bump_epoch)
+    _refresh_summaries(summaries.summary_key(instance))
+
+
+@contextmanager
+def travel_option_deletes_muted():
+    """Disconnect the per-row TravelOption delete receiver around a bulk delete.
+
+    The receiver is disconnected process-wide, so this is for jobs and
+    management commands only; call ``invalidate_travel_options`` once the
+    deletes have committed.
+    """
+    post_delete.disconnect(travel_option_deleted, sender=TravelOption)
+    try:
+        yield
+    finally:
+        post_delete.connect(travel_option_deleted, sender=TravelOption)
+
+
+def invalidate_travel_options(routes):
+    """Invalidate the caches derived from travel options after a bulk change.
+
+    ``routes`` are the ``(source_location_id, destination_location_id)``
+    pairs whose search results changed. Route summaries are left to the
+    caller, which knows which dates to rebuild.
+    """
+    autocomplete.bump_version()
+    catalog.bump_version()
+    connections.bump_epoch()
+    page_cache.purge(page_cache.TRAVEL_OPTIONS)
+    for source_id, destination_id in routes:
+        bump_route_version(source_id, destination_id)
+
+
+@receiver(inventory_changed, sender=TravelOption)
+def travel_option_seats_changed(sender, travel_option, delta, **kwargs):
+    """Apply booked and released seats to the route summary after commit.
+
+    Deferring the UPDATE keeps the booking itself a single statement on the
+    inventory row. The hook is robust: the booking has committed by then, so
+    a failed summary update is logged rather than raised to the caller.
+    Options loaded without their route (e.g. a bare ``TravelOption(pk=...)``)
+    are skipped; ``rebuild_route_summaries`` repairs any drift.
+    """
+    if summaries.is_deferred():
+        return
+    key = summaries.summary_key(travel_option)
+    if key is not None and delta:
+        transaction.on_commit(lambda: summaries.adjust_route_seats(key, delta), robust=True)
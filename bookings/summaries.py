@@ -0,0 +1,241 @@
+"""Precomputed per route and day totals of the travel catalog.
+
+RouteSummary holds one row per (type, source, destination, local departure
+date) with the lowest price, the number of options and the seats left, so
+pages that only need those totals read a handful of rows instead of
+grouping the catalog. Rows are kept up to date from the model signals:
+saving or deleting a travel option recomputes the rows it belonged to in
+the same transaction, and seat changes are applied as a delta once the
+booking commits. Bulk writes either skip signals or run inside
+``deferred()``; both call ``rebuild_route_summaries`` for the dates they
+touched, which is also the repair path (``manage.py rebuild_route_summaries``).
+"""
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Min, Sum
+from django.db.models.functions import Greatest
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import search_cache_key
+from .models import TravelOption, RouteSummary
+from .search import local_day_range
+
+REBUILD_BATCH_SIZE = 2000
+# Popular routes rank departures in this many days from today, so a miss
+# groups a bounded slice of the table however far ahead the catalog goes
+POPULAR_ROUTES_DAYS = 30
+
+_state = threading.local()
+
+
+@contextmanager
+def deferred():
+    """Skip per-row summary maintenance; the caller rebuilds afterwards."""
+    previous = is_deferred()
+    _state.deferred = True
+    try:
+        yield
+    finally:
+        _state.deferred = previous
+
+
+def is_deferred():
+    return getattr(_state, 'deferred', False)
+
+
+def summary_key(travel_option):
+    """Return the RouteSummary lookup a travel option counts towards, or None."""
+    if None in (travel_option.type, travel_option.source_location_id,
+                travel_option.destination_location_id, travel_option.departure_datetime):
+        return None
+    return {
+        'type': travel_option.type,
+        'source_location_id': travel_option.source_location_id,
+        'destination_location_id': travel_option.destination_location_id,
+        'departure_date': timezone.localdate(travel_option.departure_datetime),
+    }
+
+
+def _totals(travel_options):
+    return travel_options.aggregate(
+        min_price=Min('price'),
+        option_count=Count('id'),
+        available_seats=Sum('inventory__available_seats'),
+    )
+
+
+def refresh_route_summary(key):
+    """Recompute one summary row from the catalog, deleting it if the day is now empty."""
+    start, end = local_day_range(key['departure_date'])
+    totals = _totals(TravelOption.objects.filter(
+        type=key['type'],
+        source_location_id=key['source_location_id'],
+        destination_location_id=key['destination_location_id'],
+        departure_datetime__gte=start,
+        departure_datetime__lt=end,
+    ))
+    if not totals['option_count']:
+        RouteSummary.objects.filter(**key).delete()
+        return None
+    totals['available_seats'] = totals['available_seats'] or 0
+    summary, _ = RouteSummary.objects.update_or_create(**key, defaults=totals)
+    return summary
+
+
+def adjust_route_seats(key, delta):
+    """Apply a seat count change to a summary row without recomputing it.
+
+    The count is clamped at zero: a row that has drifted is off until the
+    next rebuild rather than failing the booking that triggered the update.
+    """
+    RouteSummary.objects.filter(**key).update(available_seats=Greatest(F('available_seats') + delta, 0))
+
+
+def rebuild_route_summaries(date_from=None, date_to=None):
+    """Recompute every summary row between two local dates (inclusive).
+
+    The old rows are replaced in one transaction from a single GROUP BY over
+    the catalog. Returns the number of rows written.
+    """
+    travel_options = TravelOption.objects.filter(
+        source_location__isnull=False, destination_location__isnull=False
+    )
+    summaries = RouteSummary.objects.all()
+    if date_from:
+        travel_options = travel_options.filter(departure_datetime__gte=local_day_range(date_from)[0])
+        summaries = summaries.filter(departure_date__gte=date_from)
+    if date_to:
+        travel_options = travel_options.filter(departure_datetime__lt=local_day_range(date_to)[1])
+        summaries = summaries.filter(departure_date__lte=date_to)
+
+    groups = travel_options.annotate(
+        day=TruncDate('departure_datetime', tzinfo=timezone.get_current_timezone())
+    ).values('type', 'source_location_id', 'destination_location_id', 'day').annotate(
+        min_price=Min('price'),
+        option_count=Count('id'),
+        seats=Sum('inventory__available_seats'),
+    ).order_by()
+
+    with transaction.atomic():
+        rows = [
+            RouteSummary(
+                type=group['type'],
+                source_location_id=group['source_location_id'],
+                destination_location_id=group['destination_location_id'],
+                departure_date=group['day'],
+                min_price=group['min_price'],
+                option_count=group['option_count'],
+                available_seats=group['seats'] or 0,
+            )
+            for group in groups
+        ]
+        summaries.delete()
+        RouteSummary.objects.bulk_create(rows, batch_size=REBUILD_BATCH_SIZE)
+    return len(rows)
+
+
+def _popular_routes(limit, today):
+    today = today or timezone.localdate()
+    return (
+        RouteSummary.objects.filter(
+            departure_date__gte=today, departure_date__lt=today + timedelta(days=POPULAR_ROUTES_DAYS)
+        )
+        .values('type', 'source_location__name', 'destination_location__name')
+        .annotate(
+            departures=Sum('option_count'),
+            min_price=Min('min_price'),
+            next_date=Min('departure_date'),
+        )
+        .order_by('-departures', 'min_price')[:limit]
+    )
+
+
+def popular_routes(limit=6, today=None):
+    """Return the busiest routes over the next ``POPULAR_ROUTES_DAYS`` days, with their lowest fare."""
+    return list(_popular_routes(limit, today))
+
+
+async def apopular_routes(limit=6, today=None):
+    """Async ``popular_routes()``."""
+    return [route async for route in _popular_routes(limit, today)]
+
+
+def _months(first, last):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def _fare_days(route, first, last):
+    summaries = RouteSummary.objects.filter(
+        source_location__in=route['source_location_ids'],
+        destination_location__in=route['destination_location_ids'],
+        departure_date__gte=first,
+        departure_date__lte=last,
+    )
+    if route.get('type'):
+        summaries = summaries.filter(type=route['type'])
+    return summaries.values_list('departure_date').annotate(
+        min_price=Min('min_price'),
+        available_seats=Sum('available_seats'),
+        options=Sum('option_count'),
+    ).order_by('departure_date')
+
+
+def fare_calendar(cleaned_data, today=None):
+    """Return the lowest fare and seats left per day of a route's window.
+
+    ``cleaned_data`` comes from a valid FareCalendarForm. Days are read from
+    the route summaries and cached per route and calendar month under the
+    search cache's route versions, so editing a travel option on the route
+    invalidates them; seat counts may lag by ``SEARCH_CACHE_TIMEOUT``. All
+    months missing from the cache are filled by one GROUP BY query. Every
+    day of the window is returned, with ``min_price`` None when nothing
+    departs.
+    """
+    today = today or timezone.localdate()
+    first = max(cleaned_data.get('start') or today, today)
+    last = first + timedelta(days=cleaned_data['days'] - 1)
+    route = {
+        name: cleaned_data.get(name)
+        for name in ('type', 'source', 'destination', 'source_location_ids', 'destination_location_ids')
+    }
+
+    days = {}
+    if route['source_location_ids'] and route['destination_location_ids']:
+        keys = {
+            month: search_cache_key(route, ('fare_calendar', month.isoformat()))
+            for month in _months(first, last)
+        }
+        cached = cache.get_many([key for key, _ in keys.values()])
+        missing = [month for month, (key, _) in keys.items() if key not in cached]
+        if missing:
+            month_end = (missing[-1] + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            fetched = {keys[month][0]: [] for month in missing}
+            for row in _fare_days(route, missing[0], month_end):
+                key = keys[row[0].replace(day=1)][0]
+                if key in fetched:
+                    fetched[key].append(row)
+            cache.set_many(fetched, keys[missing[0]][1])
+            cached.update(fetched)
+        for key, _ in keys.values():
+            days.update((row[0], row) for row in cached[key])
+
+    calendar = []
+    for offset in range((last - first).days + 1):
+        day = first + timedelta(days=offset)
+        row = days.get(day)
+        calendar.append({
+            'date': day,
+            'min_price': row[1].quantize(Decimal('0.01')) if row else None,
+            'available_seats': row[2] if row else 0,
+            'options': row[3] if row else 0,
+        })
+    return calendar
@@ -0,0 +1,48 @@
+from django import template
+
+register = template.Library()
+
+PAGINATION_PARAMS = ('page', 'cursor')
+
+
+def page_window(page_obj, size=3):
+    """Return the page numbers to link to, with ``None`` marking a gap.
+
+    Only the first and last pages and ``size`` pages either side of the
+    current one are included, so the output stays the same length however
+    many pages there are.
+    """
+    current = page_obj.number
+    last = page_obj.paginator.num_pages
+    pages = sorted({1, last} | set(range(max(1, current - size), min(last, current + size) + 1)))
+
+    window = []
+    previous = 0
+    for number in pages:
+        if number - previous > 1:
+            window.append(None)
+        window.append(number)
+        previous = number
+    return window
+
+
+@register.inclusion_tag('bookings/pagination.html', takes_context=True)
+def pagination(context, page_obj, label='Pagination', size=3):
+    """Render previous/next and windowed page links for ``page_obj``.
+
+    The rest of the query string (filters) is encoded once per call rather
+    than once per link.
+    """
+    query = context['request'].GET.copy()
+    for param in PAGINATION_PARAMS:
+        query.pop(param, None)
+    querystring = query.urlencode()
+
+    cursor_pagination = context.get('cursor_pagination', False)
+    return {
+        'page_obj': page_obj,
+        'label': label,
+        'cursor_pagination': cursor_pagination,
+        'page_numbers': [] if cursor_pagination else page_window(page_obj, size),
+        'querystring': f'&{querystring}' if querystring else '',
+    }
@@ -1,11 +1,52 @@
-from django.test import TestCase, Client
-from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, AsyncRequestFactory, override_settings
+from django.core.paginator import Paginator
+from django.template import Template, Context
+from django.core.cache import cache
+from django.contrib.auth.models import User, AnonymousUser
 from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
-from datetime import timedelta
+from datetime import timedelta, date
+from unittest import skipUnless
+import csv
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from django.db import connection, transaction, OperationalError
+from django.db.models import Sum
+from django.conf import settings
+from django.core.management import call_command
+from django.test.utils import CaptureQueriesContext
+from django.http import Http404, HttpResponse
+from asgiref.sync import async_to_sync
 
-from .models import TravelOption, Booking, UserProfile
+from .models import (
+    TravelOption, Booking, UserProfile, Location, LocationAlias, SeatHold, BookingRequest, SeatInventory,
+    ArchivedTravelOption, ArchivedBooking, RouteSummary, inventory_changed,
+)
+from .services import (
+    book_many, hold_seats, confirm_hold, release_expired_holds, enqueue_booking, process_booking_queue,
+    cancel_travel_option_bookings, _release_holds, _claim_requests,
+)
+from .pagination import KeysetPaginator
+from .templatetags.pagination_tags import page_window
+from .autocomplete import CityIndex
+from .search import build_travel_queryset, local_day_range, facet_counts
+from .forms import TravelSearchForm
+from .cache import search_cache_stats, route_version_keys
+from .catalog import get_travel_option
+from .exports import iter_rows
+from .importers import import_travel_options
+from .archive import archive_past_departures
+from .summaries import rebuild_route_summaries, popular_routes, POPULAR_ROUTES_DAYS
+from .connections import get_graph
+from .benchmarks import scenarios, run_scenario, load_baseline
+from . import async_views, catalog, page_cache
+from .management.commands import stress_bookings
 
 
 class UserRegistrationTest(TestCase):
@@ -110,11 +151,349 @@ class BookingModelTest(TestCase):
         self.travel_option.refresh_from_db()
         self.assertEqual(self.travel_option.available_seats, initial_seats + 10)
 
+    def test_booking_fails_when_not_enough_seats(self):
+        """Test booking more seats than available leaves inventory untouched."""
+        with self.assertRaises(ValueError):
+            Booking.objects.create(
+                user=self.user,
+                travel_option=self.travel_option,
+                num_seats=101
+            )
+
+        self.assertFalse(Booking.objects.exists())
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 100)
+
+    def test_book_seats_is_single_conditional_update(self):
+        """Test seat reservation runs one UPDATE and no locking read."""
+        with self.assertNumQueries(1):
+            self.assertTrue(self.travel_option.book_seats(100))
+        self.assertFalse(self.travel_option.book_seats(1))
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 0)
+
+    def test_booking_cancelled_only_once(self):
+        """Test cancelling twice does not restore seats twice."""
+        booking = Booking.objects.create(
+            user=self.user,
+            travel_option=self.travel_option,
+            num_seats=10
+        )
+        stale_copy = Booking.objects.get(pk=booking.pk)
+
+        self.assertTrue(booking.cancel())
+        self.assertFalse(stale_copy.cancel())
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 100)
+
+
+class MultiLegBookingTest(TestCase):
+    """Test booking several travel options in one order."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.outbound = TravelOption.objects.create(
+            type='flight',
+            title='Outbound Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=10
+        )
+        self.inbound = TravelOption.objects.create(
+            type='flight',
+            title='Return Flight',
+            source='London',
+            destination='New York',
+            departure_datetime=timezone.now() + timedelta(days=8),
+            price=Decimal('450.00'),
+            available_seats=2
+        )
+
+    def test_book_many_success(self):
+        """Test all legs are booked with their own totals."""
+        bookings = book_many(self.user, [(self.outbound.pk, 2), (self.inbound.pk, 2)])
+
+        self.assertEqual(len(bookings), 2)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(bookings[1].total_price, Decimal('900.00'))
+        self.outbound.refresh_from_db()
+        self.inbound.refresh_from_db()
+        self.assertEqual(self.outbound.available_seats, 8)
+        self.assertEqual(self.inbound.available_seats, 0)
+
+    def test_book_many_rolls_back_when_a_leg_is_full(self):
+        """Test no seats are taken when any leg lacks seats."""
+        with self.assertRaises(ValueError):
+            book_many(self.user, [(self.outbound.pk, 2), (self.inbound.pk, 3)])
+
+        self.assertFalse(Booking.objects.exists())
+        self.outbound.refresh_from_db()
+        self.assertEqual(self.outbound.available_seats, 10)
+
+    def test_book_multiple_view(self):
+        """Test the multi-leg booking endpoint."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('bookings:book_multiple'), {
+            'travel_option': [self.outbound.pk, self.inbound.pk],
+            'num_seats': [1, 1],
+        })
+
+        self.assertRedirects(response, reverse('bookings:booking_list'))
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+
+
+class SeatHoldTest(TestCase):
+    """Test temporary seat holds during checkout."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=5
+        )
+
+    def test_hold_takes_seats(self):
+        """Test a hold removes seats from availability until it expires."""
+        hold = hold_seats(self.user, self.travel_option, 3)
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 2)
+        self.assertEqual(self.travel_option.held_seats(), 3)
+        self.assertTrue(hold.is_active)
+
+    def test_confirm_does_not_take_seats_again(self):
+        """Test confirming a hold books without a second seat decrement."""
+        hold = hold_seats(self.user, self.travel_option, 3)
+        booking = confirm_hold(hold)
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 2)
+        self.assertEqual(booking.total_price, Decimal('1500.00'))
+        self.assertEqual(SeatHold.objects.get(pk=hold.pk).booking, booking)
+
+    def test_expired_hold_cannot_be_confirmed(self):
+        """Test an expired hold is rejected at confirmation."""
+        hold = hold_seats(self.user, self.travel_option, 3, ttl=-1)
+
+        with self.assertRaises(ValueError):
+            confirm_hold(hold)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_sweeper_releases_expired_holds(self):
+        """Test the sweeper returns expired seats in one pass."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        hold_seats(self.user, self.travel_option, 2, ttl=-1)
+        hold_seats(other, self.travel_option, 1, ttl=-1)
+
+        self.assertEqual(release_expired_holds(), 3)
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 5)
+        self.assertFalse(SeatHold.objects.filter(status='active').exists())
+
+    def test_hold_reclaims_expired_seats(self):
+        """Test a hold succeeds by reclaiming unswept expired holds."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        hold_seats(other, self.travel_option, 5, ttl=-1)
+
+        hold = hold_seats(self.user, self.travel_option, 4)
+        self.assertTrue(hold.is_active)
+
+    def test_failed_new_hold_keeps_previous_one(self):
+        """Test asking for too many seats leaves the user's existing hold in place."""
+        hold = hold_seats(self.user, self.travel_option, 2)
+        with self.assertRaises(ValueError):
+            hold_seats(self.user, self.travel_option, 10)
+
+        self.assertEqual(SeatHold.objects.get(pk=hold.pk).status, 'active')
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 3)
+
+    def test_stale_holds_are_not_released_twice(self):
+        """Test holds converted or released after being read give back no seats."""
+        converted = hold_seats(self.user, self.travel_option, 2, ttl=-1)
+        released = hold_seats(User.objects.create_user(username='other'), self.travel_option, 1, ttl=-1)
+        stale = list(SeatHold.objects.values_list('id', 'num_seats'))
+        SeatHold.objects.filter(pk=converted.pk).update(status='converted')
+        self.assertEqual(release_expired_holds(), 1)
+
+        self.assertEqual(_release_holds(stale), 0)
+        self.assertEqual(SeatHold.objects.get(pk=released.pk).status, 'released')
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 3)
+
+    def test_bookings_reclaim_expired_seats(self):
+        """Test direct, multi-leg and queued bookings reclaim unswept expired holds."""
+        other = User.objects.create_user(username='other', password='testpass123')
+        book = {
+            'direct': lambda: Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=4),
+            'book_many': lambda: book_many(self.user, [(self.travel_option.pk, 4)]),
+            'queue': lambda: process_booking_queue(enqueue_booking(self.user, self.travel_option, 4).travel_option_id),
+        }
+        for name, booking in book.items():
+            with self.subTest(path=name):
+                Booking.objects.all().delete()
+                SeatHold.objects.all().delete()
+                self.travel_option.set_available_seats(5)
+                hold_seats(other, self.travel_option, 5, ttl=-1)
+
+                booking()
+                self.assertEqual(Booking.objects.filter(user=self.user, num_seats=4).count(), 1)
+                self.travel_option.refresh_from_db()
+                self.assertEqual(self.travel_option.available_seats, 1)
+
+    def test_checkout_views(self):
+        """Test holding and confirming through the views."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('bookings:hold_seats', kwargs={'pk': self.travel_option.pk}),
+            {'num_seats': 2}
+        )
+        hold = SeatHold.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('bookings:hold_detail', kwargs={'pk': hold.pk}))
+
+        response = self.client.post(reverse('bookings:confirm_hold', kwargs={'pk': hold.pk}))
+        booking = Booking.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('bookings:booking_detail', kwargs={'pk': booking.pk}))
+
+
+class BookingQueueTest(TestCase):
+    """Test the queued booking mode."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=5
+        )
+
+    def test_batch_takes_seats_once(self):
+        """Test a batch is confirmed with one seat UPDATE, first come first served."""
+        requests = [enqueue_booking(self.user, self.travel_option, n) for n in (2, 4, 3)]
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(process_booking_queue(self.travel_option.pk), (2, 1))
+        seat_updates = [
+            q for q in queries.captured_queries
+            if q['sql'].startswith('UPDATE') and 'available_seats' in q['sql']
+        ]
+        self.assertEqual(len(seat_updates), 1)
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 0)
+        statuses = [BookingRequest.objects.get(pk=r.pk).status for r in requests]
+        self.assertEqual(statuses, ['confirmed', 'rejected', 'confirmed'])
+        self.assertEqual(Booking.objects.filter(travel_option=self.travel_option).count(), 2)
+
+    def test_second_worker_cannot_claim_processed_batch(self):
+        """Test a batch read by two workers without SKIP LOCKED is processed once."""
+        requests = [enqueue_booking(self.user, self.travel_option, 1) for _ in range(3)]
+        stale = list(BookingRequest.objects.filter(status='pending'))
+        BookingRequest.objects.filter(pk=requests[0].pk).update(status='confirmed')
+
+        with transaction.atomic():
+            claimed = _claim_requests(stale)
+            self.assertEqual([r.pk for r in claimed], [r.pk for r in requests[1:]])
+            self.assertEqual(_claim_requests(stale), [])
+            transaction.set_rollback(True)
+
+    @override_settings(BOOKING_QUEUE_ENABLED=True)
+    def test_queued_booking_view(self):
+        """Test the booking form on the travel page queues the booking."""
+        self.client.login(username='testuser', password='testpass123')
+        page = self.client.get(reverse('bookings:travel_detail', kwargs={'pk': self.travel_option.pk}))
+        action = re.search(r'<form method="post" action="([^"]+)"', page.content.decode()).group(1)
+        response = self.client.post(action, {'num_seats': 2})
+        booking_request = BookingRequest.objects.get(user=self.user)
+        self.assertRedirects(response, reverse('bookings:booking_request_detail', kwargs={'pk': booking_request.pk}))
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(SeatHold.objects.exists())
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 5)
+
+        process_booking_queue(self.travel_option.pk)
+        response = self.client.get(reverse('bookings:booking_request_status', kwargs={'pk': booking_request.pk}))
+        self.assertEqual(response.json()['status'], 'confirmed')
+        self.assertEqual(response.json()['booking_id'], Booking.objects.get().pk)
+
+
+class BulkCancellationTest(TestCase):
+    """Test cancelling every booking on a disrupted travel option."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='train',
+            title='Test Train',
+            source='Paris',
+            destination='Berlin',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('80.00'),
+            available_seats=20
+        )
+        for num_seats in (1, 2, 3, 4):
+            Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=num_seats)
+        hold_seats(self.user, self.travel_option, 2)
+
+    def test_cancels_in_chunks_and_restores_seats_once(self):
+        """Test all bookings and holds are released with one seat UPDATE."""
+        with CaptureQueriesContext(connection) as queries:
+            cancelled = cancel_travel_option_bookings([self.travel_option.pk], chunk_size=3)
+        seat_updates = [q for q in queries.captured_queries if 'UPDATE "bookings_seatinventory"' in q['sql']]
+
+        self.assertEqual(cancelled, {self.travel_option.pk: 4})
+        self.assertEqual(len(seat_updates), 1)
+        self.assertFalse(Booking.objects.filter(status='confirmed').exists())
+        self.assertFalse(SeatHold.objects.filter(status='active').exists())
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 20)
+
+    def test_already_cancelled_bookings_are_not_refunded(self):
+        """Test bookings cancelled beforehand keep their seats counted once."""
+        Booking.objects.filter(num_seats=4).get().cancel()
+        cancel_travel_option_bookings([self.travel_option.pk])
+
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.available_seats, 20)
+
 
 class BookingViewsTest(TestCase):
     """Test booking views functionality."""
     
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -155,6 +534,1218 @@ class BookingViewsTest(TestCase):
         self.assertEqual(response.status_code, 302)
 
 
+class ConditionalGetTest(TestCase):
+    """Test ETag / Last-Modified handling of detail pages and JSON endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+        self.url = reverse('bookings:travel_detail', args=[self.travel_option.pk])
+
+    def test_unchanged_travel_detail_is_304_from_one_query(self):
+        """Test a revalidation with a matching ETag skips the load and render."""
+        etag = self.client.get(self.url)['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_seat_and_hold_changes_change_etag(self):
+        """Test bookings and seat holds invalidate the travel detail ETag."""
+        etag = self.client.get(self.url)['ETag']
+        Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=2)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '98')
+
+        etag = response['ETag']
+        hold_seats(self.user, self.travel_option, 3)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '3 more held')
+
+    def test_etag_depends_on_user_and_pending_messages(self):
+        """Test logging in or a queued flash message prevents a 304."""
+        etag = self.client.get(self.url)['ETag']
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        etag = response['ETag']
+        booking = Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=1)
+        booking.cancel()
+        self.client.post(reverse('bookings:cancel_booking', args=[booking.pk]))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'This booking cannot be cancelled.')
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_booking_detail_last_modified(self):
+        """Test booking detail revalidates by date and sees a cancellation."""
+        self.client.login(username='testuser', password='testpass123')
+        booking = Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=1)
+        url = reverse('bookings:booking_detail', args=[booking.pk])
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        booking.cancel()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Cancelled')
+
+    def test_json_endpoint_is_validated_by_content(self):
+        """Test an unchanged JSON payload is answered with 304."""
+        url = reverse('bookings:search_autocomplete')
+        params = {'q': 'lon', 'field': 'destination'}
+        etag = self.client.get(url, params)['ETag']
+        self.assertEqual(self.client.get(url, params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, {'q': 'new', 'field': 'source'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class KeysetPaginationTest(TestCase):
+    """Test cursor-based pagination of travel options."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        departure = timezone.now() + timedelta(days=1)
+        # Shared departure times exercise the id tie-breaker
+        for i in range(13):
+            TravelOption.objects.create(
+                type='bus',
+                title=f'Bus {i}',
+                source='Berlin',
+                destination='Hamburg',
+                departure_datetime=departure + timedelta(hours=i // 2),
+                price=Decimal('35.00'),
+                available_seats=40
+            )
+        self.queryset = TravelOption.objects.all()
+
+    def test_pages_forward_and_back(self):
+        """Test walking every page forwards then backwards."""
+        paginator = KeysetPaginator(self.queryset, 5, keys=('departure_datetime', 'id'))
+        expected = list(self.queryset.order_by('departure_datetime', 'id'))
+
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual(len(pages), 3)
+        self.assertEqual([obj for page in pages for obj in page], expected)
+        self.assertFalse(pages[0].has_previous())
+
+        self.assertEqual(list(paginator.get_page(pages[2].previous_cursor)), list(pages[1]))
+        self.assertEqual(list(paginator.get_page(pages[1].previous_cursor)), list(pages[0]))
+
+    def test_tampered_cursor_returns_first_page(self):
+        """Test an unsigned cursor falls back to the first page."""
+        paginator = KeysetPaginator(self.queryset, 3, keys=('departure_datetime', 'id'))
+        page = paginator.get_page('not-a-valid-cursor')
+        self.assertEqual(list(page), list(paginator.get_page()))
+
+    def test_travel_list_cursor_mode(self):
+        """Test travel list renders next links without counting rows."""
+        response = self.client.get(reverse('bookings:travel_list'), {'cursor': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['cursor_pagination'])
+        self.assertContains(response, '?cursor=')
+
+
+class PaginationTagTest(TestCase):
+    """Test the windowed pagination template tag."""
+
+    def test_page_window(self):
+        """Test only first, last and nearby pages are listed."""
+        page_obj = Paginator(range(10000), 10).get_page(500)
+        self.assertEqual(
+            page_window(page_obj),
+            [1, None, 497, 498, 499, 500, 501, 502, 503, None, 1000]
+        )
+        self.assertEqual(page_window(Paginator(range(30), 10).get_page(1)), [1, 2, 3])
+
+    def test_pagination_tag_preserves_filters(self):
+        """Test page links keep the other query parameters."""
+        request = RequestFactory().get('/travel/', {'page': 2, 'source': 'New York'})
+        page_obj = Paginator(range(100), 10).get_page(2)
+        html = Template('{% load pagination_tags %}{% pagination page_obj %}').render(
+            Context({'request': request, 'page_obj': page_obj})
+        )
+        self.assertIn('href="?page=3&amp;source=New+York"', html)
+        self.assertNotIn('page=2&amp;page', html)
+
+
+class AutocompleteTest(TestCase):
+    """Test the in-memory city index behind search autocomplete."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.url = reverse('bookings:search_autocomplete')
+        for source, destination in [('New York', 'London'), ('Newark', 'Boston')]:
+            TravelOption.objects.create(
+                type='flight',
+                title=f'{source} Flight',
+                source=source,
+                destination=destination,
+                departure_datetime=timezone.now() + timedelta(days=1),
+                price=Decimal('300.00'),
+                available_seats=100
+            )
+
+    def test_city_index_prefix_before_substring(self):
+        """Test prefix matches are listed before substring matches."""
+        index = CityIndex(['York', 'New York', 'Yorkshire', 'Boston'])
+        self.assertEqual(index.search('york'), ['York', 'Yorkshire', 'New York'])
+        self.assertEqual(index.search('zz'), [])
+
+    def test_autocomplete_does_not_query_database_when_warm(self):
+        """Test repeated lookups are served from the index."""
+        self.client.get(self.url, {'q': 'ne', 'field': 'source'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'q': 'ne', 'field': 'source'})
+        self.assertEqual(response.json()['results'], ['New York', 'Newark'])
+
+    def test_index_reads_one_row_per_city(self):
+        """Test the index is built from distinct names, not one row per departure."""
+        TravelOption.objects.create(
+            type='flight', title='Later New York Flight', source='New York', destination='London',
+            departure_datetime=timezone.now() + timedelta(days=2), price=Decimal('300.00'), available_seats=100
+        )
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {'q': 'ne', 'field': 'source'})
+        index_query = next(query['sql'] for query in queries if 'DISTINCT' in query['sql'])
+        self.assertNotIn('departure_datetime', index_query)
+
+    def test_autocomplete_sees_new_travel_options(self):
+        """Test saving a travel option updates the index once it commits."""
+        self.client.get(self.url, {'q': 'pa', 'field': 'destination'})
+        with self.assertRaises(ValueError), self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.create_eurostar('Prague')
+                raise ValueError('rolled back')
+        response = self.client.get(self.url, {'q': 'pr', 'field': 'destination'})
+        self.assertEqual(response.json()['results'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_eurostar('Paris')
+        response = self.client.get(self.url, {'q': 'pa', 'field': 'destination'})
+        self.assertEqual(response.json()['results'], ['Paris'])
+
+    def create_eurostar(self, destination):
+        return TravelOption.objects.create(
+            type='train',
+            title=f'Eurostar to {destination}',
+            source='London',
+            destination=destination,
+            departure_datetime=timezone.now() + timedelta(days=2),
+            price=Decimal('120.00'),
+            available_seats=300
+        )
+
+
+class LocationSearchTest(TestCase):
+    """Test route search through normalized locations."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.flight = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+        self.bus = TravelOption.objects.create(
+            type='bus',
+            title='Test Bus',
+            source='new york ',
+            destination='Boston',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('45.00'),
+            available_seats=50
+        )
+
+    def test_travel_options_share_normalized_location(self):
+        """Test differently typed names resolve to one location."""
+        self.assertEqual(self.flight.source_location, self.bus.source_location)
+        self.assertEqual(self.flight.source_location.slug, 'new-york')
+
+    def test_resolve_alias_and_prefix(self):
+        """Test aliases match exactly and partial names match by prefix."""
+        new_york = self.flight.source_location
+        LocationAlias.objects.create(location=new_york, name='NYC')
+
+        self.assertEqual(Location.resolve('nyc'), [new_york.pk])
+        self.assertEqual(Location.resolve('New'), [new_york.pk])
+        self.assertEqual(Location.resolve('Paris'), [])
+
+    def test_resolve_prefix_is_capped_and_anchored(self):
+        """Test prefix matches are capped and only match from the start of the name."""
+        for i in range(Location.PREFIX_MATCH_LIMIT + 3):
+            Location.for_name(f'Newport {i}')
+
+        self.assertEqual(len(Location.resolve('new')), Location.PREFIX_MATCH_LIMIT)
+        self.assertEqual(Location.resolve('York'), [])
+
+    def test_travel_list_filters_by_location(self):
+        """Test route search uses the resolved locations."""
+        response = self.client.get(reverse('bookings:travel_list'), {
+            'source': 'NEW YORK', 'destination': 'london'
+        })
+        self.assertEqual(list(response.context['travel_options']), [self.flight])
+
+
+class SearchQueryTest(TestCase):
+    """Test the sargable search query builder."""
+
+    def setUp(self):
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+
+    def search(self, **data):
+        form = TravelSearchForm(data)
+        self.assertTrue(form.is_valid(), form.errors)
+        return build_travel_queryset(form.cleaned_data)
+
+    def test_local_day_range_is_half_open(self):
+        """Test a date becomes a [midnight, next midnight) range."""
+        start, end = local_day_range(date(2030, 3, 1))
+        self.assertEqual(end - start, timedelta(days=1))
+        self.assertEqual(timezone.localtime(start).hour, 0)
+
+    def test_departure_date_filter(self):
+        """Test the date range matches options departing that day."""
+        day = timezone.localtime(self.travel_option.departure_datetime).date()
+        self.assertEqual(list(self.search(departure_date=day)), [self.travel_option])
+        self.assertFalse(self.search(departure_date=day + timedelta(days=1)).exists())
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is backend specific')
+    def test_date_search_uses_departure_index(self):
+        """Test a date search is an index range read, not a table scan."""
+        day = timezone.localtime(self.travel_option.departure_datetime).date()
+        plan = self.search(departure_date=day).explain()
+        self.assertNotIn('SCAN bookings_traveloption', plan)
+        self.assertIn('departure_datetime>', plan)
+
+    @skipUnless(connection.vendor == 'sqlite', 'EXPLAIN output is backend specific')
+    def test_route_search_uses_composite_index(self):
+        """Test type + route + date searches use the composite index."""
+        day = timezone.localtime(self.travel_option.departure_datetime).date()
+        plan = self.search(
+            type='flight', source='New York', destination='London', departure_date=day
+        ).explain()
+        self.assertIn('travel_type_route_dep_idx', plan)
+
+        plan = self.search(source='New York', destination='London').explain()
+        self.assertIn('travel_route_dep_idx', plan)
+
+    def test_facet_counts_in_one_query(self):
+        """Test type, price and departure hour counts come from a single query."""
+        start = local_day_range(timezone.localdate() + timedelta(days=2))[0]
+        for hour, price in ((7, '80.00'), (19, '300.00')):
+            TravelOption.objects.create(
+                type='bus', title=f'Bus {hour}', source='Boston', destination='New York',
+                departure_datetime=start + timedelta(hours=hour), price=Decimal(price), available_seats=40
+            )
+        with self.assertNumQueries(1):
+            facets = facet_counts(self.search())
+        counts = {label: [bucket['count'] for bucket in buckets] for label, buckets in facets['groups']}
+
+        self.assertEqual(facets['total'], 3)
+        self.assertEqual(counts['Type'], [1, 0, 2])
+        self.assertEqual(counts['Price'], [1, 0, 1, 1])
+        self.assertEqual(sum(counts['Departure']), 3)
+        self.assertEqual(facet_counts(self.search(type='bus'))['total'], 2)
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+    def test_travel_list_caches_facets_with_results(self):
+        """Test the facets are served from the cached search page."""
+        cache.clear()
+        url = reverse('bookings:travel_list')
+        self.client.get(url, {'type': 'flight'})
+        with self.assertNumQueries(1):  # live seat counts only
+            response = self.client.get(url, {'type': 'flight'})
+        flight = response.context['facets']['groups'][0][1][0]
+        self.assertEqual(flight['count'], 1)
+        self.assertEqual(flight['url'], '?type=flight')
+
+
+@override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+class SearchCacheTest(TestCase):
+    """Test the versioned search result cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+        self.url = reverse('bookings:travel_list')
+        self.params = {'source': 'New York', 'destination': 'London'}
+
+    def test_repeated_search_is_a_cache_hit(self):
+        """Test the second identical search skips the result queries."""
+        self.client.get(self.url, self.params)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'source': 'new york', 'destination': 'LONDON'})
+        self.assertFalse(any('bookings_traveloption' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(list(response.context['travel_options']), [self.travel_option])
+        self.assertEqual(search_cache_stats()['hits'], 1)
+        self.assertEqual(search_cache_stats()['misses'], 1)
+
+    def test_booking_keeps_cached_search_with_live_seats(self):
+        """Test a booking shows the new seat count without invalidating the search."""
+        self.client.get(self.url, self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=5)
+
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.context['travel_options'][0].available_seats, 95)
+        self.assertEqual(search_cache_stats()['misses'], 1)
+
+    def test_editing_option_invalidates_route_searches(self):
+        """Test editing a travel option refreshes cached searches for its route."""
+        self.client.get(self.url, self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.travel_option.price = Decimal('450.00')
+            self.travel_option.save()
+
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(response.context['travel_options'][0].price, Decimal('450.00'))
+        self.assertEqual(search_cache_stats()['misses'], 2)
+
+
+class PageCacheTest(TestCase):
+    """Test the full-page cache of anonymous home and browse pages."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+        self.url = reverse('bookings:travel_list')
+
+    def test_repeat_visit_is_served_without_queries(self):
+        """Test the second anonymous visit, in any query order, skips the view."""
+        response = self.client.get(f'{self.url}?type=flight&source=')
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(f'{self.url}?source=&type=flight')
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Test Flight')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_saving_an_option_purges_pages(self):
+        """Test an edit makes the next visit re-render the page."""
+        params = {'source': 'New York', 'destination': 'London'}
+        self.client.get(self.url, params)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.travel_option.title = 'Renamed Flight'
+            self.travel_option.save()
+
+        response = self.client.get(self.url, params)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Renamed Flight')
+
+    def test_stale_page_served_while_another_request_renders(self):
+        """Test a purged page is served stale while the lock is held."""
+        self.client.get(self.url)
+        page_cache.purge(page_cache.TRAVEL_OPTIONS)
+        cache.add(f'{page_cache.page_key(RequestFactory().get(self.url))}:lock', 1)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertContains(response, 'Test Flight')
+
+    def test_keeps_lock_taken_over_after_timeout(self):
+        """Test a slow render does not release the lock another request now holds."""
+        lock = f'{page_cache.page_key(RequestFactory().get("/slow/"))}:lock'
+
+        def view(request):
+            # Our lock expired mid-render and another request took it
+            cache.set(lock, 'successor')
+            return HttpResponse('page')
+
+        async def async_view(request):
+            return view(request)
+
+        cached = page_cache.anonymous_page_cache(page_cache.TRAVEL_OPTIONS)
+        for render in (cached(view), async_to_sync(cached(async_view))):
+            with self.subTest(render=render):
+                cache.clear()
+                self.assertEqual(render(RequestFactory().get('/slow/'))['X-Page-Cache'], 'miss')
+                self.assertEqual(cache.get(lock), 'successor')
+
+    def test_logged_in_visitors_bypass_cache(self):
+        """Test requests with a session are rendered for the user."""
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.get(self.url)
+        self.client.force_login(user)
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Page-Cache', response)
+        self.assertContains(response, 'testuser')
+
+    def test_async_view_shares_pages(self):
+        """Test a page stored by the sync view is a hit for the async one."""
+        self.client.get(reverse('bookings:home'))
+        request = AsyncRequestFactory().get(reverse('bookings:home'))
+        request.user = AnonymousUser()
+        response = async_to_sync(async_views.home)(request)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Test Flight')
+
+
+class SeatInventoryTest(TestCase):
+    """Test the split seat inventory and the static catalog cache."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=10
+        )
+
+    def test_booking_only_updates_inventory(self):
+        """Test booking leaves the travel option row untouched."""
+        updated_at = self.travel_option.updated_at
+        with CaptureQueriesContext(connection) as queries:
+            Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=3)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+
+        self.assertEqual(len(updates), 1)
+        self.assertIn('bookings_seatinventory', updates[0])
+        self.assertEqual(SeatInventory.objects.get(pk=self.travel_option.pk).available_seats, 7)
+        self.travel_option.refresh_from_db()
+        self.assertEqual(self.travel_option.updated_at, updated_at)
+
+    def test_catalog_reads_only_live_seats(self):
+        """Test cached travel options skip the static row but see new seat counts."""
+        get_travel_option(self.travel_option.pk)
+        self.travel_option.book_seats(4)
+
+        with CaptureQueriesContext(connection) as queries:
+            travel_option = get_travel_option(self.travel_option.pk)
+        self.assertEqual(travel_option.available_seats, 6)
+        self.assertEqual(travel_option.title, 'Test Flight')
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('bookings_traveloption', queries[0]['sql'])
+
+    def test_catalog_drops_edited_options(self):
+        """Test editing a travel option invalidates the cached copy once it commits."""
+        get_travel_option(self.travel_option.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.travel_option.title = 'Renamed Flight'
+            self.travel_option.save()
+        self.assertIn(catalog.bump_version, callbacks)
+
+        self.assertEqual(get_travel_option(self.travel_option.pk).title, 'Renamed Flight')
+
+
+class ExportTest(TestCase):
+    """Test the streaming booking and travel option exports."""
+
+    def setUp(self):
+        self.client = Client()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        for i, travel_type in enumerate(['flight', 'train', 'bus']):
+            travel_option = TravelOption.objects.create(
+                type=travel_type,
+                title=f'Option {i}',
+                source='New York',
+                destination='London',
+                departure_datetime=timezone.now() + timedelta(days=i + 1),
+                price=Decimal('100.00'),
+                available_seats=50
+            )
+            Booking.objects.create(user=self.user, travel_option=travel_option, num_seats=i + 1)
+        Booking.objects.first().cancel()
+
+    def test_booking_csv_joins_related_columns(self):
+        """Test the CSV export streams filtered bookings with user and option columns."""
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('bookings:export_bookings'), {'status': 'confirmed'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['username'], 'testuser')
+        self.assertEqual(rows[0]['travel_option_title'], 'Option 0')
+
+    def test_ndjson_travel_options(self):
+        """Test the NDJSON export filters travel options by type."""
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('bookings:export_travel_options'), {'format': 'ndjson', 'type': 'train'})
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ['Option 1'])
+        self.assertEqual(json.loads(lines[0])['available_seats'], 48)
+
+    def test_rows_are_read_in_chunks(self):
+        """Test exports run one query per chunk, not per row."""
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(iter_rows(Booking.objects.all(), ['user__username', 'travel_option__title'], chunk_size=2))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len(queries), 2)
+
+    def test_export_requires_staff(self):
+        """Test regular users cannot download exports."""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('bookings:export_bookings'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_export_command(self):
+        """Test the management command writes the export to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bookings.csv')
+            call_command('export_data', 'bookings', '--type', 'bus', '--output', path, stderr=io.StringIO())
+            with open(path, newline='') as export:
+                rows = list(csv.DictReader(export))
+        self.assertEqual([row['travel_type'] for row in rows], ['bus'])
+
+
+class ImportTest(TestCase):
+    """Test the batched timetable importer."""
+
+    def setUp(self):
+        self.departure = timezone.now().replace(microsecond=0) + timedelta(days=3)
+        self.existing = TravelOption.objects.create(
+            type='train',
+            title='TR-100',
+            source='Paris',
+            destination='Berlin',
+            departure_datetime=self.departure,
+            price=Decimal('80.00'),
+            available_seats=100
+        )
+        self.existing.book_seats(10)
+
+    def row(self, **overrides):
+        row = {
+            'type': 'train', 'title': 'TR-100', 'source': 'Paris', 'destination': 'Berlin',
+            'departure_datetime': self.departure.isoformat(), 'price': '95.00', 'available_seats': '100',
+        }
+        row.update(overrides)
+        return row
+
+    def test_upserts_on_natural_key(self):
+        """Test existing services are updated in place and new ones created with seats."""
+        result = import_travel_options(enumerate([
+            self.row(),
+            self.row(title='TR-200', destination='Munich', available_seats='40'),
+        ], start=2), batch_size=1)
+
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(TravelOption.objects.count(), 2)
+        self.existing.refresh_from_db()
+        self.assertEqual(self.existing.price, Decimal('95.00'))
+        self.assertEqual(self.existing.available_seats, 90)
+        created = TravelOption.objects.get(title='TR-200')
+        self.assertEqual(created.available_seats, 40)
+        self.assertEqual(created.destination_location.name, 'Munich')
+
+    def test_invalid_rows_are_reported(self):
+        """Test rows breaking the field rules are skipped with their line numbers."""
+        result = import_travel_options(enumerate([
+            self.row(type='boat'),
+            self.row(price='-5'),
+            '{not json',
+            self.row(title='TR-300', available_seats='many'),
+        ], start=2))
+
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual([line for line, _ in result['errors']], [2, 3, 4, 5])
+        self.assertIn('type', result['errors'][0][1])
+
+    def test_import_command_reads_csv(self):
+        """Test the management command streams a CSV file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'timetable.csv')
+            with open(path, 'w', newline='') as timetable:
+                writer = csv.DictWriter(timetable, fieldnames=list(self.row()))
+                writer.writeheader()
+                writer.writerow(self.row(title='TR-400'))
+            call_command('import_travel_options', path, stdout=io.StringIO())
+
+        self.assertTrue(TravelOption.objects.filter(title='TR-400').exists())
+
+
+class SeedTravelOptionsTest(TestCase):
+    """Test the synthetic catalog generator."""
+
+    def generate(self, seed):
+        cache.clear()
+        call_command(
+            'seed_travel_options', generate=True, seed=seed, options=60, routes=8, users=5, bookings=40,
+            days=10, stdout=io.StringIO(),
+        )
+        first = TravelOption.objects.order_by('departure_datetime').values_list('departure_datetime', flat=True)[0]
+        options = [
+            (title, travel_type, source, destination, departs - first, arrives - departs, price, seats)
+            for title, travel_type, source, destination, departs, arrives, price, seats in
+            TravelOption.objects.order_by('title').values_list(
+                'title', 'type', 'source', 'destination', 'departure_datetime', 'arrival_datetime', 'price',
+                'inventory__available_seats',
+            )
+        ]
+        first_booked = Booking.objects.order_by('booking_date').values_list('booking_date', flat=True)[0]
+        bookings = [
+            (title, username, num_seats, status, booked - first_booked)
+            for title, username, num_seats, status, booked in
+            Booking.objects.order_by('travel_option__title', 'user__username', 'id').values_list(
+                'travel_option__title', 'user__username', 'num_seats', 'status', 'booking_date',
+            )
+        ]
+        return options, bookings
+
+    def test_same_seed_same_catalog(self):
+        """Test a rerun with the same seed replaces the catalog with identical data."""
+        old_bus = TravelOption.objects.create(
+            type='bus', title='Old Bus', source='Leeds', destination='York',
+            departure_datetime=timezone.now() + timedelta(days=1), price=Decimal('10.00'), available_seats=20
+        )
+        Booking.objects.create(user=User.objects.create_user(username='traveller'), travel_option=old_bus, num_seats=1)
+        options, bookings = self.generate(seed=7)
+        self.assertEqual(len(options), 60)
+        self.assertNotIn('Old Bus', [option[0] for option in options])
+        self.assertTrue(bookings)
+        self.assertGreater(len({booking[4] for booking in bookings}), 1)
+        self.assertTrue(Booking.objects.filter(booking_date__lt=timezone.now() - timedelta(days=1)).exists())
+        self.assertEqual(RouteSummary.objects.aggregate(count=Sum('option_count'))['count'], 60)
+
+        self.assertEqual(self.generate(seed=7), (options, bookings))
+        self.assertNotEqual(self.generate(seed=8)[0], options)
+
+
+class StressBookingsTest(TransactionTestCase):
+    """Test the concurrent booking stress command."""
+
+    def test_error_after_commit_is_not_retried(self):
+        """Test a lock error from an on_commit hook does not book twice."""
+        travel_option = TravelOption.objects.create(
+            type='flight', title='Stress test 1', source='Stress City', destination='Hot Route 1',
+            departure_datetime=timezone.now() + timedelta(days=30), price=Decimal('100.00'), available_seats=50
+        )
+        user = User.objects.create_user(username='stressuser0000')
+        failed = []
+
+        def fail_once_after_commit(sender, **kwargs):
+            def hook():
+                if not failed:
+                    failed.append(True)
+                    raise OperationalError('database is locked')
+            transaction.on_commit(hook)
+
+        inventory_changed.connect(fail_once_after_commit, sender=TravelOption)
+        try:
+            result = stress_bookings._run_operation((1, [travel_option.pk], [user.pk], 0, 1, 3))
+        finally:
+            inventory_changed.disconnect(fail_once_after_commit, sender=TravelOption)
+        self.assertTrue(failed)
+        self.assertEqual(result[:2], ('book', 'ok'))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_smoke_on_file_database(self):
+        """Test a short threaded run on file-based SQLite keeps the inventory consistent."""
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'DATABASE_URL': f'sqlite:///{directory}/stress.db'}
+            manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+            subprocess.run([*manage, 'migrate', '-v0'], env=env, check=True)
+            run = subprocess.run(
+                [*manage, 'stress_bookings', '--operations', '200', '--workers', '4', '--options', '2',
+                 '--capacity', '50'],
+                env=env, capture_output=True, text=True,
+            )
+        self.assertEqual(run.returncode, 0, run.stderr)
+        self.assertIn('Seat inventory consistent', run.stdout)
+        self.assertIn('Failure rate:    0.00%', run.stdout)
+
+
+class ArchiveTest(TestCase):
+    """Test archiving past departures and reading them back as past trips."""
+
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.past = TravelOption.objects.create(
+            type='bus',
+            title='Past Bus',
+            source='Boston',
+            destination='New York',
+            departure_datetime=timezone.now() - timedelta(days=60),
+            arrival_datetime=timezone.now() - timedelta(days=60, hours=-4),
+            price=Decimal('30.00'),
+            available_seats=40
+        )
+        self.upcoming = TravelOption.objects.create(
+            type='flight',
+            title='Upcoming Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=5),
+            price=Decimal('500.00'),
+            available_seats=40
+        )
+        self.past_bookings = [
+            Booking.objects.create(user=self.user, travel_option=self.past, num_seats=n) for n in (1, 2, 3)
+        ]
+        self.upcoming_booking = Booking.objects.create(user=self.user, travel_option=self.upcoming, num_seats=1)
+
+    def test_moves_past_departures(self):
+        """Test past options and their bookings leave the hot tables intact."""
+        cutoff = timezone.now() - timedelta(days=30)
+        self.assertEqual(archive_past_departures(cutoff, chunk_size=2), (1, 3))
+
+        self.assertFalse(TravelOption.objects.filter(pk=self.past.pk).exists())
+        self.assertEqual(Booking.objects.count(), 1)
+        archived = ArchivedBooking.objects.get(pk=self.past_bookings[2].pk)
+        self.assertEqual(archived.total_price, Decimal('90.00'))
+        self.assertEqual(archived.travel_option.title, 'Past Bus')
+        archived_option = ArchivedTravelOption.objects.get()
+        self.assertEqual(archived_option.available_seats, 34)
+        self.assertEqual(archived_option.arrival_datetime, self.past.arrival_datetime)
+
+    def test_caches_invalidated_once(self):
+        """Test archiving skips the per-option delete receiver and invalidates once at the end."""
+        for day in (40, 50):
+            TravelOption.objects.create(
+                type='bus', title=f'Past Bus {day}', source='Boston', destination='New York',
+                departure_datetime=timezone.now() - timedelta(days=day), price=Decimal('30.00'), available_seats=40
+            )
+        cache.clear()
+        route_key = route_version_keys([self.past.source_location_id], [self.past.destination_location_id])[0]
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(archive_past_departures(timezone.now(), chunk_size=2), (3, 3))
+        self.assertEqual(callbacks, [])
+        self.assertEqual(cache.get(route_key), 1)
+        self.assertIsNotNone(cache.get(catalog.VERSION_KEY))
+
+    def test_booking_list_merges_archive(self):
+        """Test booking history shows hot and archived bookings newest first."""
+        archive_past_departures(timezone.now())
+        self.client.login(username='testuser', password='testpass123')
+        expected = [self.upcoming_booking.pk] + [booking.pk for booking in reversed(self.past_bookings)]
+
+        response = self.client.get(reverse('bookings:booking_list'))
+        self.assertEqual([booking.pk for booking in response.context['bookings']], expected)
+        self.assertContains(response, 'Past trip')
+
+        response = self.client.get(reverse('bookings:booking_list'), {'cursor': ''})
+        self.assertEqual([booking.pk for booking in response.context['bookings']], expected)
+
+    def test_archived_booking_detail(self):
+        """Test past trips stay reachable from their old booking URL."""
+        archive_past_departures(timezone.now())
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('bookings:booking_detail', kwargs={'pk': self.past_bookings[0].pk}))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'cancelModal')
+
+
+class RouteSummaryTest(TestCase):
+    """Test the per route and day summaries follow catalog and seat changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.day = timezone.localdate() + timedelta(days=3)
+        start = local_day_range(self.day)[0]
+        self.morning, self.evening = [
+            TravelOption.objects.create(
+                type='train',
+                title=f'Train {hour}',
+                source='London',
+                destination='Paris',
+                departure_datetime=start + timedelta(hours=hour),
+                price=price,
+                available_seats=50
+            )
+            for hour, price in ((9, Decimal('120.00')), (18, Decimal('90.00')))
+        ]
+
+    def summary(self, day=None):
+        return RouteSummary.objects.get(type='train', departure_date=day or self.day)
+
+    def test_summary_tracks_options_and_seats(self):
+        """Test new options, bookings and cancellations update the day's row."""
+        summary = self.summary()
+        self.assertEqual((summary.option_count, summary.min_price, summary.available_seats), (2, Decimal('90.00'), 100))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(user=self.user, travel_option=self.morning, num_seats=4)
+        self.assertEqual(self.summary().available_seats, 96)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.cancel()
+        self.assertEqual(self.summary().available_seats, 100)
+
+    def test_edits_move_option_between_days(self):
+        """Test rescheduling and deleting recompute the rows involved."""
+        self.evening.departure_datetime += timedelta(days=1)
+        self.evening.save()
+        self.assertEqual((self.summary().option_count, self.summary().min_price), (1, Decimal('120.00')))
+        self.assertEqual(self.summary(self.day + timedelta(days=1)).option_count, 1)
+
+        self.morning.delete()
+        self.assertFalse(RouteSummary.objects.filter(departure_date=self.day).exists())
+
+    def test_drifted_row_does_not_fail_booking(self):
+        """Test a seat delta below zero is clamped after the booking commits."""
+        RouteSummary.objects.update(available_seats=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.user, travel_option=self.morning, num_seats=4)
+        self.assertEqual(self.summary().available_seats, 0)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_rebuild_matches_incremental_rows(self):
+        """Test a full rebuild reproduces the incrementally maintained rows."""
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.user, travel_option=self.evening, num_seats=2)
+        fields = ('type', 'source_location', 'destination_location', 'departure_date', 'min_price', 'option_count', 'available_seats')
+        before = list(RouteSummary.objects.values_list(*fields))
+        RouteSummary.objects.update(available_seats=0)
+
+        self.assertEqual(rebuild_route_summaries(), 1)
+        self.assertEqual(list(RouteSummary.objects.values_list(*fields)), before)
+
+    def test_fare_calendar_reads_cached_summaries(self):
+        """Test the fare calendar returns every day and is cached per route and month."""
+        url = reverse('bookings:fare_calendar')
+        params = {'source': 'London', 'destination': 'Paris', 'start': self.day - timedelta(days=1), 'days': 3}
+        days = self.client.get(url, params).json()['days']
+
+        self.assertEqual([day['date'] for day in days], [str(self.day + timedelta(days=n)) for n in (-1, 0, 1)])
+        self.assertEqual(days[1], {'date': str(self.day), 'min_price': '90.00', 'available_seats': 100, 'options': 2})
+        self.assertIsNone(days[0]['min_price'])
+        with self.assertNumQueries(2):  # resolving the two cities
+            self.assertEqual(self.client.get(url, params).json()['days'], days)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.evening.price = Decimal('150.00')
+            self.evening.save()
+        self.assertEqual(self.client.get(url, params).json()['days'][1]['min_price'], '120.00')
+        self.assertEqual(self.client.get(url, {'source': 'London'}).status_code, 400)
+
+    def test_home_lists_popular_routes(self):
+        """Test the home page shows routes read from the summaries."""
+        response = self.client.get(reverse('bookings:home'))
+        self.assertEqual(response.context['popular_routes'][0]['departures'], 2)
+        self.assertContains(response, 'Popular Routes')
+
+    def test_popular_routes_only_count_the_next_days(self):
+        """Test departures beyond the popular routes window are not grouped."""
+        start = local_day_range(timezone.localdate() + timedelta(days=POPULAR_ROUTES_DAYS))[0]
+        for hour in (8, 10, 12):
+            TravelOption.objects.create(
+                type='bus', title=f'Far Bus {hour}', source='Leeds', destination='York',
+                departure_datetime=start + timedelta(hours=hour), price=Decimal('10.00'), available_seats=20
+            )
+        routes = popular_routes()
+        self.assertEqual([(route['type'], route['departures']) for route in routes], [('train', 2)])
+
+
+class ConnectionFinderTest(TestCase):
+    """Test multi-leg itineraries from the in-memory connection graph."""
+
+    def setUp(self):
+        cache.clear()
+        self.day = timezone.localdate() + timedelta(days=2)
+        self.start = local_day_range(self.day)[0]
+        self.feeder = self.create('UA-1', 'Chicago', 'New York', 8, 10, '100.00')
+        self.onward = self.create('BA-2', 'New York', 'London', 12, 20, '400.00')
+        self.direct = self.create('AA-3', 'Chicago', 'London', 9, 23, '900.00')
+        # Leaves 30 minutes after the feeder lands, below the minimum connection
+        self.create('VS-4', 'New York', 'London', 10.5, 18, '300.00')
+
+    def create(self, title, source, destination, departs, arrives, price):
+        return TravelOption.objects.create(
+            type='flight', title=title, source=source, destination=destination,
+            departure_datetime=self.start + timedelta(hours=departs),
+            arrival_datetime=self.start + timedelta(hours=arrives),
+            price=Decimal(price), available_seats=10
+        )
+
+    def search(self, **params):
+        params = {'source': 'Chicago', 'destination': 'London', 'date': self.day, **params}
+        response = self.client.get(reverse('bookings:connections'), params)
+        self.assertEqual(response.status_code, 200)
+        return [[leg['title'] for leg in itinerary['legs']] for itinerary in response.json()['itineraries']]
+
+    def test_ranks_by_arrival_and_price(self):
+        """Test itineraries respect the minimum connection and sort order."""
+        self.assertEqual(self.search(), [['UA-1', 'BA-2'], ['AA-3']])
+        self.assertEqual(self.search(sort='price', limit=1), [['UA-1', 'BA-2']])
+        self.assertEqual(self.search(max_legs=1), [['AA-3']])
+        self.assertEqual(self.search(min_connection=0), [['UA-1', 'VS-4'], ['UA-1', 'BA-2'], ['AA-3']])
+
+    def test_price_sort_keeps_pricier_leg_that_connects(self):
+        """Test cheaper arrivals that miss the connection do not crowd out one that makes it."""
+        for hour in (15, 16, 17):
+            self.create(f'CH-{hour}', 'Denver', 'Houston', hour, 20, '50.00')
+        self.create('EX-1', 'Denver', 'Houston', 6, 8, '150.00')
+        self.create('HB-1', 'Houston', 'Boston', 10, 13, '100.00')
+        for limit in (1, 2, 3):
+            with self.subTest(limit=limit):
+                self.assertEqual(
+                    self.search(source='Denver', destination='Boston', sort='price', limit=limit),
+                    [['EX-1', 'HB-1']]
+                )
+
+    def test_arrivals_too_early_to_connect_do_not_crowd_out_later_one(self):
+        """Test arrivals more than MAX_WAIT before every onward leg do not count against the limit."""
+        self.create('OH-1', 'Oslo', 'Hanoi', 0.5, 1, '50.00')
+        self.create('OH-2', 'Oslo', 'Hanoi', 0.5, 1 + 1 / 60, '60.00')
+        self.create('OH-3', 'Oslo', 'Hanoi', 9, 10, '200.00')
+        self.create('HD-1', 'Hanoi', 'Dakar', 15, 20, '100.00')
+        for sort in ('arrival', 'price'):
+            for limit in (1, 2):
+                with self.subTest(sort=sort, limit=limit):
+                    self.assertEqual(
+                        self.search(source='Oslo', destination='Dakar', max_legs=2, sort=sort, limit=limit),
+                        [['OH-3', 'HD-1']]
+                    )
+
+    def test_graph_picks_up_changes(self):
+        """Test saved and deleted options reach the graph without a full reload."""
+        self.search()
+        graph = get_graph()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create('DL-5', 'New York', 'London', 11, 17, '350.00')
+        self.assertEqual(self.search(limit=1), [['UA-1', 'DL-5']])
+        self.assertIs(get_graph(), graph)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.feeder.delete()
+        self.assertEqual(self.search(), [['AA-3']])
+
+    def test_skips_legs_without_seats(self):
+        """Test itineraries with a sold-out leg are dropped."""
+        self.onward.set_available_seats(0)
+        self.assertEqual(self.search(), [['AA-3']])
+
+
+class AsyncViewsTest(TestCase):
+    """Test the async read views against their sync counterparts."""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = AsyncRequestFactory()
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+        TravelOption.objects.create(
+            type='train',
+            title='Test Train',
+            source='London',
+            destination='Paris',
+            departure_datetime=timezone.now() + timedelta(days=2),
+            price=Decimal('120.00'),
+            available_seats=40
+        )
+
+    def get(self, path, data=None):
+        request = self.factory.get(path, data or {})
+        request.user = AnonymousUser()
+        return request
+
+    async def test_pages_render_with_live_seats(self):
+        """Test home, list and detail render the same options as the sync views."""
+        response = await async_views.home(self.get(reverse('bookings:home')))
+        self.assertContains(response, 'Test Flight')
+        self.assertContains(response, 'Test Train')
+
+        response = await async_views.travel_list(
+            self.get(reverse('bookings:travel_list'), {'source': 'new york', 'destination': 'london'})
+        )
+        self.assertContains(response, 'Test Flight')
+        self.assertNotContains(response, 'Test Train')
+
+        response = await async_views.travel_detail(
+            self.get(reverse('bookings:travel_detail', args=[self.travel_option.pk])), self.travel_option.pk
+        )
+        self.assertContains(response, 'Test Flight')
+        self.assertContains(response, '100')
+
+    async def test_cursor_pages(self):
+        """Test keyset pagination through the async list view."""
+        with self.settings(BOOKINGS_PAGINATION_MODE='cursor'):
+            response = await async_views.travel_list(self.get(reverse('bookings:travel_list')))
+        self.assertContains(response, 'Test Flight')
+        self.assertContains(response, 'Test Train')
+
+    @override_settings(ANONYMOUS_PAGE_CACHE_TIMEOUT=0)
+    def test_shares_search_cache_with_sync_views(self):
+        """Test a page cached by the sync view is a hit for the async one."""
+        params = {'source': 'New York', 'destination': 'London'}
+        Client().get(reverse('bookings:travel_list'), params)
+        with CaptureQueriesContext(connection) as queries:
+            async_to_sync(async_views.travel_list)(self.get(reverse('bookings:travel_list'), params))
+        self.assertFalse(any('bookings_traveloption' in q['sql'] for q in queries.captured_queries))
+        self.assertEqual(search_cache_stats()['hits'], 1)
+
+    async def test_autocomplete(self):
+        """Test the async autocomplete answers from the city index."""
+        response = await async_views.search_autocomplete(
+            self.get(reverse('bookings:search_autocomplete'), {'q': 'lon', 'field': 'destination'})
+        )
+        self.assertEqual(json.loads(response.content), {'results': ['London']})
+
+    async def test_travel_detail_revalidation(self):
+        """Test the async detail view answers a matching ETag with 304."""
+        path = reverse('bookings:travel_detail', args=[self.travel_option.pk])
+        etag = (await async_views.travel_detail(self.get(path), self.travel_option.pk))['ETag']
+        request = self.get(path)
+        request.META['HTTP_IF_NONE_MATCH'] = etag
+        response = await async_views.travel_detail(request, self.travel_option.pk)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_missing_option_is_404(self):
+        """Test an unknown travel option raises Http404."""
+        with self.assertRaises(Http404):
+            await async_views.travel_detail(self.get('/travel/0/'), 0)
+
+    def test_within_query_budget(self):
+        """Test the async views issue no more queries than the sync budget."""
+        baseline = load_baseline()
+        requests = {
+            'home': (async_views.home, reverse('bookings:home'), ()),
+            'travel_list': (async_views.travel_list, reverse('bookings:travel_list'), ()),
+            'travel_detail': (
+                async_views.travel_detail, reverse('bookings:travel_detail', args=[self.travel_option.pk]),
+                (self.travel_option.pk,),
+            ),
+        }
+        for name, (view, path, args) in requests.items():
+            with self.subTest(view=name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    async_to_sync(view)(self.get(path), *args)
+                self.assertLessEqual(len(queries), baseline[name]['queries'])
+
+
+class QueryBudgetTest(TestCase):
+    """Test every benchmarked view stays within its checked-in query budget."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.travel_option = TravelOption.objects.create(
+            type='flight',
+            title='Test Flight',
+            source='New York',
+            destination='London',
+            departure_datetime=timezone.now() + timedelta(days=1),
+            price=Decimal('500.00'),
+            available_seats=100
+        )
+        other = TravelOption.objects.create(
+            type='train',
+            title='Test Train',
+            source='London',
+            destination='Paris',
+            departure_datetime=timezone.now() + timedelta(days=2),
+            price=Decimal('120.00'),
+            available_seats=100
+        )
+        self.booking = Booking.objects.create(user=self.user, travel_option=self.travel_option, num_seats=1)
+        for _ in range(5):
+            Booking.objects.create(user=self.user, travel_option=other, num_seats=1)
+
+    def test_views_within_query_budget(self):
+        """Test cold-cache query counts against bench_baseline.json."""
+        baseline = load_baseline()
+        anonymous, logged_in = Client(), Client()
+        logged_in.force_login(self.user)
+
+        for name, method, url, data, login_required in scenarios(self.travel_option, self.booking):
+            with self.subTest(view=name):
+                client = logged_in if login_required else anonymous
+                _, queries = run_scenario(client, method, url, data)
+                self.assertLessEqual(queries, baseline[name]['queries'])
+
+
 class PermissionTest(TestCase):
     """Test permission and security."""
     
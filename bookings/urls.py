@@ -1,14 +1,21 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import views, async_views
 
 app_name = 'bookings'
+read_views = async_views if settings.BOOKINGS_ASYNC_VIEWS else views
 
 urlpatterns = [
     # Home and search
-    path('', views.home, name='home'),
-    path('travel/', views.travel_list, name='travel_list'),
-    path('travel/<int:pk>/', views.travel_detail, name='travel_detail'),
-    path('search/autocomplete/', views.search_autocomplete, name='search_autocomplete'),
+    path('', read_views.home, name='home'),
+    path('travel/', read_views.travel_list, name='travel_list'),
+    path('travel/<int:pk>/', read_views.travel_detail, name='travel_detail'),
+    path('travel/fare-calendar/', views.fare_calendar_view, name='fare_calendar'),
+    path('travel/connections/', views.connections_view, name='connections'),
+    path('search/autocomplete/', read_views.search_autocomplete, name='search_autocomplete'),
+    path('search/cache-stats/', views.search_cache_stats_view, name='search_cache_stats'),
+    path('exports/bookings/', views.export_bookings, name='export_bookings'),
+    path('exports/travel-options/', views.export_travel_options, name='export_travel_options'),
     
     # User management
     path('accounts/register/', views.register, name='register'),
@@ -16,6 +23,15 @@ urlpatterns = [
     
     # Bookings
     path('bookings/', views.booking_list, name='booking_list'),
+    path('bookings/multi/', views.book_multiple, name='book_multiple'),
     path('bookings/<int:pk>/', views.booking_detail, name='booking_detail'),
     path('bookings/<int:pk>/cancel/', views.cancel_booking, name='cancel_booking'),
+    path('bookings/requests/<int:pk>/', views.booking_request_detail, name='booking_request_detail'),
+    path('bookings/requests/<int:pk>/status/', views.booking_request_status, name='booking_request_status'),
+
+    # Seat holds
+    path('travel/<int:pk>/hold/', views.hold_seats_view, name='hold_seats'),
+    path('holds/<int:pk>/', views.hold_detail, name='hold_detail'),
+    path('holds/<int:pk>/confirm/', views.confirm_hold_view, name='confirm_hold'),
+    path('holds/<int:pk>/release/', views.release_hold_view, name='release_hold'),
 ]
@@ -1,29 +1,64 @@
+from datetime import timedelta
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.contrib.admin.views.decorators import staff_member_required
 from django.utils import timezone
-from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from django.views.decorators.csrf import csrf_exempt
+from django.http import JsonResponse, Http404, StreamingHttpResponse
+from django.views.decorators.http import require_POST, condition
 from django.contrib.auth import login
 from django.db import transaction
+from django.conf import settings
+
+from . import conditional
+from .page_cache import anonymous_page_cache, TRAVEL_OPTIONS
+from .models import TravelOption, Booking, UserProfile, SeatHold, BookingRequest, ArchivedBooking
+from .forms import (
+    UserRegistrationForm, UserProfileForm, BookingForm, TravelSearchForm, MultiBookingForm, ExportFilterForm,
+    FareCalendarForm, ConnectionSearchForm,
+)
+from .services import book_many, hold_seats, confirm_hold, release_hold, enqueue_booking
+from .pagination import KeysetPaginator
+from .templatetags.pagination_tags import PAGINATION_PARAMS
+from .autocomplete import get_city_index
+from .search import build_travel_queryset, facet_counts, local_day_range
+from .catalog import get_travel_option
+from .exports import export_lines
+from .archive import booking_history_page
+from .summaries import popular_routes, fare_calendar
+from .connections import find_connections
+from .cache import cached_search, serialize_page, deserialize_page, rows_from, travel_options_from, search_cache_stats
+
+
+
+def _get_travel_option_or_404(pk):
+    """Travel option from the catalog cache with its live seat count."""
+    try:
+        return get_travel_option(pk)
+    except TravelOption.DoesNotExist:
+        raise Http404('No TravelOption matches the given query.')
+
 
-from .models import TravelOption, Booking, UserProfile
-from .forms import UserRegistrationForm, UserProfileForm, BookingForm, TravelSearchForm
+def _use_cursor_pagination(request):
+    """Keyset pagination is used when configured or when a cursor is passed."""
+    return 'cursor' in request.GET or settings.BOOKINGS_PAGINATION_MODE == 'cursor'
 
 
+@anonymous_page_cache(TRAVEL_OPTIONS)
 def home(request):
     """Home page with search form and featured travel options."""
     search_form = TravelSearchForm(request.GET or None)
-    travel_options = TravelOption.objects.filter(
-        departure_datetime__gte=timezone.now()
-    ).order_by('departure_datetime')[:6]
+    travel_options = travel_options_from(cached_search(
+        None, 'home', lambda: rows_from(build_travel_queryset()[:6])
+    ))
 
     context = {
         'search_form': search_form,
         'travel_options': travel_options,
+        'popular_routes': cached_search(None, 'popular_routes', popular_routes),
     }
     return render(request, 'home.html', context)
 
@@ -67,60 +102,78 @@ def profile(request):
     return render(request, 'registration/profile.html', context)
 
 
+def _facet_links(request, facets):
+    """Add to each facet bucket the URL of the search narrowed to it."""
+    groups = []
+    for label, buckets in facets['groups']:
+        linked = []
+        for bucket in buckets:
+            url = None
+            if bucket['params'] is not None:
+                query = request.GET.copy()
+                for param in PAGINATION_PARAMS:
+                    query.pop(param, None)
+                for name, value in bucket['params'].items():
+                    query[name] = value
+                url = f'?{query.urlencode()}'
+            linked.append(dict(bucket, url=url))
+        groups.append((label, linked))
+    return {'total': facets['total'], 'groups': groups}
+
+
+@anonymous_page_cache(TRAVEL_OPTIONS)
 def travel_list(request):
     """List all travel options with filtering and pagination."""
     search_form = TravelSearchForm(request.GET or None)
-    travel_options = TravelOption.objects.filter(
-        departure_datetime__gte=timezone.now()
-    ).order_by('departure_datetime')
-
-    # Apply filters
-    if search_form.is_valid():
-        if search_form.cleaned_data.get('type'):
-            travel_options = travel_options.filter(
-                type=search_form.cleaned_data['type']
-            )
-        if search_form.cleaned_data.get('source'):
-            travel_options = travel_options.filter(
-                source__icontains=search_form.cleaned_data['source']
-            )
-        if search_form.cleaned_data.get('destination'):
-            travel_options = travel_options.filter(
-                destination__icontains=search_form.cleaned_data['destination']
-            )
-        if search_form.cleaned_data.get('departure_date'):
-            travel_options = travel_options.filter(
-                departure_datetime__date=search_form.cleaned_data['departure_date']
-            )
-        if search_form.cleaned_data.get('min_price'):
-            travel_options = travel_options.filter(
-                price__gte=search_form.cleaned_data['min_price']
-            )
-        if search_form.cleaned_data.get('max_price'):
-            travel_options = travel_options.filter(
-                price__lte=search_form.cleaned_data['max_price']
-            )
-
-    # Pagination
-    paginator = Paginator(travel_options, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cleaned_data = search_form.cleaned_data if search_form.is_valid() else None
+    cursor_pagination = _use_cursor_pagination(request)
+    if cursor_pagination:
+        page_key = ('cursor', request.GET.get('cursor', ''))
+    else:
+        page_key = ('page', request.GET.get('page', ''))
+
+    def fetch_page():
+        travel_options = build_travel_queryset(cleaned_data)
+        facets = facet_counts(travel_options)
+        if cursor_pagination:
+            paginator = KeysetPaginator(travel_options, 12, keys=('departure_datetime', 'id'))
+        else:
+            paginator = Paginator(travel_options, 12)
+            # The facet query already counted the results
+            paginator.count = facets['total']
+        payload = serialize_page(paginator.get_page(page_key[1]))
+        payload['facets'] = facets
+        return payload
+
+    # Pagination and facets (cached per search and page)
+    payload = cached_search(cleaned_data, page_key, fetch_page)
+    page_obj = deserialize_page(payload, 12)
 
     context = {
         'search_form': search_form,
         'page_obj': page_obj,
         'travel_options': page_obj,
+        'cursor_pagination': cursor_pagination,
+        'facets': _facet_links(request, payload['facets']),
     }
     return render(request, 'bookings/travel_list.html', context)
 
 
+@condition(etag_func=conditional.travel_detail_etag)
 def travel_detail(request, pk):
-    """Travel option detail view with booking form."""
-    travel_option = get_object_or_404(TravelOption, pk=pk)
+    """Travel option detail view with booking form.
+
+    Conditional GETs are answered from one narrow query when the option,
+    its seat count and holds are unchanged (see ``conditional``).
+    """
+    travel_option = _get_travel_option_or_404(pk)
     
     if request.method == 'POST' and request.user.is_authenticated:
         form = BookingForm(request.POST, travel_option=travel_option)
         if form.is_valid():
+            if settings.BOOKING_QUEUE_ENABLED:
+                booking_request = enqueue_booking(request.user, travel_option, form.cleaned_data['num_seats'])
+                return redirect('bookings:booking_request_detail', pk=booking_request.pk)
             try:
                 with transaction.atomic():
                     booking = form.save(commit=False)
@@ -140,42 +193,187 @@ def travel_detail(request, pk):
     context = {
         'travel_option': travel_option,
         'form': form,
+        'held_seats': travel_option.held_seats(),
     }
-    return render(request, 'bookings/travel_detail.html', context)
+    response = render(request, 'bookings/travel_detail.html', context)
+    etag = None
+    if request.method == 'GET':
+        etag = conditional.travel_option_etag(request, travel_option, context['held_seats'])
+    return conditional.private_page(response, etag)
+
+
+@login_required
+def booking_request_detail(request, pk):
+    """Waiting page for a queued booking request."""
+    booking_request = get_object_or_404(BookingRequest, pk=pk, user=request.user)
+    if booking_request.status == 'confirmed':
+        messages.success(request, f'Booking confirmed! You have booked {booking_request.num_seats} seat(s).')
+        return redirect('bookings:booking_detail', pk=booking_request.booking_id)
+    if booking_request.status == 'rejected':
+        messages.error(request, booking_request.error)
+        return redirect('bookings:travel_detail', pk=booking_request.travel_option_id)
+    return render(request, 'bookings/booking_request_detail.html', {'booking_request': booking_request})
+
+
+@login_required
+def booking_request_status(request, pk):
+    """JSON status of a queued booking request.
+
+    Answers at once; the waiting page polls it with backoff, so a queue of
+    waiting users does not tie up workers.
+    """
+    booking_request = get_object_or_404(BookingRequest, pk=pk, user=request.user)
+    # A client revalidating a still pending status gets 304
+    return conditional.json_response(request, {
+        'id': booking_request.pk,
+        'status': booking_request.status,
+        'booking_id': booking_request.booking_id,
+        'error': booking_request.error,
+    }, private=True)
+
+
+@login_required
+@require_POST
+def hold_seats_view(request, pk):
+    """Start checkout by holding the requested seats for a short time.
+
+    In queued booking mode the seats are not held; the booking is queued for
+    the worker instead, so flash-sale requests do not each lock the row.
+    """
+    travel_option = _get_travel_option_or_404(pk)
+    form = BookingForm(request.POST, travel_option=travel_option)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('bookings:travel_detail', pk=pk)
+
+    if settings.BOOKING_QUEUE_ENABLED:
+        booking_request = enqueue_booking(request.user, travel_option, form.cleaned_data['num_seats'])
+        return redirect('bookings:booking_request_detail', pk=booking_request.pk)
+
+    try:
+        hold = hold_seats(request.user, travel_option, form.cleaned_data['num_seats'])
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('bookings:travel_detail', pk=pk)
+    return redirect('bookings:hold_detail', pk=hold.pk)
+
+
+@login_required
+def hold_detail(request, pk):
+    """Checkout page for a seat hold."""
+    hold = get_object_or_404(
+        SeatHold.objects.select_related('travel_option'), pk=pk, user=request.user
+    )
+    if hold.status == 'converted' and hold.booking_id:
+        return redirect('bookings:booking_detail', pk=hold.booking_id)
+
+    context = {
+        'hold': hold,
+        'total_price': hold.travel_option.price * hold.num_seats,
+    }
+    return render(request, 'bookings/hold_detail.html', context)
+
+
+@login_required
+@require_POST
+def confirm_hold_view(request, pk):
+    """Convert a seat hold into a confirmed booking."""
+    hold = get_object_or_404(
+        SeatHold.objects.select_related('travel_option'), pk=pk, user=request.user
+    )
+    try:
+        booking = confirm_hold(hold)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('bookings:travel_detail', pk=hold.travel_option_id)
+
+    messages.success(
+        request,
+        f'Booking confirmed! You have booked {booking.num_seats} seat(s) for {hold.travel_option.title}.'
+    )
+    return redirect('bookings:booking_detail', pk=booking.pk)
+
+
+@login_required
+@require_POST
+def release_hold_view(request, pk):
+    """Give up a seat hold before it expires."""
+    hold = get_object_or_404(
+        SeatHold.objects.select_related('travel_option'), pk=pk, user=request.user
+    )
+    if release_hold(hold):
+        messages.info(request, 'Your held seats have been released.')
+    return redirect('bookings:travel_detail', pk=hold.travel_option_id)
+
+
+@login_required
+@require_POST
+def book_multiple(request):
+    """Book several travel options (e.g. outbound and return legs) at once."""
+    form = MultiBookingForm(request.POST)
+    if not form.is_valid():
+        for error in form.non_field_errors():
+            messages.error(request, error)
+        return redirect('bookings:travel_list')
+
+    try:
+        bookings = book_many(request.user, form.cleaned_data['legs'])
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('bookings:travel_list')
+
+    total_seats = sum(booking.num_seats for booking in bookings)
+    messages.success(
+        request,
+        f'Booking confirmed! You have booked {total_seats} seat(s) across {len(bookings)} travel option(s).'
+    )
+    return redirect('bookings:booking_list')
 
 
 @login_required
 def booking_list(request):
-    """List user's bookings with filtering."""
-    bookings = Booking.objects.filter(user=request.user).order_by('-booking_date')
-    
-    # Filter by status
+    """List user's bookings, including archived past trips, with filtering."""
     status_filter = request.GET.get('status')
-    if status_filter:
-        bookings = bookings.filter(status=status_filter)
-
-    # Pagination
-    paginator = Paginator(bookings, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    cursor_pagination = _use_cursor_pagination(request)
+    page_obj = booking_history_page(
+        request.user, 10,
+        page_number=request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+        cursor_pagination=cursor_pagination,
+        status=status_filter,
+    )
 
     context = {
         'page_obj': page_obj,
         'bookings': page_obj,
         'status_filter': status_filter,
+        'cursor_pagination': cursor_pagination,
     }
     return render(request, 'bookings/booking_list.html', context)
 
 
 @login_required
+@condition(etag_func=conditional.booking_detail_etag, last_modified_func=conditional.booking_detail_last_modified)
 def booking_detail(request, pk):
-    """Booking detail view."""
-    booking = get_object_or_404(Booking, pk=pk, user=request.user)
+    """Booking detail view; falls back to the archive for past trips.
+
+    Conditional GETs are answered from one narrow query when neither the
+    booking nor its travel option changed (see ``conditional``).
+    """
+    booking = Booking.objects.select_related('travel_option').filter(pk=pk, user=request.user).first()
+    if booking is None:
+        booking = get_object_or_404(
+            ArchivedBooking.objects.select_related('travel_option'), pk=pk, user=request.user
+        )
     
     context = {
         'booking': booking,
     }
-    return render(request, 'bookings/booking_detail.html', context)
+    response = render(request, 'bookings/booking_detail.html', context)
+    etag = conditional.booking_etag(request, booking)
+    return conditional.private_page(response, etag, conditional.booking_last_modified(booking) if etag else None)
 
 
 @login_required
@@ -203,15 +401,108 @@ def search_autocomplete(request):
     if not query or len(query) < 2:
         return JsonResponse({'results': []})
     
-    if field == 'source':
-        results = TravelOption.objects.filter(
-            source__icontains=query
-        ).values_list('source', flat=True).distinct()[:10]
-    elif field == 'destination':
-        results = TravelOption.objects.filter(
-            destination__icontains=query
-        ).values_list('destination', flat=True).distinct()[:10]
+    if field in ('source', 'destination'):
+        results = get_city_index(field).search(query, limit=10)
     else:
         results = []
     
-    return JsonResponse({'results': list(results)})
+    return conditional.json_response(request, {'results': list(results)})
+
+
+def fare_calendar_view(request):
+    """JSON cheapest fare and seats left per day for a route.
+
+    Takes ``source``, ``destination`` and optionally ``type``, ``start``
+    (defaults to today) and ``days`` (1-90, default 30).
+    """
+    form = FareCalendarForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return conditional.json_response(request, {'days': fare_calendar(form.cleaned_data)})
+
+
+def _leg_json(travel_option):
+    return {
+        'id': travel_option.pk,
+        'title': travel_option.title,
+        'type': travel_option.type,
+        'source': travel_option.source,
+        'destination': travel_option.destination,
+        'departure_datetime': travel_option.departure_datetime,
+        'arrival_datetime': travel_option.arrival_datetime,
+        'price': travel_option.price,
+        'available_seats': travel_option.available_seats,
+        'url': reverse('bookings:travel_detail', args=[travel_option.pk]),
+    }
+
+
+def connections_view(request):
+    """JSON itineraries of up to ``max_legs`` connecting travel options.
+
+    The first leg departs on ``date`` (default: within the next 24 hours).
+    Results are ordered by ``sort`` (``arrival`` or ``price``) and every
+    connection leaves at least ``min_connection`` minutes to change.
+    """
+    form = ConnectionSearchForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    data = form.cleaned_data
+
+    now = timezone.now()
+    if data['date']:
+        earliest, latest = local_day_range(data['date'])
+        earliest = max(earliest, now)
+    else:
+        earliest, latest = now, now + timedelta(days=1)
+
+    itineraries = []
+    if data['source_location_ids'] and data['destination_location_ids'] and latest > earliest:
+        itineraries = find_connections(
+            data['source_location_ids'], data['destination_location_ids'], earliest, latest,
+            max_legs=data['max_legs'],
+            min_connection=timedelta(minutes=data['min_connection']),
+            sort=data['sort'],
+            limit=data['limit'],
+            seats=data['seats'],
+        )
+    return conditional.json_response(request, {'itineraries': [
+        {
+            'departure_datetime': legs[0].departure_datetime,
+            'arrival_datetime': legs[-1].arrival_datetime,
+            'price': sum(leg.price for leg in legs),
+            'legs': [_leg_json(leg) for leg in legs],
+        }
+        for legs in itineraries
+    ]})
+
+
+@staff_member_required
+def search_cache_stats_view(request):
+    """Hit and miss counters for the search result cache."""
+    return JsonResponse(search_cache_stats())
+
+
+def _export(request, name):
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    lines, content_type = export_lines(name, form.cleaned_data)
+    extension = form.cleaned_data['format']
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{name}-{timezone.localdate():%Y%m%d}.{extension}"'
+    )
+    return response
+
+
+@staff_member_required
+def export_bookings(request):
+    """Stream all bookings matching the filters as CSV or NDJSON."""
+    return _export(request, 'bookings')
+
+
+@staff_member_required
+def export_travel_options(request):
+    """Stream all travel options matching the filters as CSV or NDJSON."""
+    return _export(request, 'travel_options')
@@ -102,6 +102,20 @@ else:
             }
         }
 
+# Cache
+# Use a shared backend (e.g. redis:// or memcache://) in production so version
+# stamps such as the autocomplete index version are seen by every worker
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Search result cache timeouts (seconds). Route searches are invalidated when a
+# travel option on the route is saved or deleted; searches not scoped to a route
+# rely on the short timeout. Seat counts are not cached: cached pages read them
+# live, so bookings do not invalidate anything.
+SEARCH_CACHE_TIMEOUT = env.int('SEARCH_CACHE_TIMEOUT', default=300)
+SEARCH_CACHE_UNSCOPED_TIMEOUT = env.int('SEARCH_CACHE_UNSCOPED_TIMEOUT', default=30)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -150,6 +164,33 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
 
+# Pagination for travel and booking lists: 'page' (numbered pages) or
+# 'cursor' (keyset pagination, constant cost on deep pages)
+BOOKINGS_PAGINATION_MODE = env('BOOKINGS_PAGINATION_MODE', default='page')
+
+# How long (seconds) seats stay reserved while a user checks out
+SEAT_HOLD_TTL = env.int('SEAT_HOLD_TTL', default=600)
+
+# Travel options each worker keeps in its in-process catalog LRU
+CATALOG_CACHE_SIZE = env.int('CATALOG_CACHE_SIZE', default=1024)
+
+# Queued booking mode: bookings from the travel page are appended to a queue,
+# instead of holding seats, and confirmed in batches by
+# `manage.py process_booking_queue` (one writer per option)
+BOOKING_QUEUE_ENABLED = env.bool('BOOKING_QUEUE_ENABLED', default=False)
+BOOKING_QUEUE_BATCH_SIZE = env.int('BOOKING_QUEUE_BATCH_SIZE', default=200)
+
+# Serve home, travel list/detail and autocomplete from bookings.async_views;
+# meant for ASGI workers (see README), sync workers would run them in a loop
+# per request
+BOOKINGS_ASYNC_VIEWS = env.bool('BOOKINGS_ASYNC_VIEWS', default=False)
+
+# Full-page cache of home and browse pages for visitors without a session:
+# seconds a page is fresh, then how long it may be served stale while one
+# request re-renders it (0 disables the cache)
+ANONYMOUS_PAGE_CACHE_TIMEOUT = env.int('ANONYMOUS_PAGE_CACHE_TIMEOUT', default=30)
+ANONYMOUS_PAGE_CACHE_STALE_TIMEOUT = env.int('ANONYMOUS_PAGE_CACHE_STALE_TIMEOUT', default=300)
+
 # Login/Logout URLs
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'